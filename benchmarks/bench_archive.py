@@ -0,0 +1,105 @@
+"""
+Нагрузочный прогон памяти: закрытые операции в списке против архива с сегментами на диске
+
+Анализатор непрерывно получает действия сценария из benchmarks.bench_hypotheses (200 паттернов,
+вложенные операции), как служба на круглосуточном рабочем месте. Память (tracemalloc)
+снимается по ходу прогона: с прежним списком completed_operations она растет с числом
+операций, с OperationArchive остается на уровне кольца. Затем - размер сегментов, выборки
+по паттерну и за час и сверка операций, прочитанных с диска, с исходными. Время прогона
+и записи сегментов снимается под tracemalloc и без него в несколько раз меньше.
+
+Запуск: python -m benchmarks.bench_archive [--operations 50000] [--capacity 1000]
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_hypotheses import Script, build_patterns
+from monitor.events import now_ns
+from monitor.operation_analyzer import OperationAnalyzer
+from monitor.operation_archive import OperationArchive
+
+
+def soak(patterns, args, completed, checkpoints, start):
+    """Прогон сценария; память после каждой контрольной точки (МБ) и время"""
+    analyzer = OperationAnalyzer()
+    analyzer.patterns = patterns
+    analyzer.completed_operations = completed
+    rng = random.Random(args.seed)
+    script = Script(patterns, rng)
+    script.timestamp = start
+    memory = []
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    actions = 0
+    for number in range(1, args.operations + 1):
+        script.operation(0.3)
+        for action in script.actions:
+            analyzer.analyze_action(action)
+        actions += len(script.actions)
+        script.actions.clear()
+        if number in checkpoints:
+            memory.append((tracemalloc.get_traced_memory()[0] - baseline) / 2**20)
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    return memory, elapsed, actions, analyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--operations', type=int, default=50_000, help='операций верхнего уровня')
+    parser.add_argument('--capacity', type=int, default=1000, help='операций в памяти архива')
+    parser.add_argument('--patterns', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=21)
+    args = parser.parse_args()
+
+    patterns = build_patterns(args.patterns, random.Random(args.seed))
+    checkpoints = [args.operations * step // 5 for step in range(1, 6)]
+    start = now_ns()
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_memory, legacy_time, actions, legacy = soak(patterns, args, [], checkpoints, start)
+        archive = OperationArchive(directory, capacity=args.capacity)
+        memory, elapsed, _, analyzer = soak(patterns, args, archive, checkpoints, start)
+
+        print(f"Операций верхнего уровня: {args.operations}, действий: {actions},"
+              f" закрыто операций: {analyzer.statistics.totals.count}")
+        print(f"{'Операций':>10} {'список, МБ':>11} {'архив, МБ':>10}")
+        for number, old, new in zip(checkpoints, legacy_memory, memory):
+            print(f"{number:>10} {old:>11.1f} {new:>10.1f}")
+        print(f"Прогон: список {legacy_time:.1f} с, архив {elapsed:.1f} с")
+
+        archive.close()
+        stats = archive.get_stats()
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"\nСегментов: {stats['segments']}, на диске {size / 2**20:.1f} МБ"
+              f" ({size / len(archive):.0f} байт на операцию, {size / actions:.1f} байт на действие),"
+              f" запись {stats['spill_ms'] / max(stats['segments'], 1):.1f} мс на сегмент")
+
+        closed = legacy.completed_operations
+        key = closed[len(closed) // 2].pattern_key
+        started = time.perf_counter()
+        found = list(archive.query(pattern_key=key))
+        pattern_time = time.perf_counter() - started
+        middle = closed[len(closed) // 2].start_ns
+        started = time.perf_counter()
+        hour = list(archive.query(start=middle, end=middle + 3600 * 10**9))
+        hour_time = time.perf_counter() - started
+        print(f"Выборка паттерна {key}: {len(found)} операций, {pattern_time * 1000:.0f} мс;"
+              f" за час: {len(hour)} операций, {hour_time * 1000:.0f} мс")
+
+        same = len(archive) == len(closed) and all(
+            restored.to_dict() == original.to_dict()
+            and [a.to_dict() for a in restored.actions] == [a.to_dict() for a in original.actions]
+            for restored, original in zip(archive, closed))
+        print(f"Операции из архива совпадают с исходными: {'да' if same else 'нет'}")
+
+
+if __name__ == '__main__':
+    main()
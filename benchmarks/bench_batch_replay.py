@@ -0,0 +1,87 @@
+"""
+Масштабирование пакетного анализа истории по числу процессов
+
+Создает во временном каталоге историю нескольких рабочих мест (с ротацией и .gz сегментами)
+и прогоняет monitor.batch_replay с 1, 2, 4, ... процессами. Результаты при любом числе
+процессов должны совпадать.
+
+Запуск: python -m benchmarks.bench_batch_replay [--shards 16] [--events 20000] [--max-workers 8]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.bench_triggers import build_patterns, WORDS
+from monitor.batch_replay import batch_replay, HISTORY_NAME
+from monitor.events import UIEvent, EVENT_TYPES, EVENT_INPUT
+from monitor.history_writer import HistoryWriter
+
+
+def write_workstation(directory, events, patterns, rng):
+    """История одного рабочего места: события с интервалом 0.2-1.2 с начиная с 9:00"""
+    triggers = [t for p in patterns.values() for t in p['triggers'] + p['middle_triggers'] + p['completion_triggers']]
+    timestamp = int(datetime.now().replace(hour=9, minute=0, second=0, microsecond=0).timestamp()) * 10**9
+    writer = HistoryWriter(os.path.join(directory, HISTORY_NAME), rotate_bytes=1024 * 1024, rotate_daily=False)
+    lines = []
+    for i in range(events):
+        timestamp += rng.randrange(200, 1200) * 1_000_000
+        name = rng.choice(triggers) if rng.random() < 0.3 else rng.choice(WORDS)
+        event = UIEvent(EVENT_TYPES[i % 3], timestamp, 'EditControl', name,
+                        path=("WindowControl['Документ']", f"EditControl['{name}']"))
+        if event.event_type == EVENT_INPUT:
+            event.old_value, event.new_value = '', str(i)
+        lines.append(event.to_log_line())
+        if len(lines) == 1000:
+            writer.write_lines(lines)
+            writer.flush()
+            lines = []
+    if lines:
+        writer.write_lines(lines)
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--shards', type=int, default=16, help='число рабочих мест')
+    parser.add_argument('--events', type=int, default=20000, help='событий на рабочее место')
+    parser.add_argument('--patterns', type=int, default=50)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    patterns = build_patterns(args.patterns, 8, rng)
+
+    with tempfile.TemporaryDirectory() as root:
+        sources = []
+        for shard in range(args.shards):
+            directory = os.path.join(root, f"ws{shard:02d}")
+            os.makedirs(directory)
+            write_workstation(directory, args.events, patterns, rng)
+            sources.append(directory)
+
+        print(f"Рабочих мест: {args.shards}, событий на место: {args.events}, ядер: {os.cpu_count()}")
+        print(f"{'Процессов':>10} {'Время, с':>10} {'Событий/с':>12} {'Ускорение':>10} {'Эффективность':>14}")
+        baseline = None
+        reference = None
+        workers = 1
+        while True:
+            started = time.perf_counter()
+            operations, _, totals = batch_replay(sources, patterns, workers)
+            elapsed = time.perf_counter() - started
+            if reference is None:
+                reference, baseline = operations, elapsed
+            elif operations != reference:
+                print(f"ОШИБКА: результат с {workers} процессами отличается")
+            speedup = baseline / elapsed
+            print(f"{workers:>10} {elapsed:>10.2f} {totals['events'] / elapsed:>12.0f} {speedup:>9.2f}x"
+                  f" {speedup / workers:>13.0%}")
+            if workers >= args.max_workers:
+                break
+            workers = min(workers * 2, args.max_workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Сравнение бэкендов захвата: загрузка CPU в простое и задержка фиксации событий
+
+polling-fixed - опрос с постоянным интервалом 50 мс и опросом кнопки мыши (прежнее поведение),
+polling - адаптивный интервал 50 мс .. --ceiling в простое, клики из перехвата мыши.
+
+Запуск: python -m benchmarks.bench_capture [--idle 3] [--events 50] [--call-cost 0.00005] [--ceiling 1.0]
+"""
+import argparse
+import re
+import threading
+import time
+
+from monitor.fake_provider import FakeProvider
+from monitor.ui_monitor import UIMonitor
+
+
+def build_form(provider):
+    """Форма 1С: окно, панели, поля ввода и кнопки"""
+    window = provider.create_window("Накладная (создание)")
+    pane = window.add('PaneControl').add('PaneControl', automation_id='FormPane')
+    fields = [pane.add('EditControl', f'Поле{i}', value='') for i in range(10)]
+    buttons = [pane.add('ButtonControl', name) for name in ('Записать', 'Провести', 'ОК')]
+    return window, fields, buttons
+
+
+def run_backend(backend, idle_seconds, events, call_cost, ceiling, mouse_hook=True):
+    provider = FakeProvider(call_cost=call_cost)
+    window, fields, buttons = build_form(provider)
+    provider.focused = fields[0]
+
+    received = {}
+    monitor = UIMonitor(log_focus=True, log_clicks=True, log_input=True,
+                        backend=backend, provider=provider, poll_ceiling=ceiling,
+                        mouse_hook=mouse_hook)
+
+    def on_log(message):
+        # Событие опознаем по имени элемента, уникальному для каждого шага
+        name_match = re.search(r"Name: '([^']*)'", message)
+        if name_match:
+            received[name_match.group(1)] = time.perf_counter()
+
+    thread = threading.Thread(target=monitor.start_monitoring, args=(on_log, lambda ok, msg: None))
+    thread.start()
+    time.sleep(0.2)
+
+    # Простой: оператор ничего не делает
+    calls_before = provider.com_calls
+    cpu_before = time.process_time()
+    time.sleep(idle_seconds)
+    idle_cpu = (time.process_time() - cpu_before) / idle_seconds * 100
+    idle_calls = (provider.com_calls - calls_before) / idle_seconds
+
+    # Переходы фокуса: задержка от события до записи в лог
+    latencies = []
+    for i in range(events):
+        field = fields[(i + 1) % len(fields)]
+        field.name = f'Поле_{backend}_{i}'
+        sent = time.perf_counter()
+        provider.focus(field)
+        deadline = sent + 1.0
+        while field.name not in received and time.perf_counter() < deadline:
+            time.sleep(0.0005)
+        if field.name in received:
+            latencies.append(received[field.name] - sent)
+        time.sleep(0.02)
+
+    # Короткие клики (10 мс) - опрос с шагом 50 мс часть из них теряет
+    captured_before = sum(1 for key in received if key.startswith('Записать'))
+    short_clicks = 20
+    for i in range(short_clicks):
+        buttons[0].name = f'Записать{i}'
+        provider.click(buttons[0], duration=0.01)
+        time.sleep(0.08)
+    time.sleep(0.2)
+    captured = sum(1 for key in received if key.startswith('Записать')) - captured_before
+
+    monitor.stop_monitoring()
+    thread.join()
+    stats = monitor.get_capture_stats()
+
+    latencies.sort()
+    median = latencies[len(latencies) // 2] * 1000 if latencies else float('nan')
+    worst = latencies[-1] * 1000 if latencies else float('nan')
+    return idle_cpu, idle_calls, median, worst, len(latencies), captured, short_clicks, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--idle', type=float, default=3.0, help="Длительность простоя, сек")
+    parser.add_argument('--events', type=int, default=50, help="Количество переходов фокуса")
+    parser.add_argument('--call-cost', type=float, default=0.00005, help="Стоимость COM-вызова, сек")
+    parser.add_argument('--ceiling', type=float, default=1.0, help="Максимальный интервал опроса в простое, сек")
+    args = parser.parse_args()
+
+    rows = []
+    for label, backend, ceiling, mouse_hook in (('polling-fixed', 'polling', 0.05, False),
+                                                ('polling', 'polling', args.ceiling, True),
+                                                ('events', 'events', args.ceiling, True)):
+        rows.append((label, run_backend(backend, args.idle, args.events, args.call_cost, ceiling, mouse_hook)))
+
+    print(f"{'Бэкенд':<14} {'CPU простоя':>12} {'вызовов/с':>10} {'медиана, мс':>12} {'макс, мс':>10} {'фокус':>8} {'клики':>8}")
+    for label, (cpu, calls, median, worst, got, clicks, total, _) in rows:
+        print(f"{label:<14} {cpu:>11.2f}% {calls:>10.0f} {median:>12.2f} {worst:>10.2f} "
+              f"{got:>4}/{args.events:<3} {clicks:>4}/{total:<3}")
+    for label, result in rows:
+        stats = result[-1]
+        if 'interval' in stats:
+            print(f"{label}: интервал {stats['interval'] * 1000:.0f} мс, пробуждений {stats['wakeups']} "
+                  f"(с изменениями {stats['active_wakeups']}, возвратов к частому опросу {stats['resets']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Нагрузка на центральный сборщик: 200 служб мониторинга на localhost
+
+Генератор нагрузки в отдельном процессе открывает заданное число соединений asyncio,
+каждое - отдельное рабочее место: приветствие, затем события ВВОД и операции кадрами
+monitor.ipc. Сборщик (monitor/collector.py) пишет их в EventStore во временном каталоге.
+
+Режимы: запись каждой строки своей транзакцией против пачек; поток с заданной частотой
+и залп без пауз с малым max_pending (обратное давление: сборщик перестает читать
+соединения, их отправка ждет в writer.drain()).
+
+Запуск: python -m benchmarks.bench_collector [--clients 200] [--events 200] [--rate 20]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from monitor.collector import Collector
+from monitor.event_store import EventStore
+from monitor.events import EVENT_INPUT
+from monitor.ipc import encode_frame, parse_address, PROTOCOL_VERSION
+
+
+class RowStore(EventStore):
+    """Запись без пачек: каждая строка - своя транзакция"""
+
+    def append(self, events=(), operations=(), workstation=''):
+        for event in events:
+            super().append([event], (), workstation)
+        for operation in operations:
+            super().append((), [operation], workstation)
+
+
+MODES = (
+    ('поток, по строке', RowStore, {}, False),
+    ('поток, пачки', EventStore, {}, False),
+    ('залп, по строке', RowStore, dict(max_pending=50), True),
+    ('залп, пачки', EventStore, dict(max_pending=50), True),
+)
+
+
+def messages(index, step):
+    """Сообщения одного шага рабочего места: событие ВВОД, каждое 20-е - еще и операция"""
+    window = f'Реализация товаров {index}'
+    name = f'Поле {step % 12}'
+    result = [{'type': 'event', 'event_type': EVENT_INPUT, 'timestamp': time.time_ns(),
+               'control_type': 'EditControl', 'name': name, 'automation_id': f'Field{step % 12}',
+               'class_name': 'V8Edit', 'path': [window, 'Основное', name], 'old_value': str(step - 1),
+               'new_value': str(step), 'pid': 4000 + index, 'window': window}]
+    if step % 20 == 19:
+        result.append({'type': 'operation', 'operation': 'Создание документа', 'pattern_key': 'create',
+                       'status': 'completed' if step % 60 else 'interrupted', 'start_ns': time.time_ns(),
+                       'end_ns': time.time_ns(), 'duration': 4.5, 'actions': 20, 'context': {'window': window}})
+    return result
+
+
+async def workstation(address, index, events, rate, burst, chunk):
+    family, sockaddr = parse_address(address)
+    reader, writer = await asyncio.open_connection(*sockaddr)
+    writer.write(encode_frame({'type': 'hello', 'version': PROTOCOL_VERSION,
+                               'workstation': f'ws{index:03d}', 'pid': 4000 + index}))
+    sent = 0
+    blocked = 0.0
+    interval = chunk / rate if rate else 0.0
+    next_at = time.perf_counter()
+    for start in range(0, events, chunk):
+        batch = [message for step in range(start, min(events, start + chunk)) for message in messages(index, step)]
+        writer.write(b''.join(encode_frame(message) for message in batch))
+        sent += len(batch)
+        started = time.perf_counter()
+        await writer.drain()  # ждет, пока сборщик не начнет снова читать соединение
+        blocked += time.perf_counter() - started
+        if not burst:
+            next_at += interval
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+    writer.close()
+    await writer.wait_closed()
+    return sent, blocked
+
+
+async def generate(address, clients, events, rate, burst, chunk):
+    return await asyncio.gather(*(workstation(address, index, events, rate, burst, chunk)
+                                  for index in range(clients)))
+
+
+def load_generator(address, args, burst, results):
+    results.put(asyncio.run(generate(address, args.clients, args.events, args.rate, burst, args.chunk)))
+
+
+def run(store, options, burst, args, directory):
+    database = store(os.path.join(directory, f"collector_{len(os.listdir(directory))}.db"))
+    collector = Collector('tcp://127.0.0.1:0', database, flush_interval=0.2, **options).start()
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=load_generator, args=(collector.address, args, burst, results), daemon=True)
+
+    started = time.perf_counter()
+    process.start()
+    reports = results.get(timeout=600)
+    process.join()
+    expected = sum(sent for sent, _ in reports)
+    deadline = time.monotonic() + 60
+    while collector.rows_written < expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    stats = collector.get_statistics()
+    transactions = database.transactions
+    collector.stop()
+
+    per_workstation = [entry['events'] for entry in stats['per_workstation'].values()]
+    blocked = sorted(blocked for _, blocked in reports)
+    return {
+        'expected': expected,
+        'written': stats['rows_written'],
+        'rows_per_sec': stats['rows_written'] / elapsed,
+        'elapsed': elapsed,
+        'transactions': transactions,
+        'insert_share': stats['insert_seconds'] / elapsed * 100,
+        'pauses': stats['pauses'],
+        'blocked_p50': blocked[len(blocked) // 2],
+        'blocked_max': blocked[-1],
+        'workstations': stats['workstations'],
+        'min_events': min(per_workstation, default=0),
+        'max_events': max(per_workstation, default=0),
+        'operations': stats['operations'],
+        'completed': stats['completed'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=200, help='рабочих мест (соединений)')
+    parser.add_argument('--events', type=int, default=200, help='событий с каждого рабочего места')
+    parser.add_argument('--rate', type=float, default=20, help='событий в секунду с рабочего места в режиме потока')
+    parser.add_argument('--chunk', type=int, default=10, help='событий в одной отправке')
+    args = parser.parse_args()
+
+    print(f"Рабочих мест: {args.clients}, событий с каждого: {args.events} (+ операция на каждые 20)")
+    print(f"{'Режим':<18} {'записано':>15} {'строк/с':>9} {'время, с':>9} {'транзакций':>11} {'запись':>7}"
+          f" {'пауз':>6} {'ожидание клиента, с':>20} {'мест':>5} {'событий на место':>17}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, store, options, burst in MODES:
+            result = run(store, options, burst, args, directory)
+            print(f"{label:<18} {result['written']:>7}/{result['expected']:<7} {result['rows_per_sec']:>9.0f}"
+                  f" {result['elapsed']:>9.2f} {result['transactions']:>11} {result['insert_share']:>6.1f}%"
+                  f" {result['pauses']:>6} {result['blocked_p50']:>9.3f} / {result['blocked_max']:<8.3f}"
+                  f" {result['workstations']:>5} {result['min_events']:>8}-{result['max_events']:<8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Панель расшифровки: пересборка текста QTextEdit на каждое событие против кольцевой модели
+
+Старый вариант: toPlainText -> split -> обрезка до 10 строк -> setPlainText на каждое событие,
+словари расшифровки создаются заново при каждом вызове. Новый: DecodePanel (QListView над
+deque(maxlen=N)) - на событие одна вставка и одно вытеснение строки модели.
+
+Запускается без дисплея (платформа Qt offscreen).
+
+Запуск: python -m benchmarks.bench_decode_panel [--events 50000]
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication, QTextEdit
+
+from benchmarks.bench_events import synthetic_stream
+from gui.decode_panel import DecodePanel, decode_event, TYPE_DECODE, EVENT_DECODE
+
+
+def legacy_update(area, event):
+    """Обновление расшифровки (как в старом MainWindow.update_decode)"""
+    # Словари пересоздаются на каждый вызов
+    type_decode = dict(TYPE_DECODE)
+    event_decode = dict(EVENT_DECODE)
+    if event.event_type not in event_decode:
+        return
+    message = decode_event(event)
+    if not message:
+        return
+    lines = area.toPlainText().split('\n')
+    lines.append(message)
+    if len(lines) > 10:
+        lines = lines[-10:]
+    area.setPlainText('\n'.join(lines))
+    cursor = area.textCursor()
+    cursor.movePosition(cursor.End)
+    area.setTextCursor(cursor)
+
+
+def run(app, widget, update, events, process_every):
+    """Прогнать события через виджет, периодически отдавая управление циклу событий Qt"""
+    widget.resize(600, 120)
+    widget.show()
+    app.processEvents()
+    started = time.perf_counter()
+    for i, event in enumerate(events, 1):
+        update(widget, event)
+        if i % process_every == 0:
+            app.processEvents()
+    app.processEvents()
+    elapsed = time.perf_counter() - started
+    widget.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--process-every', type=int, default=100,
+                        help='через сколько событий обрабатывать очередь Qt (перерисовка)')
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    events = list(synthetic_stream(args.events))
+
+    legacy = run(app, QTextEdit(), legacy_update, events, args.process_every)
+    panel = DecodePanel(maxlen=10)
+    ring = run(app, panel, lambda widget, event: widget.add_events([event]), events, args.process_every)
+
+    print(f"Событий: {args.events}")
+    print(f"QTextEdit (пересборка): {legacy:.2f} с, {legacy / args.events * 1e6:.1f} мкс/событие")
+    print(f"DecodePanel (кольцо):   {ring:.2f} с, {ring / args.events * 1e6:.1f} мкс/событие")
+    print(f"Строк в модели: {panel.decode_model.rowCount()}")
+
+
+if __name__ == '__main__':
+    main()
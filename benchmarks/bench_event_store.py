@@ -0,0 +1,153 @@
+"""
+Хранилище событий против линейного просмотра текстового лога (10 млн событий)
+
+Создает во временном каталоге одну и ту же историю в двух видах: файл monitor_history.log
+и EventStore (monitor/event_store.py), затем выполняет одинаковые выборки. Просмотр лога -
+чтение всех строк с разбором parse_log_line; если у фильтра есть подстрока (имя элемента),
+строки сначала отсеиваются по ней, как grep.
+
+Запуск: python -m benchmarks.bench_event_store [--events 10000000] [--workstations 50]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from monitor.event_store import EventStore
+from monitor.events import UIEvent, LogDay, parse_log_line, EVENT_CLICK, EVENT_FOCUS, EVENT_INPUT
+
+FORMS = ['Накладная', 'Реализация товаров', 'Поступление товаров', 'Счет на оплату', 'Платежное поручение',
+         'Заказ клиента', 'Возврат товаров', 'Перемещение товаров', 'Списание товаров', 'Инвентаризация']
+FIELDS = ['Контрагент', 'Договор', 'Склад', 'Номенклатура', 'Количество', 'Цена', 'Сумма', 'Комментарий',
+          'Организация', 'Дата', 'Ответственный', 'Валюта']
+BUTTONS = ['Записать', 'Провести', 'Провести и закрыть', 'Добавить', 'Подбор', 'ОК', 'Отмена']
+STEP_NS = 5_000_000  # 10 млн событий по 5 мс - 14 часов в пределах одних суток
+
+
+def generate(count, workstations, start, rng):
+    """Пачки (события, операции) по 50 000 событий"""
+    timestamp = start
+    events = []
+    operations = []
+    for i in range(count):
+        timestamp += STEP_NS
+        form = FORMS[rng.randrange(len(FORMS))]
+        roll = rng.random()
+        if roll < 0.15:
+            name = BUTTONS[rng.randrange(len(BUTTONS))]
+            event = UIEvent(EVENT_CLICK, timestamp, 'ButtonControl', name, f'Form.{name}', 'V8Button',
+                            (form, 'Командная панель', name), pid=4000 + i % 7, window=form)
+            if name == 'Записать':
+                operations.append({'operation': f'Запись: {form}', 'pattern_key': f'{form}:Записать',
+                                   'status': 'completed', 'start_ns': timestamp - 20 * STEP_NS, 'end_ns': timestamp,
+                                   'duration': rng.uniform(2, 40), 'actions': 12,
+                                   'workstation': f'ws{i % workstations:02d}'})
+        else:
+            name = FIELDS[rng.randrange(len(FIELDS))]
+            path = (form, 'Основное', name)
+            if roll < 0.55:
+                event = UIEvent(EVENT_FOCUS, timestamp, 'EditControl', name, f'Form.{name}', 'V8Edit', path,
+                                pid=4000 + i % 7, window=form)
+            else:
+                event = UIEvent(EVENT_INPUT, timestamp, 'EditControl', name, f'Form.{name}', 'V8Edit', path,
+                                str(rng.randrange(1000)), str(rng.randrange(1000)), 4000 + i % 7, form)
+        events.append(event)
+        if len(events) == 50000:
+            yield events, operations
+            events, operations = [], []
+    if events:
+        yield events, operations
+
+
+def scan(path, day, predicate, substring=None):
+    """Линейный просмотр лога: число подходящих событий"""
+    found = 0
+    day = LogDay(day)
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if substring is not None and substring not in line:
+                continue
+            event = parse_log_line(line, day)
+            if event is not None and predicate(event):
+                found += 1
+    return found
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=10_000_000)
+    parser.add_argument('--workstations', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+
+    day = datetime.now().replace(hour=6, minute=0, second=0, microsecond=0)
+    start = int(day.timestamp()) * 10**9
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, 'monitor_history.log')
+        store_path = os.path.join(directory, 'events.db')
+        store = EventStore(store_path)
+        write_time = load_time = 0.0
+        with open(log_path, 'w', encoding='utf-8') as log:
+            for events, operations in generate(args.events, args.workstations, start, rng):
+                started = time.perf_counter()
+                log.write(''.join(event.to_log_line() + '\n' for event in events))
+                write_time += time.perf_counter() - started
+                started = time.perf_counter()
+                store.append(events, operations)
+                load_time += time.perf_counter() - started
+        store.close()
+        log_size = os.path.getsize(log_path)
+        store_size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+                         if name.startswith('events.db'))
+        print(f"Событий: {args.events}")
+        print(f"Текстовый лог: {log_size / 2**20:.0f} МБ, запись {write_time:.1f} с")
+        print(f"EventStore:    {store_size / 2**20:.0f} МБ, загрузка {load_time:.1f} с"
+              f" ({args.events / load_time:.0f} событий/с)")
+
+        store = EventStore(store_path)
+        span = args.events * STEP_NS
+        minute_start = start + span // 2
+        minute_end = minute_start + 60 * 10**9
+        hour_start = start + span // 4
+        hour_end = min(hour_start + 3600 * 10**9, start + span)
+        queries = [
+            ('события за минуту',
+             lambda: store.count_events(minute_start, minute_end),
+             lambda: scan(log_path, day, lambda e: minute_start <= e.timestamp < minute_end)),
+            ('КЛИК «Записать» в «Накладная»',
+             lambda: len(list(store.events(event_type=EVENT_CLICK, name='Записать', window='Накладная'))),
+             lambda: scan(log_path, day, lambda e: e.event_type == EVENT_CLICK and e.name == 'Записать'
+                          and e.window == 'Накладная', "Name: 'Записать'")),
+            ('ВВОД «Сумма» за час',
+             lambda: store.count_events(hour_start, hour_end, event_type=EVENT_INPUT, name='Сумма'),
+             lambda: scan(log_path, day, lambda e: e.event_type == EVENT_INPUT and e.name == 'Сумма'
+                          and hour_start <= e.timestamp < hour_end, "Name: 'Сумма'")),
+            ('длительность «Накладная:Записать»',
+             lambda: sum(stats['count'] for stats in store.durations(pattern_key='Накладная:Записать').values()),
+             None),
+        ]
+        print(f"\n{'Выборка':<36} {'найдено':>9} {'EventStore, мс':>15} {'лог, мс':>11} {'ускорение':>10}")
+        for label, indexed, linear in queries:
+            found, store_time = timed(indexed)
+            if linear is None:
+                print(f"{label:<36} {found:>9} {store_time * 1000:>15.1f} {'-':>11} {'-':>10}")
+                continue
+            expected, scan_time = timed(linear)
+            mark = '' if found == expected else f" (в логе {expected})"
+            print(f"{label:<36} {found:>9} {store_time * 1000:>15.1f} {scan_time * 1000:>11.0f}"
+                  f" {scan_time / store_time:>9.0f}x{mark}")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
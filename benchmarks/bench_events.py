@@ -0,0 +1,123 @@
+"""
+CPU на событие: строки с повторным разбором регулярками против структурированных UIEvent
+
+Старый конвейер: монитор форматирует строку, анализатор разбирает ее шестью re.search,
+расшифровка в GUI разбирает ее еще раз. Новый: UIEvent идет по конвейеру как есть,
+строка формируется один раз - для лога.
+
+Запуск: python -m benchmarks.bench_events [--events 100000]
+"""
+import argparse
+import random
+import re
+import time
+
+from monitor.events import UIEvent, EVENT_INPUT, EVENT_TYPES, now_ns
+
+
+def synthetic_stream(count):
+    """Поток событий по табличной части документа"""
+    rng = random.Random(7)
+    base = ("WindowControl['Реализация товаров (создание)']", "PaneControl", "GroupControl['Товары']",
+            "TableControl['Товары']")
+    timestamp = now_ns()
+    for i in range(count):
+        event_type = EVENT_TYPES[i % 3]
+        row = rng.randrange(1, 50)
+        name = f'Количество{row}'
+        timestamp += 150_000_000
+        event = UIEvent(event_type, timestamp, 'EditControl', name, f'Field{row}', 'V8Edit',
+                        base + (f"DataItemControl['Строка {row}']", f"EditControl['{name}']"))
+        if event_type == EVENT_INPUT:
+            event.old_value, event.new_value = str(row), str(row + 1)
+        yield event
+
+
+def legacy_render(event):
+    """Форматирование строки в мониторе (как в старом UIMonitor)"""
+    info = [f"Type: {event.control_type}", f"Name: '{event.name}'",
+            f"AutomationId: '{event.automation_id}'", f"ClassName: '{event.class_name}'",
+            f"Путь: {' → '.join(event.path)}"]
+    if event.event_type == EVENT_INPUT:
+        info.append(f"Было: '{event.old_value}' → Стало: '{event.new_value}'")
+    return f"[{event.clock}] {event.event_type} → {' | '.join(info)}"
+
+
+def legacy_parse(message):
+    """Разбор строки в анализаторе (как в старом OperationAnalyzer.parse_action)"""
+    action = {}
+    timestamp_match = re.search(r'\[(\d{2}:\d{2}:\d{2}\.\d{3})\]', message)
+    if timestamp_match:
+        action['timestamp'] = timestamp_match.group(1)
+    for event_type in EVENT_TYPES:
+        if event_type in message:
+            action['event_type'] = event_type
+            break
+    type_match = re.search(r'Type: (\w+)', message)
+    if type_match:
+        action['control_type'] = type_match.group(1)
+    name_match = re.search(r"Name: '([^']*)'", message)
+    if name_match:
+        action['element_name'] = name_match.group(1)
+    path_match = re.search(r"Путь: (.+?)(?:\s*$)", message)
+    if path_match:
+        action['path'] = path_match.group(1).strip()
+    if action.get('event_type') == EVENT_INPUT:
+        value_match = re.search(r"Было: '([^']*)' → Стало: '([^']*)'", message)
+        if value_match:
+            action['old_value'], action['new_value'] = value_match.groups()
+    return action
+
+
+def legacy_decode(message):
+    """Разбор строки для расшифровки (как в старом MainWindow.update_decode)"""
+    parts = []
+    type_match = re.search(r'Type: (\w+)', message)
+    name_match = re.search(r"Name: '([^']*)'", message)
+    path_match = re.search(r"Путь: (.+?)(?:\s*\||$)", message)
+    if path_match:
+        for part in path_match.group(1).strip().split(' → '):
+            part_name_match = re.search(r"\['([^']+)'\]", part)
+            parts.append(part_name_match.group(1) if part_name_match else re.match(r'(\w+)', part).group(1))
+    if EVENT_INPUT in message:
+        re.search(r"Было: '([^']*)' → Стало: '([^']*)'", message)
+    return type_match, name_match, parts
+
+
+def structured_decode(event):
+    """Расшифровка по полям UIEvent"""
+    parts = []
+    for part in event.path:
+        type_name, _, part_name = part.partition("['")
+        parts.append(part_name[:-2] if part_name else type_name)
+    return event.control_type, event.name, parts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=100000)
+    args = parser.parse_args()
+
+    events = list(synthetic_stream(args.events))
+
+    started = time.process_time()
+    for event in events:
+        message = legacy_render(event)
+        legacy_parse(message)
+        legacy_decode(message)
+    before = (time.process_time() - started) / len(events)
+
+    started = time.process_time()
+    for event in events:
+        event.to_log_line()  # строка только для лога
+        (event.clock, event.event_type, event.control_type, event.name, event.path_text)
+        structured_decode(event)
+    after = (time.process_time() - started) / len(events)
+
+    print(f"Событий: {len(events)}")
+    print(f"Строки + регулярки: {before * 1e6:7.2f} мкс CPU на событие")
+    print(f"UIEvent:            {after * 1e6:7.2f} мкс CPU на событие ({before / after:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Несколько открытых операций одновременно: распознавание вложенной работы и время на действие
+
+Сценарий из 200 паттернов: оператор выполняет операции (триггер начала, промежуточные шаги,
+посторонние действия, триггер завершения), и часть операций прерывается на другую
+(поиск внутри создаваемого документа) с возвратом к первой. Для каждой операции известно,
+какой паттерн ее породил, поэтому считаются распознанные завершенные операции.
+
+Одна открытая операция (max_candidates=1) ведет себя как прежний анализатор: новый
+триггер начала закрывает текущую операцию.
+
+Запуск: python -m benchmarks.bench_hypotheses [--patterns 200] [--operations 2000] [--nested 0.3]
+"""
+import argparse
+import random
+import time
+
+from monitor.events import UIEvent, EVENT_CLICK, EVENT_FOCUS, EVENT_INPUT, now_ns
+from monitor.operation_analyzer import OperationAnalyzer, STATUS_COMPLETED
+
+WORDS = ['Создать', 'Записать', 'Провести', 'Закрыть', 'Найти', 'Товары', 'Услуги', 'Накладная',
+         'Контрагент', 'Склад', 'Сумма', 'Количество', 'Цена', 'Номенклатура', 'Организация',
+         'Договор', 'Подбор', 'Печать', 'Отбор', 'Период']
+NOISE = ['Комментарий', 'Ответственный', 'Валюта', 'Дата', 'Основание', 'Подразделение']
+
+
+def build_patterns(count, rng):
+    patterns = {}
+    for i in range(count):
+        phrases = [f'{rng.choice(WORDS)}{rng.randrange(1000)}' for _ in range(8)]
+        patterns[f'op{i}'] = {
+            'name': f'Операция {i}',
+            'triggers': phrases[:2],
+            'middle_triggers': phrases[2:6],
+            'completion_triggers': phrases[6:],
+        }
+    return patterns
+
+
+class Script:
+    """Поток действий с известной принадлежностью операций"""
+
+    def __init__(self, patterns, rng):
+        self.patterns = patterns
+        self.keys = list(patterns)
+        self.rng = rng
+        self.timestamp = now_ns()
+        self.actions = []
+        self.expected = []  # ключи паттернов в порядке завершения
+
+    def act(self, event_type, name):
+        self.timestamp += self.rng.randrange(300, 3000) * 1_000_000
+        path = ("WindowControl['Документ']", f"EditControl['{name}']")
+        self.actions.append(UIEvent(event_type, self.timestamp, 'EditControl', name, path=path))
+
+    def operation(self, nested_share, depth=0):
+        key = self.rng.choice(self.keys)
+        pattern = self.patterns[key]
+        self.act(EVENT_CLICK, self.rng.choice(pattern['triggers']))
+        steps = self.rng.sample(pattern['middle_triggers'], 2)
+        for index, step in enumerate(steps):
+            for _ in range(self.rng.randrange(3)):
+                self.act(EVENT_FOCUS, self.rng.choice(NOISE))
+            self.act(EVENT_INPUT, step)
+            if index == 0 and depth == 0 and self.rng.random() < nested_share:
+                # Оператор отвлекается на другую операцию и возвращается
+                self.operation(nested_share, depth + 1)
+        self.act(EVENT_CLICK, self.rng.choice(pattern['completion_triggers']))
+        self.expected.append(key)
+
+
+def run(patterns, script, max_candidates):
+    analyzer = OperationAnalyzer()
+    analyzer.patterns = patterns
+    analyzer.max_candidates = max_candidates
+    closed = []
+    analyzer.operation_listeners.append(closed.append)
+    durations = []
+    for action in script.actions:
+        started = time.perf_counter_ns()
+        analyzer.analyze_action(action)
+        durations.append(time.perf_counter_ns() - started)
+    recognized = [operation.pattern_key for operation in closed if operation.status == STATUS_COMPLETED]
+    # Совпадения с ожидаемыми завершениями (с учетом повторов ключей)
+    remaining = {}
+    for key in script.expected:
+        remaining[key] = remaining.get(key, 0) + 1
+    hits = 0
+    for key in recognized:
+        if remaining.get(key):
+            remaining[key] -= 1
+            hits += 1
+    durations.sort()
+    return {
+        'hits': hits,
+        'false': len(recognized) - hits,
+        'closed': len(closed),
+        'mean': sum(durations) / len(durations) / 1000,
+        'p99': durations[int(len(durations) * 0.99)] / 1000,
+        'max': durations[-1] / 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--patterns', type=int, default=200)
+    parser.add_argument('--operations', type=int, default=2000, help='операций верхнего уровня')
+    parser.add_argument('--nested', type=float, default=0.3, help='доля операций, прерванных вложенной')
+    parser.add_argument('--seed', type=int, default=9)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    patterns = build_patterns(args.patterns, rng)
+    script = Script(patterns, rng)
+    for _ in range(args.operations):
+        script.operation(args.nested)
+
+    print(f"Паттернов: {args.patterns}, действий: {len(script.actions)}, операций: {len(script.expected)}")
+    print(f"{'Кандидатов':<12} {'распознано':>14} {'лишних':>7} {'закрыто всего':>14}"
+          f" {'мкс/действие':>13} {'p99':>8} {'макс':>8}")
+    for max_candidates in (1, 4, 16):
+        result = run(patterns, script, max_candidates)
+        print(f"{max_candidates:<12} {result['hits']:>6}/{len(script.expected):<7} {result['false']:>7}"
+              f" {result['closed']:>14} {result['mean']:>13.1f} {result['p99']:>8.1f} {result['max']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
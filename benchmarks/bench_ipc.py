@@ -0,0 +1,169 @@
+"""
+Поток событий службы мониторинга по локальному сокету: пропускная способность и задержка
+
+Служба (EventPublisher) и подписчики (EventSubscriber) работают в разных процессах, как
+monitor.daemon и окна GUI. Пропускная способность - события UIEvent.to_dict() пачками
+без пауз, считаются доставленные события в секунду на каждого подписчика и отброшенные
+пачки. Задержка - одиночные события с заданной частотой, от publish() до получения
+подписчиком (time.monotonic_ns общий для процессов).
+
+Запуск: python -m benchmarks.bench_ipc [--events 100000] [--batch 50] [--rate 1000] [--subscribers 1 4]
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+
+from monitor.events import UIEvent, now_ns, EVENT_INPUT
+from monitor.ipc import EventPublisher, EventSubscriber
+
+
+def make_event(index):
+    name = f'Поле {index % 40}'
+    window = 'Реализация товаров (создание)'
+    event = UIEvent(EVENT_INPUT, now_ns(), 'EditControl', name, f'Field{index % 40}', 'V8Edit',
+                    (window, 'Основное', name), str(index - 1), str(index), 4100, window)
+    return event.to_dict()
+
+
+def subscriber(address, ready, results):
+    """Процесс подписчика: события до сообщения 'end', затем отчет в results"""
+    client = EventSubscriber(address).connect()
+    ready.set()
+    received = 0
+    first = None
+    latencies = []
+    for message in client.messages():
+        kind = message.get('type')
+        if kind == 'event':
+            if first is None:
+                first = time.perf_counter()
+            received += 1
+            sent = message.get('sent')
+            if sent is not None:
+                latencies.append((time.monotonic_ns() - sent) / 1e6)
+        elif kind == 'end':
+            break
+    elapsed = time.perf_counter() - first if first is not None else 0.0
+    client.close()
+    results.put((received, elapsed, latencies))
+
+
+def start_subscribers(context, address, count):
+    results = context.Queue()
+    processes = []
+    for _ in range(count):
+        ready = context.Event()
+        process = context.Process(target=subscriber, args=(address, ready, results), daemon=True)
+        process.start()
+        ready.wait(10)
+        processes.append(process)
+    return processes, results
+
+
+def wait_connected(publisher, count):
+    deadline = time.monotonic() + 5
+    while publisher.get_stats()['subscribers'] < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def collect(processes, results):
+    reports = [results.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join()
+    return reports
+
+
+def throughput(context, address, subscribers, args):
+    publisher = EventPublisher(address).start()
+    processes, results = start_subscribers(context, publisher.address, subscribers)
+    wait_connected(publisher, subscribers)
+
+    events = [dict(make_event(i), type='event') for i in range(args.batch)]
+    batches = args.events // args.batch
+    started = time.perf_counter()
+    for _ in range(batches):
+        publisher.publish_many(events)
+    publish_time = time.perf_counter() - started
+    publisher.publish({'type': 'end'})
+    reports = collect(processes, results)
+    stats = publisher.get_stats()
+    publisher.stop()
+
+    delivered = [received for received, _, _ in reports]
+    rates = [received / elapsed for received, elapsed, _ in reports if elapsed]
+    return {
+        'sent': batches * args.batch,
+        'publish_rate': batches * args.batch / publish_time,
+        'delivered': min(delivered),
+        'rate': min(rates) if rates else 0.0,
+        'dropped': stats['dropped_batches'],
+    }
+
+
+def latency(context, address, subscribers, args):
+    publisher = EventPublisher(address).start()
+    processes, results = start_subscribers(context, publisher.address, subscribers)
+    wait_connected(publisher, subscribers)
+
+    event = dict(make_event(0), type='event')
+    interval = 1.0 / args.rate
+    count = int(args.rate * args.duration)
+    next_at = time.perf_counter()
+    for _ in range(count):
+        next_at += interval
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        event['sent'] = time.monotonic_ns()
+        publisher.publish(event)
+    publisher.publish({'type': 'end'})
+    reports = collect(processes, results)
+    publisher.stop()
+
+    latencies = sorted(value for _, _, values in reports for value in values)
+    return latencies
+
+
+def percentile(values, share):
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=100000, help='событий в замере пропускной способности')
+    parser.add_argument('--batch', type=int, default=50, help='событий в пачке publish_many')
+    parser.add_argument('--rate', type=int, default=1000, help='событий в секунду в замере задержки')
+    parser.add_argument('--duration', type=float, default=3.0, help='длительность замера задержки, с')
+    parser.add_argument('--subscribers', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    addresses = [('tcp', 'tcp://127.0.0.1:0')]
+    if hasattr(socket, 'AF_UNIX'):
+        addresses.append(('unix', 'unix://' + os.path.join(tempfile.gettempdir(), f'rpa1c_bench_{os.getpid()}.sock')))
+
+    print(f"Пропускная способность: {args.events} событий пачками по {args.batch}")
+    print(f"{'Сокет':<6} {'подписчиков':>12} {'publish, соб/с':>16} {'доставлено':>14} {'соб/с на подписчика':>20}"
+          f" {'отброшено пачек':>16}")
+    for label, address in addresses:
+        for count in args.subscribers:
+            result = throughput(context, address, count, args)
+            print(f"{label:<6} {count:>12} {result['publish_rate']:>16.0f} {result['delivered']:>7}/{result['sent']:<6}"
+                  f" {result['rate']:>20.0f} {result['dropped']:>16}")
+
+    print(f"\nЗадержка доставки: {args.rate} событий/с в течение {args.duration:.0f} с")
+    print(f"{'Сокет':<6} {'подписчиков':>12} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'макс, мс':>9}")
+    for label, address in addresses:
+        for count in args.subscribers:
+            values = latency(context, address, count, args)
+            print(f"{label:<6} {count:>12} {percentile(values, 0.5):>9.3f} {percentile(values, 0.95):>9.3f}"
+                  f" {percentile(values, 0.99):>9.3f} {max(values, default=float('nan')):>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Панель лога за смену: QTextEdit.append против LogView с ограничением строк в памяти
+
+Строки добавляются пачками (как из MainWindow.drain_events); замеряется время добавления
+пачки в начале и в конце прогона и прирост памяти процесса (RSS).
+
+Запускается без дисплея (платформа Qt offscreen).
+
+Запуск: python -m benchmarks.bench_log_view [--lines 200000] [--batch 20]
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication, QTextEdit
+
+from benchmarks.bench_events import synthetic_stream
+from gui.log_view import LogView
+
+
+def rss_mb():
+    """Resident set size процесса (Linux)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return float('nan')
+
+
+def run(app, widget, append, lines, batch):
+    widget.resize(800, 400)
+    widget.show()
+    app.processEvents()
+    memory_before = rss_mb()
+    timings = []
+    started = time.perf_counter()
+    for i in range(0, len(lines), batch):
+        batch_started = time.perf_counter()
+        append(widget, lines[i:i + batch])
+        app.processEvents()
+        timings.append(time.perf_counter() - batch_started)
+    elapsed = time.perf_counter() - started
+    memory = rss_mb() - memory_before
+    widget.close()
+    tenth = max(1, len(timings) // 10)
+    first = sum(timings[:tenth]) / tenth * 1000
+    last = sum(timings[-tenth:]) / tenth * 1000
+    return elapsed, first, last, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, default=200000)
+    parser.add_argument('--batch', type=int, default=20)
+    parser.add_argument('--capacity', type=int, default=20000)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    lines = [event.to_log_line() for event in synthetic_stream(args.lines)]
+
+    results = [
+        ('LogView', run(app, LogView(capacity=args.capacity, filterable=True),
+                        lambda widget, chunk: widget.add_messages(chunk, persisted=True), lines, args.batch)),
+        ('QTextEdit', run(app, QTextEdit(),
+                          lambda widget, chunk: widget.append('\n'.join(chunk)), lines, args.batch)),
+    ]
+
+    print(f"Строк: {args.lines}, пачка: {args.batch}, лимит LogView: {args.capacity}")
+    for name, (elapsed, first, last, memory) in results:
+        print(f"{name:10} всего {elapsed:6.1f} с | пачка: в начале {first:6.2f} мс, в конце {last:6.2f} мс"
+              f" | прирост RSS {memory:7.1f} МБ")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Точность и задержка захвата кликов: опрос состояния кнопки против перехвата мыши
+
+Синтетический драйвер (monitor/mouse_hook.py) подает клики разной длительности - короткие
+(меньше шага опроса) и долгие нажатия. Для каждого клика известно точное время нажатия,
+поэтому считаются пропуски, повторы (долгое нажатие записано несколько раз),
+ошибка времени события и задержка от нажатия до выдачи события.
+
+Запуск: python -m benchmarks.bench_mouse_hook [--clicks 200] [--long 0.1] [--seed 5]
+"""
+import argparse
+import random
+import threading
+import time
+
+from monitor.events import now_ns
+from monitor.fake_provider import FakeProvider
+from monitor.ui_monitor import UIMonitor
+
+MODES = (
+    ('опрос 50 мс', dict(mouse_hook=False, poll_ceiling=0.05)),
+    ('опрос адапт.', dict(mouse_hook=False)),
+    ('перехват', dict(mouse_hook=True)),
+)
+
+
+def make_script(clicks, long_share, rng):
+    """(пауза перед нажатием, длительность нажатия) для каждого клика"""
+    script = []
+    for _ in range(clicks):
+        if rng.random() < long_share:
+            duration = rng.uniform(0.2, 0.8)
+        else:
+            duration = rng.uniform(0.005, 0.06)
+        script.append((rng.uniform(0.1, 0.4), duration))
+    return script
+
+
+def run(options, script):
+    provider = FakeProvider()
+    window = provider.create_window('Реализация товаров (создание)')
+    pane = window.add('PaneControl')
+    buttons = [pane.add('ButtonControl', f'Кнопка{i}') for i in range(len(script))]
+    provider.focused = pane
+
+    received = []
+    monitor = UIMonitor(log_focus=False, log_clicks=True, log_input=False, backend='polling',
+                        provider=provider, **options)
+    on_event = lambda event: received.append((event.name, event.timestamp, now_ns()))
+    thread = threading.Thread(target=monitor.start_monitoring,
+                              args=(lambda message: None, lambda ok, msg: None, on_event))
+    thread.start()
+    time.sleep(0.2)
+
+    pressed = {}
+    for button, (pause, duration) in zip(buttons, script):
+        time.sleep(pause)
+        pressed[button.name] = now_ns()
+        provider.press(button)
+        time.sleep(duration)
+        provider.release()
+    time.sleep(0.3)
+    monitor.stop_monitoring()
+    thread.join()
+
+    counts = {}
+    errors = []
+    latencies = []
+    for name, timestamp, emitted in received:
+        if name not in pressed:
+            continue
+        counts[name] = counts.get(name, 0) + 1
+        if counts[name] == 1:
+            errors.append((timestamp - pressed[name]) / 1e6)
+            latencies.append((emitted - pressed[name]) / 1e6)
+    duplicates = sum(count - 1 for count in counts.values())
+    return len(counts), duplicates, errors, latencies
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2] if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clicks', type=int, default=200)
+    parser.add_argument('--long', type=float, default=0.1, help='доля долгих нажатий (0.2-0.8 с)')
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    script = make_script(args.clicks, args.long, random.Random(args.seed))
+    print(f"Кликов: {args.clicks}, из них долгих: {sum(1 for _, d in script if d >= 0.2)}")
+    print(f"{'Источник':<14} {'захвачено':>10} {'повторов':>9} {'ошибка времени, мс':>20} {'задержка, мс':>16}")
+    print(f"{'':<14} {'':>10} {'':>9} {'медиана':>10} {'макс':>9} {'медиана':>8} {'макс':>7}")
+    for label, options in MODES:
+        captured, duplicates, errors, latencies = run(options, script)
+        print(f"{label:<14} {captured:>5}/{args.clicks:<4} {duplicates:>9} {median(errors):>10.2f} "
+              f"{max(errors, default=float('nan')):>9.2f} {median(latencies):>8.2f} "
+              f"{max(latencies, default=float('nan')):>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
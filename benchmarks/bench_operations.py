@@ -0,0 +1,146 @@
+"""
+Память на операцию: словари действий и UIEvent в списке против ActionLog и __slots__
+
+100 тыс. закрытых операций по 3-15 действий по полям нескольких форм 1С. Строки каждого
+действия приходят новыми объектами (как из COM). Сравниваются:
+  - исходный вид: Operation с атрибутами в __dict__, действие - словарь строк;
+  - UIEvent (номера символов) в списке у Operation с __dict__;
+  - текущий Operation: __slots__, действия в ActionLog (параллельные массивы).
+Память считается tracemalloc, включая прирост таблиц символов; затем - время обхода
+действий всех операций (сборка UIEvent по требованию).
+
+Запуск: python -m benchmarks.bench_operations [--operations 100000]
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from monitor.events import UIEvent, EVENT_CLICK, EVENT_FOCUS, EVENT_INPUT, PATH_SEPARATOR, format_clock, now_ns
+from monitor.operation_analyzer import Operation
+
+
+class DictOperation:
+    """Operation до компактного хранения: атрибуты в __dict__, списки"""
+
+    def __init__(self, operation_type, start_ns, pattern_key=None):
+        self.operation_type = operation_type
+        self.pattern_key = pattern_key
+        self.start_ns = start_ns
+        self.end_ns = None
+        self.actions = []
+        self.context = {}
+        self.completed = False
+        self.status = None
+        self.middle_triggers_matched = False
+        self.matched_middle_triggers = []
+        self.unrelated_actions_count = 0
+        self.alternative_operations = []
+
+    def add_action(self, action):
+        self.actions.append(action)
+
+
+def fresh(text):
+    """Новый объект строки с тем же текстом (как значение свойства из COM)"""
+    return None if text is None else ''.join(list(text))
+
+
+def as_dict(event_type, timestamp, control_type, name, automation_id, class_name, path, old_value, new_value):
+    """Действие в исходном виде - словарь строк"""
+    action = {'type': event_type, 'timestamp': format_clock(timestamp), 'element_type': fresh(control_type),
+              'name': fresh(name), 'automation_id': fresh(automation_id), 'class_name': fresh(class_name),
+              'path': PATH_SEPARATOR.join(fresh(segment) for segment in path)}
+    if new_value is not None:
+        action['value'] = new_value
+    return action
+
+
+def as_event(event_type, timestamp, control_type, name, automation_id, class_name, path, old_value, new_value):
+    return UIEvent(event_type, timestamp, fresh(control_type), fresh(name), fresh(automation_id), fresh(class_name),
+                   tuple(fresh(segment) for segment in path), old_value, new_value, 4100, fresh(path[0]))
+
+
+def session(count, seed):
+    """Операции: (ключ паттерна, начало, [параметры действий])"""
+    rng = random.Random(seed)
+    forms = []
+    for form in range(20):
+        title = f'Реализация товаров и услуг {form:03d} от 01.10.2026'
+        forms.append((title, [f'Поле{form}_{i}' for i in range(40)]))
+    timestamp = now_ns()
+    for number in range(count):
+        title, fields = forms[rng.randrange(len(forms))]
+        start = timestamp
+        actions = []
+        for index in range(rng.randint(3, 15)):
+            timestamp += rng.randrange(300, 3000) * 1_000_000
+            name = fields[rng.randrange(len(fields))]
+            path = (title, 'Основное', 'Товары', name)
+            if index == 0:
+                actions.append((EVENT_CLICK, timestamp, 'ButtonControl', 'Создать', 'Form.Создать', 'V8Button',
+                                (title, 'Командная панель', 'Создать'), None, None))
+            elif rng.random() < 0.4:
+                actions.append((EVENT_INPUT, timestamp, 'EditControl', name, f'Товары.{name}', 'V8Edit', path,
+                                None, str(rng.randrange(10000))))
+            else:
+                actions.append((EVENT_FOCUS, timestamp, 'EditControl', name, f'Товары.{name}', 'V8Edit', path,
+                                None, None))
+        yield f'op{number % 200}', start, actions
+
+
+def build(operation_class, make_action, args):
+    operations = []
+    for pattern_key, start, actions in session(args.operations, args.seed):
+        operation = operation_class('Операция', start, pattern_key)
+        for params in actions:
+            operation.add_action(make_action(*params))
+        operation.end_ns = actions[-1][1]
+        operation.status = 'completed'
+        operations.append(operation)
+    return operations
+
+
+def measure(operation_class, make_action, args):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    operations = build(operation_class, make_action, args)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    actions = sum(len(operation.actions) for operation in operations)
+    started = time.perf_counter()
+    for operation in operations:
+        for action in operation.actions:
+            pass
+    walk = time.perf_counter() - started
+    del operations
+    gc.collect()
+    return current, elapsed, walk, actions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--operations', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=17)
+    args = parser.parse_args()
+
+    variants = [
+        ('словари (исходный)', DictOperation, as_dict),
+        ('UIEvent в списке', DictOperation, as_event),
+        ('ActionLog + __slots__', Operation, as_event),
+    ]
+    print(f"Операций: {args.operations}")
+    print(f"{'Хранение':<24} {'память, МБ':>11} {'байт/операция':>14} {'байт/действие':>14}"
+          f" {'создание, с':>12} {'обход действий, с':>18}")
+    for label, operation_class, make_action in variants:
+        current, elapsed, walk, actions = measure(operation_class, make_action, args)
+        print(f"{label:<24} {current / 2**20:>11.1f} {current / args.operations:>14.0f} {current / actions:>14.0f}"
+              f" {elapsed:>12.1f} {walk:>18.2f}")
+
+
+if __name__ == '__main__':
+    main()
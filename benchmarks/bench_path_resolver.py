@@ -0,0 +1,68 @@
+"""
+COM-вызовы на построение пути: get_element_path против PathResolver
+
+Запуск: python -m benchmarks.bench_path_resolver [--events 10000] [--capacity 4096]
+"""
+import argparse
+import random
+import time
+
+from monitor.fake_provider import FakeProvider
+from monitor.events import format_path
+from monitor.path_resolver import PathResolver
+from monitor.ui_monitor import get_element_path
+
+
+def build_tree(provider, forms=5, rows=40, columns=8):
+    """Окно 1С с несколькими формами; у каждой табличная часть rows x columns"""
+    window = provider.create_window("1С:Предприятие")
+    cells = []
+    for f in range(forms):
+        form = window.add('PaneControl').add('PaneControl', automation_id=f'Form{f}')
+        group = form.add('GroupControl', 'Основное').add('PaneControl').add('PaneControl')
+        table = group.add('TableControl', 'Товары')
+        for r in range(rows):
+            row = table.add('DataItemControl', f'Строка {r + 1}')
+            for c in range(columns):
+                cells.append(row.add('EditControl', f'Колонка{c}', value=''))
+    return window, cells
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=10000)
+    parser.add_argument('--capacity', type=int, default=4096)
+    args = parser.parse_args()
+
+    provider = FakeProvider()
+    _, cells = build_tree(provider)
+    rng = random.Random(1)
+    # Оператор работает в одной табличной части, иногда переходя на другие формы
+    sequence = []
+    current = 0
+    for _ in range(args.events):
+        if rng.random() < 0.02:
+            current = rng.randrange(len(cells))
+        else:
+            current = (current + 1) % len(cells)
+        sequence.append(cells[current])
+
+    resolver = PathResolver(capacity=args.capacity)
+    results = {}
+    resolve_cached = lambda element: format_path(resolver.resolve(element))
+    for label, resolve in (('get_element_path', get_element_path), ('PathResolver', resolve_cached)):
+        provider.reset_calls()
+        started = time.perf_counter()
+        paths = [resolve(element) for element in sequence]
+        elapsed = time.perf_counter() - started
+        results[label] = paths
+        print(f"{label:<18} COM-вызовов на событие: {provider.com_calls / len(sequence):6.2f} | "
+              f"{elapsed / len(sequence) * 1e6:7.1f} мкс на событие")
+
+    assert results['get_element_path'] == results['PathResolver'], "пути расходятся"
+    stats = resolver.get_stats()
+    print(f"Кэш: {stats['size']} записей, попаданий {stats['hit_rate']:.1%}, вытеснено {stats['evictions']}")
+
+
+if __name__ == '__main__':
+    main()
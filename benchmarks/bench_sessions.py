@@ -0,0 +1,186 @@
+"""
+Мониторинг 20 окон 1С: один общий цикл захвата против отдельного монитора на каждое окно
+
+Тестовый провайдер: окна нескольких процессов 1С (у части процессов по несколько окон)
+и окно постороннего процесса. Сценарий переводит фокус, вводит значения и нажимает кнопки
+в случайных окнах, затем закрывает часть окон и открывает новые. Для каждого действия
+известны процесс и окно, поэтому считаются пропуски, повторы и события с чужим окном.
+
+Отдельный монитор на окно имитируется привязкой каждого UIMonitor к своему классу окна.
+
+Запуск: python -m benchmarks.bench_sessions [--windows 20] [--processes 8] [--steps 150] [--call-cost 0.00005]
+"""
+import argparse
+import random
+import threading
+import time
+
+from monitor.events import now_ns, EVENT_CLICK, EVENT_FOCUS, EVENT_INPUT
+from monitor.fake_provider import FakeProvider
+from monitor.ui_monitor import UIMonitor
+
+
+class Desktop:
+    """Окна 1С на тестовом провайдере"""
+
+    def __init__(self, provider, processes):
+        self.provider = provider
+        self.processes = processes
+        self.count = 0
+        self.windows = []
+        self.forms = {}  # окно -> (поля, кнопки)
+
+    def open(self):
+        index = self.count
+        self.count += 1
+        pid = 2000 + index % self.processes
+        window = self.provider.create_window(f'Документ {index}', class_name=f'V8Frame{index}', process_id=pid)
+        pane = window.add('PaneControl')
+        fields = [pane.add('EditControl', f'Поле {index}.{i}', value='0') for i in range(5)]
+        buttons = [pane.add('ButtonControl', f'Кнопка {index}.{i}') for i in range(2)]
+        self.windows.append(window)
+        self.forms[window] = (fields, buttons)
+        return window
+
+    def close(self, window):
+        self.windows.remove(window)
+        for element in [window] + [e for group in self.forms.pop(window) for e in group]:
+            self.provider.elements.pop(element.point, None)
+        self.provider.close_window(window)
+
+
+def start(monitor):
+    monitor.log_messages = []
+    thread = threading.Thread(target=monitor.start_monitoring,
+                              args=(monitor.log_messages.append, lambda ok, msg: None,
+                                    lambda event: monitor.received.append((event, now_ns()))))
+    thread.start()
+    return thread
+
+
+def run(mode, backend, args):
+    rng = random.Random(args.seed)
+    provider = FakeProvider(call_cost=args.call_cost)
+    desktop = Desktop(provider, args.processes)
+    for _ in range(args.windows):
+        desktop.open()
+    # Посторонний процесс на том же рабочем столе
+    stranger = provider.create_window('Блокнот', class_name='Notepad', process_id=9999)
+    provider.process_names[9999] = 'notepad.exe'
+    stranger.add('EditControl', 'Текст', value='')
+    provider.focused = stranger
+
+    received = []
+    if mode == 'общий':
+        monitor = UIMonitor(backend=backend, provider=provider, rescan_interval=args.rescan)
+        monitor.received = received
+        monitors = [monitor]
+    else:
+        monitors = []
+        for window in desktop.windows:
+            monitor = UIMonitor(backend=backend, provider=provider, window_classes=[window.class_name],
+                                rescan_interval=args.rescan)
+            monitor.received = received
+            monitors.append(monitor)
+    threads = [start(monitor) for monitor in monitors]
+    time.sleep(0.5)
+
+    calls_before = provider.com_calls
+    cpu_before = time.process_time()
+    time.sleep(args.idle)
+    idle_calls = (provider.com_calls - calls_before) / args.idle
+    idle_cpu = (time.process_time() - cpu_before) / args.idle * 100
+
+    expected = {}  # (тип, имя) -> (pid, заголовок окна, время действия)
+    reopened = args.steps // 2
+    for step in range(args.steps):
+        if step == reopened:
+            # Часть окон закрывается, открываются новые (в том числе в новых процессах)
+            for window in rng.sample(desktop.windows, args.windows // 4):
+                desktop.close(window)
+            for _ in range(args.windows // 4):
+                desktop.open()
+            time.sleep(args.rescan * 2)
+        window = rng.choice(desktop.windows)
+        fields, buttons = desktop.forms[window]
+        truth = (window.process_id, window.name)
+        if rng.random() < 0.7:
+            field = rng.choice(fields)
+            field.name = f'Поле_{step}'
+            expected[(EVENT_FOCUS, field.name)] = truth + (now_ns(),)
+            provider.focus(field)
+            time.sleep(args.pause)
+            expected[(EVENT_INPUT, field.name)] = truth + (now_ns(),)
+            provider.type_text(field, str(step))
+        else:
+            button = rng.choice(buttons)
+            button.name = f'Кнопка_{step}'
+            expected[(EVENT_CLICK, button.name)] = truth + (now_ns(),)
+            provider.click(button, duration=0.01)
+        time.sleep(args.pause)
+    time.sleep(0.5)
+
+    for monitor in monitors:
+        monitor.stop_monitoring()
+    for thread in threads:
+        thread.join()
+
+    seen = {}
+    wrong_window = 0
+    stray = 0
+    latencies = []
+    for event, emitted in received:
+        key = (event.event_type, event.name)
+        if key not in expected:
+            stray += 1
+            continue
+        seen[key] = seen.get(key, 0) + 1
+        pid, title, sent = expected[key]
+        if (event.pid, event.window) != (pid, title):
+            wrong_window += 1
+        if seen[key] == 1:
+            latencies.append((emitted - sent) / 1e6)
+    latencies.sort()
+    duplicates = sum(count - 1 for count in seen.values())
+    median = latencies[len(latencies) // 2] if latencies else float('nan')
+    return {
+        'threads': len(threads),
+        'idle_calls': idle_calls,
+        'idle_cpu': idle_cpu,
+        'captured': len(seen),
+        'expected': len(expected),
+        'duplicates': duplicates,
+        'wrong_window': wrong_window,
+        'stray': stray,
+        'median': median,
+        'sessions': monitors[0].sessions.get_stats() if mode == 'общий' else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--windows', type=int, default=20)
+    parser.add_argument('--processes', type=int, default=8, help='процессов 1С (окна распределяются по ним)')
+    parser.add_argument('--steps', type=int, default=150, help='действий оператора')
+    parser.add_argument('--pause', type=float, default=0.06, help='пауза между действиями, с')
+    parser.add_argument('--idle', type=float, default=2.0, help='длительность простоя, с')
+    parser.add_argument('--rescan', type=float, default=0.5, help='интервал поиска новых окон, с')
+    parser.add_argument('--call-cost', type=float, default=0.00005, help='стоимость COM-вызова, с')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"Окон: {args.windows}, процессов 1С: {args.processes}, действий: {args.steps}")
+    print(f"{'Режим':<22} {'потоков':>8} {'вызовов/с':>10} {'CPU':>7} {'захвачено':>11} {'повторов':>9}"
+          f" {'чужое окно':>11} {'медиана, мс':>12}")
+    for backend in ('events', 'polling'):
+        for mode in ('общий', 'окно-монитор'):
+            result = run(mode, backend, args)
+            print(f"{backend + ', ' + mode:<22} {result['threads']:>8} {result['idle_calls']:>10.0f}"
+                  f" {result['idle_cpu']:>6.2f}% {result['captured']:>5}/{result['expected']:<5}"
+                  f" {result['duplicates']:>9} {result['wrong_window']:>11} {result['median']:>12.2f}")
+            if result['sessions']:
+                print(f"  реестр: {result['sessions']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+COM-вызовы за проход опроса: отдельное чтение свойств каждым детектором против общего снимка
+
+Старый проход: check_for_clicks, monitor_events и monitor_input сами запрашивают элементы
+и каждый заново читает ProcessId, ControlTypeName, Name, AutomationId, ValuePattern.
+Новый: UIMonitor.poll - элемент в фокусе запрашивается один раз, свойства читаются
+лениво и запоминаются в снимке (monitor/snapshot.py).
+Пакетный: то же, но все свойства элемента и его предков приходят одним вызовом
+на элемент (CacheRequest в UIAutomationProvider, fetch_* в тестовом провайдере).
+
+Запуск: python -m benchmarks.bench_snapshot [--ticks 2000] [--call-cost 0.00005]
+"""
+import argparse
+import random
+import time
+
+from monitor.fake_provider import FakeProvider
+from monitor.snapshot import ElementSnapshot
+from monitor.ui_monitor import UIMonitor
+
+SCENARIOS = {
+    'простой': 'фокус стоит на поле, ничего не меняется',
+    'переходы': 'фокус переходит на новую ячейку каждый проход',
+    'ввод': 'значение поля меняется каждый проход',
+    'клик': 'кнопка мыши зажата над кнопкой формы',
+}
+
+
+def build(call_cost):
+    provider = FakeProvider(call_cost)
+    window = provider.create_window('Реализация товаров (создание)')
+    form = window.add('PaneControl')
+    table = form.add('TableControl', 'Товары')
+    cells = [table.add('DataItemControl', f'Строка {row}').add('EditControl', 'Количество', value=str(row))
+             for row in range(1, 200)]
+    button = form.add('ButtonControl', 'Записать')
+    return provider, window, cells, button
+
+
+def legacy_poll(monitor, window):
+    """Проход опроса в прежнем виде: каждый детектор читает элементы сам"""
+    provider = monitor.provider
+    if provider.is_left_button_down():
+        x, y = provider.get_cursor_pos()
+        monitor.handle_click(window, provider.element_from_point(x, y))
+    monitor.handle_focus(window, provider.get_focused())
+    monitor.handle_input(window, provider.get_focused())
+
+
+def run(scenario, mode, ticks, call_cost):
+    """mode: 'legacy' - прежний проход, 'snapshot' - общий снимок, 'batch' - снимок с пакетным чтением"""
+    provider, window, cells, button = build(call_cost)
+    shared = mode != 'legacy'
+    monitor = UIMonitor(provider=provider, batch_properties=mode == 'batch')
+    monitor.event_callback = lambda event: None
+    rng = random.Random(3)
+    provider.focused = cells[0]
+    if scenario == 'клик':
+        provider.cursor = button.point
+        provider.button_down = True
+    if shared:
+        # Как в PollingBackend.run: ProcessId окна читается один раз за сеанс
+        window = ElementSnapshot(window)
+
+    provider.reset_calls()
+    started = time.perf_counter()
+    for i in range(ticks):
+        if scenario == 'переходы':
+            provider.focused = rng.choice(cells)
+        elif scenario == 'ввод':
+            provider.focused.value = str(i)
+        elif scenario == 'клик':
+            # Защита от дублирования кликов - 50 мс; сдвигаем время последнего клика
+            monitor.last_invoke_time = 0
+        if shared:
+            monitor.poll(window)
+        else:
+            legacy_poll(monitor, window)
+    elapsed = time.perf_counter() - started
+    return provider.com_calls / ticks, elapsed / ticks * 1e6, monitor.get_tick_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--ticks', type=int, default=2000)
+    parser.add_argument('--call-cost', type=float, default=0.00005,
+                        help='имитация стоимости COM-вызова, с (межпроцессный вызов к 1С)')
+    args = parser.parse_args()
+
+    print(f"Проходов: {args.ticks}, стоимость COM-вызова: {args.call_cost * 1e6:.0f} мкс")
+    print(f"{'Сценарий':10} {'вызовов/проход: прежний -> снимок -> пакет':>44} {'мкс/проход':>26}")
+    for scenario, description in SCENARIOS.items():
+        legacy_calls, legacy_us, _ = run(scenario, 'legacy', args.ticks, args.call_cost)
+        shared_calls, shared_us, _ = run(scenario, 'snapshot', args.ticks, args.call_cost)
+        calls, us, _ = run(scenario, 'batch', args.ticks, args.call_cost)
+        print(f"{scenario:10} {legacy_calls:16.1f} -> {shared_calls:5.1f} -> {calls:5.1f} ({legacy_calls / calls:3.1f}x)"
+              f" {legacy_us:8.0f} -> {shared_us:6.0f} -> {us:6.0f}   # {description}")
+
+
+if __name__ == '__main__':
+    main()
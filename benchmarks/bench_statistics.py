@@ -0,0 +1,109 @@
+"""
+Статистика операций: проход по всем закрытым операциям против накопительных агрегатов
+
+GUI вызывает get_statistics() после каждой завершенной операции. Прежняя реализация дважды
+проходила completed_operations, поэтому за смену стоимость растет квадратично; текущая
+читает агрегаты monitor/statistics.py, обновленные при закрытии операции.
+Замеряется стоимость вызова при разном числе закрытых операций, время добавления операции,
+выборки по паттерну и за час, и точность процентилей скетча против точных.
+
+Запуск: python -m benchmarks.bench_statistics [--operations 100000] [--patterns 200]
+"""
+import argparse
+import random
+import time
+
+from monitor.events import now_ns
+from monitor.operation_analyzer import Operation, STATUS_COMPLETED, STATUS_INTERRUPTED, STATUS_CANCELLED
+from monitor.statistics import OperationStatistics
+
+
+def legacy_statistics(operations):
+    """get_statistics до накопительных агрегатов"""
+    if not operations:
+        return "Нет завершенных операций"
+    total = len(operations)
+    completed = sum(1 for op in operations if op.completed)
+    interrupted = total - completed
+    avg_duration = sum(op.get_duration() for op in operations) / total
+    return f"📈 Статистика: {total} операций | ✅ {completed} завершено | ⚠️ {interrupted} прервано | ⏱️ Средняя длительность: {avg_duration:.1f}с"
+
+
+def make_operations(count, patterns, rng):
+    """Закрытые операции: длительность логнормальная (медиана ~12 с), операции идут подряд"""
+    timestamp = now_ns()
+    operations = []
+    for _ in range(count):
+        duration = rng.lognormvariate(2.5, 0.8)
+        operation = Operation('Операция', timestamp, f'op{rng.randrange(patterns)}')
+        operation.end_ns = timestamp + int(duration * 1e9)
+        roll = rng.random()
+        operation.status = STATUS_COMPLETED if roll < 0.8 else STATUS_INTERRUPTED if roll < 0.95 else STATUS_CANCELLED
+        operation.completed = operation.status == STATUS_COMPLETED
+        operations.append(operation)
+        timestamp = operation.end_ns + rng.randrange(1, 10) * 10**9
+    return operations
+
+
+def per_call(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--operations', type=int, default=100_000)
+    parser.add_argument('--patterns', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=4)
+    args = parser.parse_args()
+
+    operations = make_operations(args.operations, args.patterns, random.Random(args.seed))
+    statistics = OperationStatistics()
+    checkpoints = sorted({n for n in (1000, 10_000, 100_000, args.operations) if n <= args.operations})
+
+    print(f"Закрытых операций: {args.operations}, паттернов: {args.patterns}")
+    print(f"{'Операций':>9} {'проход, мкс':>12} {'агрегаты, мкс':>14}")
+    added = 0
+    add_time = 0.0
+    legacy_total = 0.0
+    previous = 0
+    for checkpoint in checkpoints:
+        started = time.perf_counter()
+        for operation in operations[added:checkpoint]:
+            statistics.add(operation)
+        add_time += time.perf_counter() - started
+        added = checkpoint
+        closed = operations[:checkpoint]
+        legacy = per_call(lambda: legacy_statistics(closed), max(1, 2000 // (checkpoint // 1000)))
+        current = per_call(lambda: statistics.query().to_dict(), 200)
+        # Вызов после каждой операции: стоимость растет линейно, сумма за смену - квадратично
+        legacy_total += legacy * (checkpoint - previous) * (checkpoint + previous) / 2 / checkpoint / 1e6
+        previous = checkpoint
+        print(f"{checkpoint:>9} {legacy:>12.0f} {current:>14.0f}")
+    print(f"Добавление операции в агрегаты: {add_time / args.operations * 1e6:.2f} мкс")
+    print(f"Вызов после каждой из {args.operations} операций: проход ~{legacy_total:.0f} с,"
+          f" агрегаты ~{current * args.operations / 1e6:.1f} с")
+
+    last = operations[-1].start_ns
+    hour = (last - 3600 * 10**9, last + 1)
+    print(f"\nПаттерн op0: {per_call(lambda: statistics.query('op0').to_dict(), 200):.0f} мкс,"
+          f" последний час: {per_call(lambda: statistics.query(start=hour[0], end=hour[1]).to_dict(), 20):.0f} мкс,"
+          f" op0 за час: {per_call(lambda: statistics.query('op0', *hour).to_dict(), 20):.0f} мкс")
+
+    durations = sorted(operation.get_duration() for operation in operations)
+    sketch = statistics.query()
+    print(f"\n{'Процентиль':<11} {'точно, с':>9} {'скетч, с':>9} {'ошибка':>8}")
+    for q in (0.5, 0.95, 0.99):
+        exact = durations[int(q * (len(durations) - 1))]
+        estimate = sketch.sketch.quantile(q)
+        print(f"p{int(q * 100):<10} {exact:>9.2f} {estimate:>9.2f} {abs(estimate - exact) / exact:>7.2%}")
+    hits = [op for op in operations if hour[0] <= op.start_ns < hour[1]]
+    print(f"Операций за час: точно {len(hits)}, по корзинам {statistics.query(start=hour[0], end=hour[1]).count}"
+          f" (период округляется до минуты)")
+    print(f"Корзин: {statistics.get_stats()['buckets']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Память на событие: строки в каждом событии против номеров из таблицы символов
+
+Синтетический сеанс в 1 млн событий по нескольким формам 1С; заголовок окна меняется
+с номером документа (каждые 50 событий). Как и при чтении через COM, каждое свойство
+элемента и каждый сегмент пути приходят новой строкой. Прежний UIEvent (строки и кортеж пути
+в слотах) сравнивается с текущим (тип, AutomationId и класс - номера из monitor/symbols.py).
+Память считается tracemalloc: все, что выделено при создании событий и осталось занятым,
+включая прирост таблицы символов; размер таблицы не зависит от числа документов.
+
+Запуск: python -m benchmarks.bench_symbols [--events 1000000] [--forms 20]
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from monitor.events import UIEvent, EVENT_FOCUS, EVENT_INPUT, now_ns
+from monitor.path_resolver import render_path
+from monitor.symbols import SYMBOLS
+
+
+class LegacyEvent:
+    """UIEvent до таблицы символов: строки и кортеж пути в слотах"""
+    __slots__ = ('event_type', 'timestamp', 'control_type', 'name', 'automation_id',
+                 'class_name', 'path', 'old_value', 'new_value', 'pid', 'window')
+
+    def __init__(self, event_type, timestamp, control_type='', name='', automation_id='',
+                 class_name='', path=(), old_value=None, new_value=None, pid=None, window=None):
+        self.event_type = event_type
+        self.timestamp = timestamp
+        self.control_type = control_type
+        self.name = name
+        self.automation_id = automation_id
+        self.class_name = class_name
+        self.path = path
+        self.old_value = old_value
+        self.new_value = new_value
+        self.pid = pid
+        self.window = window
+
+
+def fresh(text):
+    """Новый объект строки с тем же текстом (как значение свойства из COM)"""
+    return ''.join(list(text))
+
+
+def session(count, forms, rng):
+    """Параметры событий: тип, время, свойства элемента, описания предков для пути"""
+    layouts = []
+    for form in range(forms):
+        title = f'Реализация товаров и услуг {form:03d}'
+        fields = [(f'Поле{form}_{i}', f'ТабличнаяЧасть.Товары.Поле{i}') for i in range(40)]
+        layouts.append((title, fields))
+    timestamp = now_ns()
+    for i in range(count):
+        title, fields = layouts[rng.randrange(forms)]
+        title = f'{title} № {i // 50:08d} от 01.10.2026'
+        name, automation_id = fields[rng.randrange(len(fields))]
+        timestamp += 100_000_000
+        descriptors = [('EditControl', name), ('DataItemControl', 'Строка'), ('TableControl', 'Товары'),
+                       ('PaneControl', ''), ('GroupControl', 'Основное'), ('WindowControl', title)]
+        event_type = EVENT_INPUT if i % 3 == 0 else EVENT_FOCUS
+        yield event_type, timestamp, name, automation_id, title, descriptors, str(i % 1000)
+
+
+def build(event_class, count, forms, seed):
+    rng = random.Random(seed)
+    events = []
+    for event_type, timestamp, name, automation_id, title, descriptors, value in session(count, forms, rng):
+        path = render_path([(fresh(control_type), fresh(label)) for control_type, label in descriptors])
+        events.append(event_class(event_type, timestamp, fresh('EditControl'), fresh(name), fresh(automation_id),
+                                  fresh('V8Edit'), path, None, value, 4100, fresh(title)))
+    return events
+
+
+def measure(event_class, args):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    events = build(event_class, args.events, args.forms, args.seed)
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    sample = events[len(events) // 2]
+    path_text = ' → '.join(sample.path)
+    del events
+    gc.collect()
+    return current, elapsed, path_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=1_000_000)
+    parser.add_argument('--forms', type=int, default=20, help='форм (окон) в сеансе, по 40 полей')
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+
+    print(f"Событий: {args.events}, форм: {args.forms}")
+    print(f"{'Событие':<22} {'память, МБ':>11} {'байт на событие':>16} {'создание, мкс':>14}")
+    results = {}
+    for label, event_class in (('строки (прежний)', LegacyEvent), ('номера символов', UIEvent)):
+        current, elapsed, path_text = measure(event_class, args)
+        results[label] = path_text
+        print(f"{label:<22} {current / 2**20:>11.1f} {current / args.events:>16.0f}"
+              f" {elapsed / args.events * 1e6:>14.2f}")
+    print(f"\nТаблица символов: {SYMBOLS.get_stats()}")
+    same = len(set(results.values())) == 1
+    print(f"Пути совпадают: {'да' if same else 'нет'}")
+
+
+if __name__ == '__main__':
+    main()
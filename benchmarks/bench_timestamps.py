@@ -0,0 +1,149 @@
+"""
+Время операций целыми наносекундами против строк ЧЧ:ММ:СС.ммм и strptime
+
+Прежний анализатор хранил начало и конец операции строками и разбирал их strptime при каждом
+действии (таймаут), в каждом to_string() и в get_statistics() (проход по всем закрытым
+операциям), которое GUI вызывает после каждой завершенной операции. Прогон повторяет этот
+цикл GUI для прежних операций и статистики (LegacyOperation, LegacyAnalyzer) и текущих.
+
+Вторая часть - операции через полночь: без даты в строках длительность становилась
+отрицательной; разбор старого лога с LogDay переносит строки после полуночи на следующие сутки.
+
+Запуск: python -m benchmarks.bench_timestamps [--operations 1500] [--patterns 200]
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+import monitor.operation_analyzer as operation_analyzer
+from benchmarks.bench_hypotheses import Script, build_patterns
+from monitor.events import LogDay, format_clock, parse_log_line
+from monitor.operation_analyzer import Operation, OperationAnalyzer
+
+
+class LegacyOperation(Operation):
+    """Operation до перехода на целые нс: время строкой, длительность через strptime"""
+
+    def __init__(self, operation_type, start_ns, pattern_key=None):
+        super().__init__(operation_type, start_ns, pattern_key)
+        self.start_clock = format_clock(start_ns)
+        self.end_clock = None
+
+    def add_action(self, action):
+        super().add_action(action)
+        self.end_clock = action.clock
+
+    def get_duration(self):
+        try:
+            start = datetime.strptime(self.start_clock, "%H:%M:%S.%f")
+            end = datetime.strptime(self.end_clock, "%H:%M:%S.%f")
+            return (end - start).total_seconds()
+        except:
+            return 0
+
+
+class LegacyAnalyzer(OperationAnalyzer):
+    """Прежние проверка таймаута (strptime времени действия и конца текущей операции) и статистика"""
+
+    def __init__(self):
+        super().__init__()
+        self.completed_operations = []
+
+    def analyze_action(self, action):
+        operation = self.current_operation
+        if operation is not None:
+            last_action_time = datetime.strptime(operation.end_clock, "%H:%M:%S.%f")
+            current = datetime.strptime(action.clock, "%H:%M:%S.%f")
+            self.timed_out = (current - last_action_time).total_seconds() > self.operation_timeout
+        return super().analyze_action(action)
+
+    def get_statistics(self):
+        total = len(self.completed_operations)
+        completed = sum(1 for op in self.completed_operations if op.completed)
+        avg_duration = sum(op.get_duration() for op in self.completed_operations) / total
+        return f"📈 Статистика: {total} операций | ✅ {completed} завершено | ⏱️ Средняя длительность: {avg_duration:.1f}с"
+
+
+def run(analyzer_class, patterns, actions):
+    """Цикл GUI: действие -> анализатор, после завершения операции - статистика"""
+    analyzer = analyzer_class()
+    analyzer.patterns = patterns
+    closed = []
+    analyzer.operation_listeners.append(closed.append)
+    seen = 0
+    started = time.perf_counter()
+    for action in actions:
+        analyzer.analyze_action(action)
+        if len(closed) > seen:
+            seen = len(closed)
+            analyzer.get_statistics()
+    return time.perf_counter() - started, closed
+
+
+def legacy_run(patterns, actions):
+    # Анализатор создает операции классом из своего модуля - на время прогона подменяем его
+    operation_analyzer.Operation = LegacyOperation
+    try:
+        return run(LegacyAnalyzer, patterns, actions)
+    finally:
+        operation_analyzer.Operation = Operation
+
+
+def midnight(patterns, rng):
+    """Операции, начатые перед полуночью: длительности и разбор лога"""
+    script = Script(patterns, rng)
+    start = int(datetime.now().replace(hour=23, minute=50, second=0, microsecond=0).timestamp()) * 10**9
+    script.timestamp = start
+    while script.timestamp < start + 20 * 60 * 10**9:
+        script.operation(0.3)
+
+    results = {}
+    for label, runner in (('строки и strptime', legacy_run), ('целые нс', lambda p, a: run(OperationAnalyzer, p, a))):
+        _, closed = runner(patterns, script.actions)
+        durations = [operation.get_duration() for operation in closed]
+        results[label] = (len(durations), sum(1 for duration in durations if duration < 0), min(durations))
+
+    lines = [action.to_log_line() for action in script.actions]
+    day = datetime.fromtimestamp(script.actions[0].timestamp // 10**9)
+    per_line = [parse_log_line(line, day).timestamp for line in lines]
+    log_day = LogDay(day)
+    rolled = [parse_log_line(line, log_day).timestamp for line in lines]
+    original = [action.timestamp // 10**6 * 10**6 for action in script.actions]
+    return results, sum(a == b for a, b in zip(per_line, original)), sum(a == b for a, b in zip(rolled, original)), \
+        len(lines), log_day.rollovers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--operations', type=int, default=1500)
+    parser.add_argument('--patterns', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    patterns = build_patterns(args.patterns, rng)
+    script = Script(patterns, rng)
+    for _ in range(args.operations):
+        script.operation(0.3)
+    actions = script.actions
+
+    print(f"Действий: {len(actions)}, паттернов: {args.patterns}")
+    print(f"{'Время операций':<20} {'всего, с':>9} {'действий/с':>11} {'мкс/действие':>13}")
+    outputs = []
+    for label, runner in (('строки и strptime', legacy_run), ('целые нс', lambda p, a: run(OperationAnalyzer, p, a))):
+        elapsed, closed = runner(patterns, actions)
+        outputs.append([round(operation.get_duration(), 3) for operation in closed])
+        print(f"{label:<20} {elapsed:>9.2f} {len(actions) / elapsed:>11.0f} {elapsed / len(actions) * 1e6:>13.1f}")
+    print(f"Длительности операций совпадают: {'да' if outputs[0] == outputs[1] else 'нет'}")
+
+    results, per_line, rolled, lines, rollovers = midnight(patterns, random.Random(args.seed))
+    print("\nОперации с 23:50 до 00:10:")
+    for label, (count, negative, shortest) in results.items():
+        print(f"  {label:<20} операций {count}, отрицательных длительностей {negative}, минимум {shortest:.1f} с")
+    print(f"Разбор лога ({lines} строк): дата на строку - верно {per_line},"
+          f" LogDay - верно {rolled} (переходов через полночь: {rollovers})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Сопоставление триггеров: регулярка на каждый триггер против скомпилированного индекса
+
+Запуск: python -m benchmarks.bench_triggers [--patterns 500] [--triggers 20] [--actions 2000]
+"""
+import argparse
+import random
+import re
+import time
+
+from monitor.events import UIEvent, EVENT_TYPES, now_ns
+from monitor.operation_analyzer import OperationAnalyzer
+
+WORDS = ['Создать', 'Записать', 'Провести', 'Закрыть', 'Найти', 'Товары', 'Услуги', 'Накладная',
+         'Контрагент', 'Склад', 'Сумма', 'Количество', 'Цена', 'Номенклатура', 'Организация',
+         'Договор', 'Подбор', 'Печать', 'Отбор', 'Период']
+
+
+def build_patterns(count, triggers, rng):
+    patterns = {}
+    for i in range(count):
+        phrases = [f'{rng.choice(WORDS)}{rng.randrange(1000)}' for _ in range(triggers)]
+        patterns[f'op{i}'] = {
+            'name': f'Операция {i}',
+            'triggers': phrases[:triggers // 2],
+            'middle_triggers': phrases[triggers // 2:-2] + ['ВВОД'],
+            'completion_triggers': phrases[-2:],
+        }
+    return patterns
+
+
+def build_actions(count, patterns, rng):
+    all_triggers = [t for p in patterns.values() for t in p['triggers'] + p['completion_triggers']]
+    actions = []
+    for i in range(count):
+        name = rng.choice(all_triggers) if rng.random() < 0.1 else rng.choice(WORDS)
+        path = ("WindowControl['Реализация товаров']", "GroupControl['Товары']", f"EditControl['{name}']")
+        actions.append(UIEvent(EVENT_TYPES[i % 3], now_ns() + i * 10**8, 'EditControl', name, path=path))
+    return actions
+
+
+def match_trigger(trigger, text):
+    """Прежняя проверка OperationAnalyzer: триггер в тексте с учетом границ слов"""
+    if not text:
+        return False
+    text = text.strip()
+    # Тип события (ВВОД, КЛИК, ФОКУС) - точное совпадение
+    if trigger in EVENT_TYPES:
+        return trigger == text
+    pattern = r'\b' + re.escape(trigger) + r'\b'
+    return bool(re.search(pattern, text, re.IGNORECASE))
+
+
+def legacy_scan(analyzer, action):
+    """Старая схема: match_trigger для каждого триггера каждого паттерна по трем полям"""
+    matched = []
+    fields = (action.name, action.event_type, action.path_text)
+    for pattern_key, pattern in analyzer.patterns.items():
+        for kind in ('triggers', 'middle_triggers'):
+            for trigger in pattern[kind]:
+                if any(match_trigger(trigger, field) for field in fields):
+                    matched.append((pattern_key, kind, trigger))
+        for trigger in pattern['completion_triggers']:
+            if match_trigger(trigger, action.name):
+                matched.append((pattern_key, 'completion_triggers', trigger))
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--patterns', type=int, default=500)
+    parser.add_argument('--triggers', type=int, default=20)
+    parser.add_argument('--actions', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    patterns = build_patterns(args.patterns, args.triggers, rng)
+    analyzer = OperationAnalyzer()
+
+    started = time.perf_counter()
+    analyzer.patterns = patterns
+    build_time = time.perf_counter() - started
+
+    actions = build_actions(args.actions, patterns, rng)
+    legacy_sample = actions[:max(1, args.actions // 20)]
+
+    started = time.perf_counter()
+    for action in legacy_sample:
+        legacy_scan(analyzer, action)
+    legacy = (time.perf_counter() - started) / len(legacy_sample)
+
+    started = time.perf_counter()
+    for action in actions:
+        analyzer.trigger_index.scan(action.name, action.event_type, action.path_text)
+    indexed = (time.perf_counter() - started) / len(actions)
+
+    started = time.perf_counter()
+    for action in actions:
+        analyzer.analyze_action(action)
+    full = (time.perf_counter() - started) / len(actions)
+
+    print(f"Паттернов: {args.patterns}, триггеров в паттерне: {args.triggers}")
+    print(f"Сборка индекса:          {build_time * 1000:9.1f} мс")
+    print(f"re.search на триггер:    {legacy * 1e6:9.1f} мкс на действие")
+    print(f"Индекс Ахо-Корасик:      {indexed * 1e6:9.1f} мкс на действие ({legacy / indexed:.0f}x)")
+    print(f"analyze_action целиком:  {full * 1e6:9.1f} мкс на действие")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Длительная сессия ввода в табличные части: неограниченный словарь значений против ValueTracker
+
+Имитируется смена оператора (по умолчанию 10 часов) на тестовом провайдере: открываются формы
+документов, оператор проходит по ячейкам табличной части (у каждой ячейки свой RuntimeId)
+и часть из них меняет. Большинство форм закрывается, часть остается открытой.
+Время модельное - прогон идет с максимальной скоростью.
+
+Запуск: python -m benchmarks.bench_value_tracker [--hours 10] [--rate 5] [--capacity 10000] [--ttl 3600]
+"""
+import argparse
+import random
+import sys
+import time
+
+from monitor.fake_provider import FakeProvider
+from monitor.ui_monitor import UIMonitor
+from monitor.value_tracker import ValueTracker, _ENTRY_OVERHEAD
+
+COLUMNS = ('Номенклатура', 'Количество', 'Цена', 'Сумма', 'Склад')
+
+
+class UnboundedValues(dict):
+    """Прежнее хранилище: словарь без вытеснения"""
+
+    def set(self, element_id, value, scope=None):
+        self[element_id] = value
+
+    def drop_scope(self, scope):
+        return 0
+
+    def sweep(self):
+        return 0
+
+    def approx_bytes(self):
+        return sys.getsizeof(self) + sum(sys.getsizeof(key) + sys.getsizeof(value) + _ENTRY_OVERHEAD
+                                         for key, value in self.items())
+
+
+def simulate(values, hours, rate, rows, keep_open, seed):
+    """Прогнать сессию через UIMonitor.handle_input; возвращает (почасовые размеры, событий, мкс на вызов)"""
+    rng = random.Random(seed)
+    provider = FakeProvider()
+    main_window = provider.create_window('1С:Предприятие')
+    clock = [0]
+    if isinstance(values, ValueTracker):
+        values.clock = lambda: clock[0]
+
+    monitor = UIMonitor(provider=provider)
+    monitor.input_values = values
+    emitted = []
+    monitor.event_callback = emitted.append
+
+    step_ns = int(1_000_000_000 / rate)
+    end_ns = int(hours * 3600 * 1_000_000_000)
+    hourly = []
+    calls = 0
+    spent = 0.0
+    document = 0
+
+    while clock[0] < end_ns:
+        # Новая форма документа с табличной частью
+        document += 1
+        form = main_window.add('WindowControl', f'Реализация товаров {document}')
+        table = form.add('TableControl', 'Товары')
+        cells = []
+        for row in range(rows):
+            row_item = table.add('DataItemControl', f'Строка {row + 1}')
+            for column in COLUMNS:
+                cell = row_item.add('EditControl', column, value=str(rng.randrange(100)))
+                cells.append(cell)
+                provider.focused = cell
+
+                started = time.perf_counter()
+                monitor.handle_input(main_window, cell, None)
+                if rng.random() < 0.3:
+                    clock[0] += step_ns
+                    monitor.handle_input(main_window, cell, str(rng.randrange(1000)))
+                    calls += 1
+                spent += time.perf_counter() - started
+                calls += 1
+
+                clock[0] += step_ns
+                if clock[0] // 3_600_000_000_000 > len(hourly):
+                    hourly.append(len(values))
+
+        if rng.random() >= keep_open:
+            monitor.invalidate_element(form, closed=True)
+            main_window.children.remove(form)
+            for cell in cells:
+                provider.elements.pop(cell.point, None)
+
+    return hourly, len(emitted), spent / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hours', type=float, default=10)
+    parser.add_argument('--rate', type=float, default=5, help='переходов по ячейкам в секунду')
+    parser.add_argument('--rows', type=int, default=40, help='строк в табличной части документа')
+    parser.add_argument('--keep-open', type=float, default=0.2, help='доля форм, которые не закрываются')
+    parser.add_argument('--capacity', type=int, default=10000)
+    parser.add_argument('--ttl', type=float, default=3600)
+    args = parser.parse_args()
+
+    unbounded = UnboundedValues()
+    tracker = ValueTracker(capacity=args.capacity, ttl=args.ttl)
+    legacy_hourly, legacy_events, legacy_us = simulate(unbounded, args.hours, args.rate, args.rows, args.keep_open, 1)
+    hourly, events, tracker_us = simulate(tracker, args.hours, args.rate, args.rows, args.keep_open, 1)
+
+    print(f"Сессия: {args.hours:g} ч, {args.rate:g} ячеек/с, {args.rows} строк x {len(COLUMNS)} колонок в документе")
+    print(f"{'Час':>4} {'dict, записей':>15} {'ValueTracker':>14}")
+    for hour, (legacy_size, size) in enumerate(zip(legacy_hourly, hourly), 1):
+        print(f"{hour:>4} {legacy_size:>15} {size:>14}")
+    print(f"dict:         {len(unbounded)} записей, ~{unbounded.approx_bytes() / 2**20:.1f} МБ, "
+          f"{legacy_us:.1f} мкс на вызов, событий ВВОД: {legacy_events}")
+    print(f"ValueTracker: {len(tracker)} записей, ~{tracker.approx_bytes / 2**20:.1f} МБ, "
+          f"{tracker_us:.1f} мкс на вызов, событий ВВОД: {events}")
+    print(f"Счетчики: {tracker.get_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Панель расшифровки событий - последние N событий в кольцевой модели
+"""
+from collections import deque
+from PyQt5.QtWidgets import QListView, QAbstractItemView
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QTimer, Qt
+from monitor.events import EVENT_INPUT
+
+# Словарь расшифровки типов элементов
+TYPE_DECODE = {
+    'ButtonControl': '🔘 Кнопка',
+    'EditControl': '📝 Поле ввода',
+    'TextControl': '📄 Текст',
+    'PaneControl': '🖼️ Панель',
+    'WindowControl': '🪟 Окно',
+    'MenuControl': '📋 Меню',
+    'MenuItemControl': '📌 Пункт меню',
+    'ToolBarControl': '🔧 Панель инструментов',
+    'TabControl': '📑 Вкладки',
+    'TabItemControl': '📄 Вкладка',
+    'ListControl': '📜 Список',
+    'ListItemControl': '• Элемент списка',
+    'TreeControl': '🌲 Дерево',
+    'TreeItemControl': '🌿 Узел дерева',
+    'TableControl': '📊 Таблица',
+    'DataItemControl': '📋 Ячейка данных',
+    'ComboBoxControl': '🔽 Выпадающий список',
+    'CheckBoxControl': '☑️ Чекбокс',
+    'RadioButtonControl': '🔘 Радиокнопка',
+    'GroupControl': '📦 Группа',
+    'ImageControl': '🖼️ Изображение',
+    'ScrollBarControl': '↕️ Полоса прокрутки',
+    'SplitButtonControl': '⚡ Кнопка с меню',
+    'DocumentControl': '📃 Документ',
+    'HyperlinkControl': '🔗 Ссылка',
+    'CalendarControl': '📅 Календарь',
+    'SpinnerControl': '🔄 Счетчик',
+    'ProgressBarControl': '⏳ Прогресс-бар',
+    'SliderControl': '🎚️ Слайдер',
+    'ThumbControl': '👆 Ползунок',
+    'HeaderControl': '📌 Заголовок',
+    'HeaderItemControl': '📍 Элемент заголовка',
+    'StatusBarControl': '📊 Статус-бар',
+    'TitleBarControl': '📋 Заголовок окна',
+    'SeparatorControl': '➖ Разделитель',
+    'ToolTipControl': '💬 Подсказка',
+    'CustomControl': '⚙️ Пользовательский элемент',
+}
+
+# Словарь расшифровки типов событий
+EVENT_DECODE = {
+    'ФОКУС': '👁️ Переход на элемент',
+    'КЛИК': '🖱️ Нажатие мыши',
+    'ВВОД': '⌨️ Ввод текста',
+}
+
+# Названия типов без эмодзи - для сегментов пути без имени
+_PLAIN_TYPE_NAMES = {key: value.split(' ', 1)[-1] for key, value in TYPE_DECODE.items()}
+
+
+def decode_event(event):
+    """Понятное описание события для панели расшифровки"""
+    try:
+        event_type = event.event_type
+        if event_type not in EVENT_DECODE or not event.control_type:
+            return None
+
+        control_type = event.control_type
+        decoded_type = TYPE_DECODE.get(control_type, f'❓ {control_type}')
+
+        # Упрощаем путь - убираем технические названия типов
+        element_path = ""
+        simplified_path = []
+        for part in event.path:
+            # Извлекаем имя из формата Type['Name']
+            type_name, _, part_name = part.partition("['")
+            if part_name:
+                simplified_path.append(part_name[:-2])
+            else:
+                # Если имени нет, берем тип и переводим
+                simplified_path.append(_PLAIN_TYPE_NAMES.get(type_name, type_name))
+
+        if simplified_path:
+            element_path = f"\n   📍 Расположение: {' ➜ '.join(simplified_path)}"
+
+        # Значения для ВВОД
+        value_info = ""
+        if event_type == EVENT_INPUT:
+            value_info = f"\n   Изменение: '{event.old_value}' ➜ '{event.new_value}'"
+
+        # Формируем расшифровку
+        decoded_message = f"{EVENT_DECODE[event_type]}: {decoded_type}"
+        if event.name:
+            decoded_message += f" '{event.name}'"
+        return decoded_message + element_path + value_info
+
+    except Exception as e:
+        return None  # Игнорируем ошибки расшифровки
+
+
+class DecodeModel(QAbstractListModel):
+    """Последние maxlen расшифровок; вставка и вытеснение - по одной строке модели"""
+
+    def __init__(self, maxlen=10, parent=None):
+        super().__init__(parent)
+        self._items = deque(maxlen=maxlen)
+
+    @property
+    def maxlen(self):
+        return self._items.maxlen
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid() and index.row() < len(self._items):
+            return self._items[index.row()]
+        return None
+
+    def append(self, message):
+        """Добавить расшифровку в конец, вытеснив самую старую"""
+        if len(self._items) == self._items.maxlen:
+            self.beginRemoveRows(QModelIndex(), 0, 0)
+            self._items.popleft()
+            self.endRemoveRows()
+        row = len(self._items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._items.append(message)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._items.clear()
+        self.endResetModel()
+
+
+class DecodePanel(QListView):
+    """Список расшифрованных событий; перерисовываются только изменившиеся строки"""
+
+    def __init__(self, maxlen=10, parent=None):
+        super().__init__(parent)
+        self.decode_model = DecodeModel(maxlen, self)
+        self.setModel(self.decode_model)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setWordWrap(True)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.scroll_pending = False
+
+    def add_events(self, events):
+        """Расшифровать пачку событий; из пачки нужны только последние maxlen"""
+        added = False
+        for event in events[-self.decode_model.maxlen:]:
+            message = decode_event(event)
+            if message:
+                self.decode_model.append(message)
+                added = True
+        if added and not self.scroll_pending:
+            # scrollToBottom раскладывает строки синхронно - прокручиваем один раз за цикл событий
+            self.scroll_pending = True
+            QTimer.singleShot(0, self.scroll_to_end)
+
+    def scroll_to_end(self):
+        self.scroll_pending = False
+        self.scrollToBottom()
+
+    def clear(self):
+        self.decode_model.clear()
@@ -0,0 +1,224 @@
+"""
+Виртуализированные панели лога: ограниченная по памяти модель строк, догрузка истории и фильтр по типу
+"""
+from PyQt5.QtWidgets import QListView, QAbstractItemView
+from PyQt5.QtCore import QAbstractListModel, QSortFilterProxyModel, QModelIndex, QTimer, Qt
+from monitor.events import EVENT_TYPES
+
+# Вид строки для служебных сообщений и строк операций
+SERVICE_KIND = 'СЛУЖЕБНОЕ'
+LOG_KINDS = EVENT_TYPES + (SERVICE_KIND,)
+
+KIND_ROLE = Qt.UserRole + 1
+
+
+def line_kind(line):
+    """Тип события строки технического лога: '[ЧЧ:ММ:СС.ммм] ТИП → ...'"""
+    if line.startswith('['):
+        for event_type in EVENT_TYPES:
+            if line.startswith(event_type, 15):
+                return event_type
+    return SERVICE_KIND
+
+
+class LogListModel(QAbstractListModel):
+    """Строки лога в памяти, не больше capacity (+ scrollback при просмотре старых строк)
+
+    Строки, сохраненные в файл истории (persisted), идут в файле подряд и заканчиваются
+    последней сохраненной строкой, поэтому более ранние строки для догрузки находятся
+    отступом persisted_rows строк от конца файла.
+    """
+
+    def __init__(self, capacity=20000, scrollback=20000, history=None, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self.scrollback = scrollback
+        self.history = history  # объект с read_before(skip, count), например HistoryWriter
+        self.follow = True  # пользователь смотрит на последние строки
+        self.history_exhausted = False
+        self.persisted_rows = 0
+        self._texts = []
+        self._kinds = []
+        self._persisted = []
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._texts)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self._texts[index.row()]
+        if role == KIND_ROLE:
+            return self._kinds[index.row()]
+        return None
+
+    def kind(self, row):
+        return self._kinds[row]
+
+    def append_lines(self, lines, persisted=False):
+        """Добавить строки в конец одной вставкой и вытеснить лишние сверху"""
+        if not lines:
+            return
+        first = len(self._texts)
+        self.beginInsertRows(QModelIndex(), first, first + len(lines) - 1)
+        self._texts.extend(lines)
+        self._kinds.extend(map(line_kind, lines))
+        self._persisted.extend([persisted] * len(lines))
+        if persisted:
+            self.persisted_rows += len(lines)
+        self.endInsertRows()
+        self.trim(self.capacity if self.follow else self.capacity + self.scrollback)
+
+    def trim(self, limit):
+        """Удалить самые старые строки сверх limit"""
+        excess = len(self._texts) - limit
+        if excess <= 0:
+            return
+        self.beginRemoveRows(QModelIndex(), 0, excess - 1)
+        self.persisted_rows -= sum(self._persisted[:excess])
+        del self._texts[:excess]
+        del self._kinds[:excess]
+        del self._persisted[:excess]
+        self.endRemoveRows()
+        # Вытесненные строки снова можно догрузить из файла
+        self.history_exhausted = False
+
+    def page_back(self, count):
+        """Догрузить count более ранних строк из файла истории; возвращает число добавленных"""
+        if self.history is None or self.history_exhausted:
+            return 0
+        count = min(count, self.capacity + self.scrollback - len(self._texts))
+        if count <= 0:
+            return 0
+        try:
+            lines, more = self.history.read_before(self.persisted_rows, count)
+        except Exception:
+            return 0
+        self.history_exhausted = not more
+        if not lines:
+            return 0
+        self.beginInsertRows(QModelIndex(), 0, len(lines) - 1)
+        self._texts[:0] = lines
+        self._kinds[:0] = map(line_kind, lines)
+        self._persisted[:0] = [True] * len(lines)
+        self.persisted_rows += len(lines)
+        self.endInsertRows()
+        return len(lines)
+
+    def clear(self):
+        self.beginResetModel()
+        self._texts.clear()
+        self._kinds.clear()
+        self._persisted.clear()
+        self.persisted_rows = 0
+        self.history_exhausted = False
+        self.endResetModel()
+
+    def to_plain_text(self):
+        return '\n'.join(self._texts)
+
+
+class EventTypeFilter(QSortFilterProxyModel):
+    """Скрывает строки выключенных типов событий; текст строк не перестраивается"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.hidden_kinds = set()
+
+    def set_kind_visible(self, kind, visible):
+        if visible:
+            self.hidden_kinds.discard(kind)
+        else:
+            self.hidden_kinds.add(kind)
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return not self.hidden_kinds or self.sourceModel().kind(source_row) not in self.hidden_kinds
+
+
+class LogView(QListView):
+    """Панель лога: отрисовываются только видимые строки
+
+    При прокрутке к началу более ранние строки догружаются из истории страницами по page_size.
+    """
+
+    def __init__(self, capacity=20000, scrollback=20000, history=None, page_size=500,
+                 filterable=False, parent=None):
+        super().__init__(parent)
+        self.page_size = page_size
+        self.log_model = LogListModel(capacity, scrollback, history, self)
+        self.filter_model = None
+        if filterable:
+            self.filter_model = EventTypeFilter(self)
+            self.filter_model.setSourceModel(self.log_model)
+            self.setModel(self.filter_model)
+        else:
+            self.setModel(self.log_model)
+
+        # Раскладка пачками: при вставке строк не пересчитывается весь список
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(1000)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.scroll_pending = False
+        self.verticalScrollBar().valueChanged.connect(self.on_scroll)
+
+    def add_message(self, message, persisted=False):
+        """Добавить сообщение; многострочное разбивается на строки"""
+        self.add_messages([message], persisted)
+
+    def add_messages(self, messages, persisted=False):
+        """Добавить пачку сообщений одной вставкой
+
+        persisted - сообщения записаны в файл истории построчно (нужно для догрузки).
+        """
+        lines = []
+        for message in messages:
+            if not persisted:
+                # Пустые строки вокруг служебных сообщений не нужны
+                message = message.strip('\n')
+            lines.extend(message.split('\n'))
+
+        scroll_bar = self.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum()
+        self.log_model.follow = at_bottom
+        self.log_model.append_lines(lines, persisted)
+        if at_bottom and not self.scroll_pending:
+            # scrollToBottom раскладывает строки синхронно - прокручиваем один раз за цикл событий
+            self.scroll_pending = True
+            QTimer.singleShot(0, self.scroll_to_end)
+
+    def scroll_to_end(self):
+        self.scroll_pending = False
+        self.scrollToBottom()
+
+    def on_scroll(self, value):
+        scroll_bar = self.verticalScrollBar()
+        self.log_model.follow = value >= scroll_bar.maximum()
+        if value == scroll_bar.minimum() and scroll_bar.maximum() > 0:
+            self.page_back()
+
+    def page_back(self):
+        """Догрузить страницу более ранних строк, сохранив видимую позицию"""
+        model = self.model()
+        before = model.rowCount()
+        if not self.log_model.page_back(self.page_size):
+            return
+        added = model.rowCount() - before
+        if added:
+            self.scrollTo(model.index(added, 0), QAbstractItemView.PositionAtTop)
+
+    def set_kind_visible(self, kind, visible):
+        """Показать или скрыть строки типа события (ФОКУС, КЛИК, ВВОД, СЛУЖЕБНОЕ)"""
+        if self.filter_model is not None:
+            self.filter_model.set_kind_visible(kind, visible)
+
+    def clear(self):
+        self.log_model.clear()
+
+    def to_plain_text(self):
+        return self.log_model.to_plain_text()
@@ -2,11 +2,17 @@
 Главное окно приложения
 """
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QPushButton, QTextEdit, QLabel, QLineEdit, QCheckBox, QFileDialog)
-from PyQt5.QtCore import QThread, pyqtSignal, Qt
+                             QPushButton, QLabel, QLineEdit, QCheckBox, QFileDialog)
+from PyQt5.QtCore import QThread, QTimer, pyqtSignal, Qt
 from monitor.ui_monitor import UIMonitor
+from monitor.events import UIEvent, EVENT_CLICK, EVENT_FOCUS, EVENT_INPUT
+from monitor.ipc import EventSubscriber
 from monitor.operation_analyzer import OperationAnalyzer
+from monitor.event_buffer import EventBuffer
+from monitor.history_writer import HistoryWriter
 from gui.operation_editor import OperationEditor
+from gui.decode_panel import DecodePanel
+from gui.log_view import LogView, LOG_KINDS, SERVICE_KIND
 from datetime import datetime
 import os
 
@@ -16,29 +22,77 @@ class MonitorThread(QThread):
     log_signal = pyqtSignal(str)
     connection_signal = pyqtSignal(bool, str)  # (успех, сообщение)
     
-    def __init__(self, process_name, log_focus, log_clicks, log_input):
+    def __init__(self, process_name, log_focus, log_clicks, log_input, event_buffer):
         super().__init__()
         self.monitor = UIMonitor(process_name, log_focus, log_clicks, log_input)
+        self.event_buffer = event_buffer  # События забирает GUI по таймеру
         self.is_running = False
         
     def run(self):
         self.is_running = True
-        self.monitor.start_monitoring(self.log_signal.emit, self.connection_signal.emit)
+        self.monitor.start_monitoring(self.log_signal.emit, self.connection_signal.emit, self.event_buffer.push)
         
     def stop(self):
         self.is_running = False
         self.monitor.stop_monitoring()
 
 
+class SubscriberThread(QThread):
+    """Поток подписки на службу мониторинга (python -m monitor.daemon) вместо локального захвата"""
+    log_signal = pyqtSignal(str)
+    connection_signal = pyqtSignal(bool, str)  # (успех, сообщение)
+    
+    def __init__(self, address, event_types, event_buffer):
+        super().__init__()
+        self.subscriber = EventSubscriber(address)
+        self.event_types = set(event_types)  # Типы событий, выбранные в окне
+        self.event_buffer = event_buffer
+        self.is_running = False
+        
+    def run(self):
+        self.is_running = True
+        try:
+            self.subscriber.connect()
+        except OSError as e:
+            self.connection_signal.emit(False, f"Служба мониторинга {self.subscriber.address} недоступна: {e}")
+            return
+        for message in self.subscriber.messages():
+            kind = message.get('type')
+            if kind == 'event':
+                if message.get('event_type') in self.event_types:
+                    self.event_buffer.push(UIEvent.from_dict(message))
+            elif kind == 'log':
+                self.log_signal.emit(message.get('message', ''))
+            elif kind == 'status':
+                self.connection_signal.emit(bool(message.get('success')), message.get('message', ''))
+        if self.is_running:
+            self.log_signal.emit("[ИНФО] Служба мониторинга отключилась")
+        
+    def stop(self):
+        self.is_running = False
+        self.subscriber.close()
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.monitor_thread = None
         self.log_file_path = "logs/monitor_history.log"
         self.operation_analyzer = OperationAnalyzer()
+        self.operation_analyzer.completed_operations.log_callback = self.add_log
+        self.event_buffer = EventBuffer()
+        self.reported_losses = 0  # Сколько потерь буфера уже показано в логе
         self.load_operation_patterns()
         self.ensure_log_directory()
+        # Файл истории пишется из отдельного потока, с ротацией старых сегментов
+        self.history_writer = HistoryWriter(self.log_file_path)
+        self.history_writer.start()
         self.init_ui()
+        
+        # События обрабатываются пачками, а не по одному сигналу на событие
+        self.drain_timer = QTimer(self)
+        self.drain_timer.setInterval(100)
+        self.drain_timer.timeout.connect(self.drain_events)
     
     def load_operation_patterns(self):
         """Загрузить паттерны операций из файла при старте"""
@@ -77,6 +131,14 @@ class MainWindow(QMainWindow):
         self.process_input.setPlaceholderText("Введите имя процесса 1С")
         control_layout1.addWidget(self.process_input)
         
+        # Адрес службы мониторинга: пусто - захват в этом окне
+        self.service_label = QLabel("Служба:")
+        control_layout1.addWidget(self.service_label)
+        
+        self.service_input = QLineEdit()
+        self.service_input.setPlaceholderText("локально (или tcp://127.0.0.1:47810)")
+        control_layout1.addWidget(self.service_input)
+        
         # Чекбоксы для выбора типов событий
         self.log_label = QLabel("Логировать:")
         control_layout1.addWidget(self.log_label)
@@ -124,9 +186,21 @@ class MainWindow(QMainWindow):
         
         left_layout.addLayout(control_layout2)
         
-        # Область логов
-        self.log_area = QTextEdit()
-        self.log_area.setReadOnly(True)
+        # Фильтр лога по типам событий (не влияет на запись в историю)
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Показывать:"))
+        self.filter_checkboxes = {}
+        for kind in LOG_KINDS:
+            checkbox = QCheckBox("Служебные" if kind == SERVICE_KIND else kind)
+            checkbox.setChecked(True)
+            checkbox.toggled.connect(lambda visible, kind=kind: self.log_area.set_kind_visible(kind, visible))
+            filter_layout.addWidget(checkbox)
+            self.filter_checkboxes[kind] = checkbox
+        filter_layout.addStretch()
+        left_layout.addLayout(filter_layout)
+        
+        # Область логов - в памяти последние строки, более ранние догружаются из файла истории
+        self.log_area = LogView(capacity=20000, history=self.history_writer, filterable=True)
         left_layout.addWidget(self.log_area)
         
         # Разделитель
@@ -134,8 +208,7 @@ class MainWindow(QMainWindow):
         left_layout.addWidget(separator_label)
         
         # Область расшифровки
-        self.decode_area = QTextEdit()
-        self.decode_area.setReadOnly(True)
+        self.decode_area = DecodePanel(maxlen=10)
         self.decode_area.setMaximumHeight(120)
         left_layout.addWidget(self.decode_area)
         
@@ -144,8 +217,7 @@ class MainWindow(QMainWindow):
         left_layout.addWidget(operations_label)
         
         # Область операций
-        self.operations_area = QTextEdit()
-        self.operations_area.setReadOnly(True)
+        self.operations_area = LogView(capacity=2000)
         self.operations_area.setMaximumHeight(120)
         left_layout.addWidget(self.operations_area)
         
@@ -158,8 +230,7 @@ class MainWindow(QMainWindow):
         history_label = QLabel("История операций:")
         right_layout.addWidget(history_label)
         
-        self.history_area = QTextEdit()
-        self.history_area.setReadOnly(True)
+        self.history_area = LogView(capacity=5000)
         right_layout.addWidget(self.history_area)
         
         # Кнопка очистки истории
@@ -176,7 +247,7 @@ class MainWindow(QMainWindow):
     def start_monitoring(self):
         process_name = self.process_input.text()
         if not process_name:
-            self.log_area.append("[ОШИБКА] Введите имя процесса")
+            self.log_area.add_message("[ОШИБКА] Введите имя процесса")
             return
         
         log_focus = self.focus_checkbox.isChecked()
@@ -184,7 +255,7 @@ class MainWindow(QMainWindow):
         log_input = self.input_checkbox.isChecked()
         
         if not log_focus and not log_clicks and not log_input:
-            self.log_area.append("[ОШИБКА] Выберите хотя бы один тип событий для логирования")
+            self.log_area.add_message("[ОШИБКА] Выберите хотя бы один тип событий для логирования")
             return
         
         events = []
@@ -196,14 +267,24 @@ class MainWindow(QMainWindow):
             events.append("ВВОД")
         events_str = ", ".join(events)
             
-        self.log_area.append(f"[СТАРТ] Попытка подключения к процессу {process_name}...")
-        self.log_area.append(f"[НАСТРОЙКИ] Логирование: {events_str}")
-        self.statusBar().showMessage(f"Подключение к {process_name}...")
+        service_address = self.service_input.text().strip()
+        if service_address:
+            self.log_area.add_message(f"[СТАРТ] Подключение к службе мониторинга {service_address}...")
+        else:
+            self.log_area.add_message(f"[СТАРТ] Попытка подключения к процессу {process_name}...")
+        self.log_area.add_message(f"[НАСТРОЙКИ] Логирование: {events_str}")
+        self.statusBar().showMessage(f"Подключение к {service_address or process_name}...")
             
-        self.monitor_thread = MonitorThread(process_name, log_focus, log_clicks, log_input)
+        if service_address:
+            event_types = [event_type for event_type, checked in
+                           ((EVENT_FOCUS, log_focus), (EVENT_CLICK, log_clicks), (EVENT_INPUT, log_input)) if checked]
+            self.monitor_thread = SubscriberThread(service_address, event_types, self.event_buffer)
+        else:
+            self.monitor_thread = MonitorThread(process_name, log_focus, log_clicks, log_input, self.event_buffer)
         self.monitor_thread.log_signal.connect(self.add_log)
         self.monitor_thread.connection_signal.connect(self.on_connection_status)
         self.monitor_thread.start()
+        self.drain_timer.start()
         
         self.start_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
@@ -222,6 +303,11 @@ class MainWindow(QMainWindow):
         if self.monitor_thread:
             self.monitor_thread.stop()
             self.monitor_thread.wait()
+        
+        # Обрабатываем остаток событий
+        self.drain_timer.stop()
+        self.drain_events()
+        self.history_writer.flush()
             
         self.start_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
@@ -229,27 +315,51 @@ class MainWindow(QMainWindow):
         self.click_checkbox.setEnabled(True)
         self.input_checkbox.setEnabled(True)
         self.statusBar().showMessage("Мониторинг остановлен")
-        self.log_area.append("\n[СТОП] Мониторинг остановлен\n")
+        self.log_area.add_message("\n[СТОП] Мониторинг остановлен\n")
         
     def on_connection_status(self, success, message):
         """Обработка статуса подключения к процессу"""
         if success:
-            self.log_area.append(f"[УСПЕХ] {message}\n")
+            self.log_area.add_message(f"[УСПЕХ] {message}\n")
             self.statusBar().showMessage(f"✓ Подключено: {message}")
         else:
-            self.log_area.append(f"[ОШИБКА] {message}\n")
+            self.log_area.add_message(f"[ОШИБКА] {message}\n")
             self.statusBar().showMessage(f"✗ Ошибка подключения")
             self.start_btn.setEnabled(True)
             self.stop_btn.setEnabled(False)
     
     def add_log(self, message):
-        self.log_area.append(message)
+        """Служебное сообщение монитора"""
+        self.log_area.add_message(message, persisted=True)
         # Автоматически сохраняем в файл истории
         self.save_to_history(message)
+    
+    def drain_events(self):
+        """Обработать накопившиеся события UI пачкой (по таймеру)"""
+        events = self.event_buffer.drain()
+        if not events:
+            return
+        
+        # Текст формируется только для лога и файла истории
+        lines = [event.to_log_line() for event in events]
+        self.log_area.add_messages(lines, persisted=True)
+        self.save_lines_to_history(lines)
         # Обновляем расшифровку
-        self.update_decode(message)
+        self.decode_area.add_events(events)
         # Анализируем операции
-        self.analyze_operation(message)
+        self.analyze_operations(events)
+        # Сообщаем о потерях при переполнении буфера
+        self.report_buffer_losses()
+    
+    def report_buffer_losses(self):
+        """Показать, сколько событий отброшено или объединено буфером"""
+        stats = self.event_buffer.get_stats()
+        losses = stats['dropped'] + stats['coalesced']
+        if losses > self.reported_losses:
+            self.reported_losses = losses
+            message = f"[ИНФО] Буфер событий переполнен: отброшено {stats['dropped']}, объединено {stats['coalesced']}"
+            self.log_area.add_message(message, persisted=True)
+            self.save_to_history(message)
         
     def clear_log(self):
         self.log_area.clear()
@@ -257,6 +367,7 @@ class MainWindow(QMainWindow):
         self.operations_area.clear()
         # Сбрасываем анализатор операций
         self.operation_analyzer = OperationAnalyzer()
+        self.operation_analyzer.completed_operations.log_callback = self.add_log
         # Загружаем паттерны из файла
         self.load_operation_patterns()
     
@@ -272,11 +383,11 @@ class MainWindow(QMainWindow):
     
     def save_to_history(self, message):
         """Сохранить сообщение в файл истории"""
-        try:
-            with open(self.log_file_path, 'a', encoding='utf-8') as f:
-                f.write(message + '\n')
-        except Exception as e:
-            pass  # Игнорируем ошибки записи
+        self.save_lines_to_history([message])
+    
+    def save_lines_to_history(self, lines):
+        """Передать пачку строк потоку записи истории (GUI не ждет диска)"""
+        self.history_writer.write_lines(lines)
     
     def export_log(self):
         """Экспорт текущего лога в файл"""
@@ -294,7 +405,7 @@ class MainWindow(QMainWindow):
             
             if file_path:
                 # Получаем текст из области логов
-                log_text = self.log_area.toPlainText()
+                log_text = self.log_area.to_plain_text()
                 
                 # Сохраняем в файл
                 with open(file_path, 'w', encoding='utf-8') as f:
@@ -304,180 +415,41 @@ class MainWindow(QMainWindow):
                     f.write(log_text)
                 
                 self.statusBar().showMessage(f"Лог сохранен: {file_path}", 3000)
-                self.log_area.append(f"\n[ЭКСПОРТ] Лог сохранен в файл: {file_path}\n")
+                self.log_area.add_message(f"\n[ЭКСПОРТ] Лог сохранен в файл: {file_path}\n")
         except Exception as e:
-            self.log_area.append(f"\n[ОШИБКА] Не удалось сохранить файл: {str(e)}\n")
+            self.log_area.add_message(f"\n[ОШИБКА] Не удалось сохранить файл: {str(e)}\n")
     
-    def update_decode(self, message):
-        """Обновить расшифровку последнего события"""
-        # Словарь расшифровки типов элементов
-        type_decode = {
-            'ButtonControl': '🔘 Кнопка',
-            'EditControl': '📝 Поле ввода',
-            'TextControl': '📄 Текст',
-            'PaneControl': '🖼️ Панель',
-            'WindowControl': '🪟 Окно',
-            'MenuControl': '📋 Меню',
-            'MenuItemControl': '📌 Пункт меню',
-            'ToolBarControl': '🔧 Панель инструментов',
-            'TabControl': '📑 Вкладки',
-            'TabItemControl': '📄 Вкладка',
-            'ListControl': '📜 Список',
-            'ListItemControl': '• Элемент списка',
-            'TreeControl': '🌲 Дерево',
-            'TreeItemControl': '🌿 Узел дерева',
-            'TableControl': '📊 Таблица',
-            'DataItemControl': '📋 Ячейка данных',
-            'ComboBoxControl': '🔽 Выпадающий список',
-            'CheckBoxControl': '☑️ Чекбокс',
-            'RadioButtonControl': '🔘 Радиокнопка',
-            'GroupControl': '📦 Группа',
-            'ImageControl': '🖼️ Изображение',
-            'ScrollBarControl': '↕️ Полоса прокрутки',
-            'SplitButtonControl': '⚡ Кнопка с меню',
-            'DocumentControl': '📃 Документ',
-            'HyperlinkControl': '🔗 Ссылка',
-            'CalendarControl': '📅 Календарь',
-            'SpinnerControl': '🔄 Счетчик',
-            'ProgressBarControl': '⏳ Прогресс-бар',
-            'SliderControl': '🎚️ Слайдер',
-            'ThumbControl': '👆 Ползунок',
-            'HeaderControl': '📌 Заголовок',
-            'HeaderItemControl': '📍 Элемент заголовка',
-            'StatusBarControl': '📊 Статус-бар',
-            'TitleBarControl': '📋 Заголовок окна',
-            'SeparatorControl': '➖ Разделитель',
-            'ToolTipControl': '💬 Подсказка',
-            'CustomControl': '⚙️ Пользовательский элемент',
-        }
-        
-        # Словарь расшифровки типов событий
-        event_decode = {
-            'ФОКУС': '👁️ Переход на элемент',
-            'КЛИК': '🖱️ Нажатие мыши',
-            'ВВОД': '⌨️ Ввод текста',
-        }
+    def analyze_operations(self, events):
+        """Анализировать пачку действий и распознавать операции"""
+        results = []
+        finished = []
         
-        try:
-            # Пропускаем служебные сообщения
-            if any(x in message for x in ['[СТАРТ]', '[СТОП]', '[ИНФО]', '[НАСТРОЙКИ]', '[УСПЕХ]', '[ОШИБКА]', '[ЭКСПОРТ]']):
-                return
-            
-            # Извлекаем тип события
-            event_type = None
-            for event in event_decode.keys():
-                if event in message:
-                    event_type = event
-                    break
-            
-            if not event_type:
-                return
-            
-            # Извлекаем Type: из сообщения
-            import re
-            type_match = re.search(r'Type: (\w+)', message)
-            
-            if type_match:
-                control_type = type_match.group(1)
-                decoded_type = type_decode.get(control_type, f'❓ {control_type}')
-                
-                # Извлекаем Name: если есть
-                name_match = re.search(r"Name: '([^']*)'", message)
-                element_name = name_match.group(1) if name_match else "без имени"
-                
-                # Извлекаем путь к элементу
-                path_match = re.search(r"Путь: (.+?)(?:\s*\||$)", message)
-                element_path = ""
-                if path_match:
-                    raw_path = path_match.group(1).strip()
-                    # Упрощаем путь - убираем технические названия типов
-                    path_parts = raw_path.split(' → ')
-                    simplified_path = []
-                    for part in path_parts:
-                        # Извлекаем имя из формата Type['Name']
-                        part_name_match = re.search(r"\['([^']+)'\]", part)
-                        if part_name_match:
-                            simplified_path.append(part_name_match.group(1))
-                        else:
-                            # Если имени нет, берем тип и переводим
-                            type_only = re.match(r'(\w+)', part)
-                            if type_only:
-                                type_name = type_only.group(1)
-                                decoded = type_decode.get(type_name, type_name)
-                                # Убираем эмодзи для пути
-                                decoded = decoded.split(' ', 1)[-1] if ' ' in decoded else decoded
-                                simplified_path.append(decoded)
-                    
-                    if simplified_path:
-                        element_path = f"\n   📍 Расположение: {' ➜ '.join(simplified_path)}"
-                
-                # Извлекаем значения для ВВОД
-                value_info = ""
-                if event_type == 'ВВОД':
-                    value_match = re.search(r"Было: '([^']*)' → Стало: '([^']*)'", message)
-                    if value_match:
-                        old_val = value_match.group(1)
-                        new_val = value_match.group(2)
-                        value_info = f"\n   Изменение: '{old_val}' ➜ '{new_val}'"
-                
-                # Формируем расшифровку
-                decoded_message = f"{event_decode[event_type]}: {decoded_type}"
-                if element_name != "без имени":
-                    decoded_message += f" '{element_name}'"
-                decoded_message += element_path
-                decoded_message += value_info
-                
-                # Обновляем поле расшифровки (показываем только последние 10 событий)
-                current_text = self.decode_area.toPlainText()
-                lines = current_text.split('\n')
-                
-                # Добавляем новую строку
-                lines.append(decoded_message)
-                
-                # Оставляем только последние 10 строк
-                if len(lines) > 10:
-                    lines = lines[-10:]
-                
-                self.decode_area.setPlainText('\n'.join(lines))
-                
-                # Прокручиваем вниз
-                cursor = self.decode_area.textCursor()
-                cursor.movePosition(cursor.End)
-                self.decode_area.setTextCursor(cursor)
-                
-        except Exception as e:
-            pass  # Игнорируем ошибки парсинга
-    
-    def analyze_operation(self, message):
-        """Анализировать действие и распознавать операции"""
-        try:
-            result = self.operation_analyzer.analyze_action(message)
+        for event in events:
+            try:
+                result = self.operation_analyzer.analyze_action(event)
+            except Exception as e:
+                continue  # Игнорируем ошибки анализа
             
-            if result:
-                # Добавляем результат в область операций
-                self.operations_area.append(result)
-                
-                # Прокручиваем вниз
-                cursor = self.operations_area.textCursor()
-                cursor.movePosition(cursor.End)
-                self.operations_area.setTextCursor(cursor)
-                
+            if not result:
+                continue
+            # Одно действие может закрыть несколько операций - каждая строка отдельно
+            for line in result.split("\n"):
+                results.append(line)
                 # Если операция завершена или прервана - добавляем в историю
-                if '✅ Завершено' in result or '⚠️ Прервано' in result or '❌ Отменено' in result:
+                if '✅ Завершено' in line or '⚠️ Прервано' in line or '❌ Отменено' in line:
                     timestamp = datetime.now().strftime("%H:%M:%S")
-                    self.history_area.append(f"[{timestamp}] {result}")
-                    
-                    # Прокручиваем историю вниз
-                    cursor = self.history_area.textCursor()
-                    cursor.movePosition(cursor.End)
-                    self.history_area.setTextCursor(cursor)
-                    
-                    # Обновляем статистику в статус-баре
-                    stats = self.operation_analyzer.get_statistics()
-                    self.statusBar().showMessage(stats, 5000)
-                    
-        except Exception as e:
-            pass  # Игнорируем ошибки анализа
+                    finished.append(f"[{timestamp}] {line}")
+        
+        if results:
+            # Добавляем результаты в область операций
+            self.operations_area.add_messages(results)
+        
+        if finished:
+            self.history_area.add_messages(finished)
+            
+            # Обновляем статистику в статус-баре
+            stats = self.operation_analyzer.get_statistics()
+            self.statusBar().showMessage(stats, 5000)
     
     def open_operation_editor(self):
         """Открыть редактор операций"""
@@ -485,9 +457,16 @@ class MainWindow(QMainWindow):
         
         # Загружаем паттерны из файла при открытии
         if editor.load_patterns_from_file():
-            self.log_area.append("[ИНФО] Паттерны операций загружены из файла\n")
+            self.log_area.add_message("[ИНФО] Паттерны операций загружены из файла\n")
         
         editor.exec_()
         
         # После закрытия редактора обновляем список операций
-        self.log_area.append("[ИНФО] Редактор операций закрыт. Паттерны обновлены.\n")
+        self.log_area.add_message("[ИНФО] Редактор операций закрыт. Паттерны обновлены.\n")
+
+    def closeEvent(self, event):
+        """Остановить мониторинг и дописать историю перед закрытием окна"""
+        if self.monitor_thread and self.monitor_thread.isRunning():
+            self.stop_monitoring()
+        self.history_writer.close()
+        super().closeEvent(event)
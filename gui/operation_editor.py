@@ -297,6 +297,9 @@ class OperationEditor(QDialog):
             self.analyzer.patterns[key] = pattern
             self.current_pattern_key = key
         
+        # Перекомпилируем индекс триггеров
+        self.analyzer.rebuild_index()
+        
         # Сохраняем в файл
         self.save_patterns_to_file()
         
@@ -325,6 +328,7 @@ class OperationEditor(QDialog):
         
         if reply == QMessageBox.Yes:
             del self.analyzer.patterns[self.current_pattern_key]
+            self.analyzer.rebuild_index()
             self.save_patterns_to_file()
             self.load_patterns()
             
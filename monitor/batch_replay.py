@@ -0,0 +1,130 @@
+"""
+Пакетный анализ истории с нескольких рабочих мест в пуле процессов
+
+Каждый шард (файл истории или каталог logs одного рабочего места со всеми сегментами)
+анализируется в отдельном процессе своим OperationAnalyzer; результаты сливаются в один
+набор операций со статистикой по шардам.
+
+Запуск:
+    python -m monitor.batch_replay logs/ws01 logs/ws02 ... [--patterns config/operation_patterns.json]
+                                   [--workers 8] [--output operations.jsonl] [--summary summary.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from monitor.history_writer import history_segments
+from monitor.operation_analyzer import STATUS_COMPLETED, STATUS_INTERRUPTED, STATUS_CANCELLED
+from monitor.replay import replay, load_patterns, DEFAULT_PATTERNS
+
+HISTORY_NAME = "monitor_history.log"
+
+# Паттерны рабочего процесса (передаются один раз при запуске процесса)
+_worker_patterns = None
+
+
+def shard_files(path):
+    """Файлы шарда: каталог - все сегменты истории в нем, иначе сам файл"""
+    if not os.path.isdir(path):
+        return [path]
+    current = os.path.join(path, HISTORY_NAME)
+    files = history_segments(current)
+    if os.path.exists(current):
+        files.append(current)
+    return files
+
+
+def _init_worker(patterns):
+    global _worker_patterns
+    _worker_patterns = patterns
+
+
+def analyze_shard(source, patterns=None):
+    """Проанализировать один шард; возвращает (операции, статистика шарда)"""
+    files = shard_files(source)
+    operations = []
+
+    def collect(operation):
+        record = operation.to_dict()
+        record['source'] = source
+        operations.append(record)
+
+    stats = replay(files, patterns if patterns is not None else _worker_patterns, collect)
+    stats['source'] = source
+    stats['bytes'] = sum(os.path.getsize(path) for path in files)
+    for status in (STATUS_COMPLETED, STATUS_INTERRUPTED, STATUS_CANCELLED):
+        stats[status] = sum(1 for record in operations if record['status'] == status)
+    return operations, stats
+
+
+def batch_replay(sources, patterns, workers=None):
+    """Проанализировать шарды параллельно
+
+    Возвращает (все операции по времени начала, статистика по шардам, общая статистика).
+    """
+    # Крупные шарды первыми - меньше простоя в конце
+    sizes = {source: sum(os.path.getsize(path) for path in shard_files(source)) for source in sources}
+    ordered = sorted(sources, key=sizes.get, reverse=True)
+
+    operations = []
+    shard_stats = {}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(patterns,)) as pool:
+        futures = {pool.submit(analyze_shard, source): source for source in ordered}
+        for future in as_completed(futures):
+            shard_operations, stats = future.result()
+            operations.extend(shard_operations)
+            shard_stats[stats['source']] = stats
+    elapsed = time.perf_counter() - started
+
+    operations.sort(key=lambda record: (record['start_ns'] or 0, record['source']))
+    events = sum(stats['events'] for stats in shard_stats.values())
+    totals = {
+        'shards': len(sources),
+        'workers': workers or os.cpu_count(),
+        'events': events,
+        'operations': len(operations),
+        'elapsed': elapsed,
+        'events_per_sec': events / elapsed if elapsed > 0 else 0.0,
+    }
+    return operations, [shard_stats[source] for source in sources], totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Параллельный анализ истории нескольких рабочих мест")
+    parser.add_argument('sources', nargs='+', help='файлы истории или каталоги logs рабочих мест')
+    parser.add_argument('--patterns', default=DEFAULT_PATTERNS, help='файл паттернов операций (JSON)')
+    parser.add_argument('--workers', type=int, default=None, help='число процессов (по умолчанию - число ядер)')
+    parser.add_argument('--output', '-o', help='файл JSONL с операциями (по умолчанию stdout)')
+    parser.add_argument('--summary', help='файл JSON со статистикой по шардам')
+    args = parser.parse_args(argv)
+
+    patterns = load_patterns(args.patterns)
+    operations, shard_stats, totals = batch_replay(args.sources, patterns, args.workers)
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for record in operations:
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+    finally:
+        if args.output:
+            output.close()
+
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump({'totals': totals, 'shards': shard_stats}, f, ensure_ascii=False, indent=2)
+
+    for stats in shard_stats:
+        print(f"[ИНФО] {stats['source']}: событий {stats['events']}, операций {stats['operations']}"
+              f" (✅ {stats[STATUS_COMPLETED]}, ⚠️ {stats[STATUS_INTERRUPTED]}, ❌ {stats[STATUS_CANCELLED]})"
+              f", {stats['events_per_sec']:.0f} событий/с", file=sys.stderr)
+    print(f"[ИНФО] Шардов: {totals['shards']}, процессов: {totals['workers']}, событий: {totals['events']},"
+          f" операций: {totals['operations']} за {totals['elapsed']:.2f} с"
+          f" ({totals['events_per_sec']:.0f} событий/с)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+"""
+Бэкенды захвата событий UI - опрос по таймеру или подписка на события UI Automation
+"""
+import queue
+from monitor.events import now_ns
+from monitor.mouse_hook import MOUSE_DOWN
+from monitor.scheduler import AdaptiveScheduler
+from monitor.snapshot import ElementSnapshot, Tick
+
+
+class CaptureBackend:
+    """Базовый бэкенд захвата: очередь событий и их передача обработчикам монитора
+
+    Элемент очереди - кортеж (вид, элемент, значение, время захвата).
+    Виды: 'focus' - смена фокуса, 'value' - изменение Value, 'invoke' - нажатие,
+    'renamed', 'structure', 'closed' - изменение имени, структуры или закрытие окна,
+    'click' - нажатие кнопки мыши из перехвата (элемент - точка экрана (x, y)).
+
+    Один цикл захвата обслуживает все окна реестра сеансов (SessionRegistry):
+    окно события определяется обработчиками монитора по элементу.
+
+    При работающем перехвате мыши клики берутся только из него: 'invoke' без нажатия
+    мыши - это Enter/пробел на кнопке, а не клик. Invoke засчитывается кликом, лишь
+    если элемент под последним нажатием определить не удалось (invoke_window секунд).
+    """
+    name = None
+    hook_fallback = None  # откуда берутся клики, если перехват мыши недоступен
+
+    def __init__(self, monitor, invoke_window=0.5):
+        self.monitor = monitor
+        self.queue = queue.Queue()
+        self.sessions = None
+        self.hook = None
+        self.invoke_window = invoke_window
+        self._missed_click = None  # время нажатия, элемент которого не определился
+
+    def post(self, kind, element, value=None, captured_at=None):
+        """Поместить событие в очередь (может вызываться из любого потока)"""
+        self.queue.put((kind, element, value, captured_at or now_ns()))
+
+    def post_mouse(self, kind, point, captured_at):
+        """Приемник перехвата мыши: клик фиксируется по нажатию кнопки
+
+        Вызывается из потока хука - только кладет точку в очередь,
+        элемент под ней определяется в потоке монитора.
+        """
+        if kind == MOUSE_DOWN:
+            self.queue.put(('click', point, None, captured_at))
+
+    def dispatch(self, window, item):
+        """Передать событие из очереди обработчикам монитора
+
+        window=None - окно определяется по элементу (реестр сеансов монитора).
+        """
+        kind, element, value, captured_at = item
+        monitor = self.monitor
+        if kind == 'click':
+            if monitor.log_clicks:
+                try:
+                    element = Tick(monitor.provider, monitor.batch_properties).element_from_point(*element)
+                except Exception:
+                    element = None
+                if element is not None:
+                    self._missed_click = None
+                    monitor.handle_click(window, element, captured_at)
+                else:
+                    self._missed_click = captured_at
+            return
+        # Обработчики одного события читают свойства элемента из общего снимка
+        if not isinstance(element, ElementSnapshot):
+            element = ElementSnapshot(element, provider=monitor.provider if monitor.batch_properties else None)
+
+        if kind == 'focus':
+            if monitor.log_focus:
+                monitor.handle_focus(window, element, captured_at)
+            if monitor.log_input:
+                # Запоминаем исходное значение поля, чтобы зафиксировать последующий ввод
+                monitor.handle_input(window, element, None, captured_at)
+        elif kind == 'value':
+            if monitor.log_input:
+                monitor.handle_input(window, element, value, captured_at)
+        elif kind == 'invoke':
+            if monitor.log_clicks:
+                if self.hook is None:
+                    monitor.handle_click(window, element, captured_at)
+                elif (self._missed_click is not None
+                      and captured_at - self._missed_click <= self.invoke_window * 1_000_000_000):
+                    monitor.handle_click(window, element, self._missed_click)
+                    self._missed_click = None
+        elif kind in ('renamed', 'structure', 'closed'):
+            monitor.invalidate_element(element, closed=kind == 'closed')
+            if kind == 'closed' and self.sessions is not None:
+                self.window_closed(element)
+
+    def window_closed(self, element):
+        """Закрыто окно: если это окно сеанса - отключить его сразу, не дожидаясь пересканирования"""
+        try:
+            runtime_id = tuple(element.GetRuntimeId())
+        except Exception:
+            return
+        session = self.sessions.detach(runtime_id)
+        if session is not None:
+            self.detach(session)
+            self.monitor.sessions_changed([], [session])
+
+    def rescan(self, force=False):
+        """Подключить новые окна 1С и отключить исчезнувшие (не чаще rescan_interval)"""
+        attached, detached = self.sessions.refresh(force)
+        for session in detached:
+            self.detach(session)
+        for session in attached:
+            self.attach(session)
+        if attached or detached:
+            self.monitor.sessions_changed(attached, detached)
+        return attached, detached
+
+    def start_hook(self):
+        """Запустить перехват мыши; False - клики определяются способом hook_fallback"""
+        monitor = self.monitor
+        if not (monitor.log_clicks and monitor.mouse_hook):
+            return False
+        try:
+            hook = monitor.provider.mouse_hook(self.post_mouse)
+            hook.start()
+        except Exception as e:
+            monitor.log_callback(f"[ИНФО] Перехват мыши недоступен ({e}), клики определяются {self.hook_fallback}")
+            return False
+        self.hook = hook
+        return True
+
+    def stop_hook(self):
+        if self.hook is not None:
+            self.hook.stop()
+
+    def attach(self, session):
+        """Начать захват окна"""
+
+    def detach(self, session):
+        """Прекратить захват окна"""
+
+    def drain(self, window, timeout=None):
+        """Обработать накопившиеся события; при timeout ждать первое событие
+
+        Возвращает число обработанных событий.
+        """
+        count = 0
+        try:
+            item = self.queue.get(timeout=timeout) if timeout else self.queue.get_nowait()
+        except queue.Empty:
+            return count
+        while item is not None:
+            self.dispatch(window, item)
+            count += 1
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return count
+        return count
+
+    def run(self, sessions):
+        """Основной цикл захвата всех окон реестра (блокирует поток до остановки монитора)"""
+        raise NotImplementedError
+
+    def stop(self):
+        """Разбудить цикл захвата для остановки"""
+        self.queue.put(None)
+
+    def get_stats(self):
+        """Счетчики бэкенда"""
+        return {}
+
+
+class PollingBackend(CaptureBackend):
+    """Опрос состояния мыши и фокуса (резервный режим)
+
+    Интервал адаптивный: от monitor.poll_floor при работе оператора
+    до monitor.poll_ceiling в простое (AdaptiveScheduler).
+    Клики при monitor.mouse_hook приходят из перехвата мыши с точным временем нажатия;
+    если перехват недоступен, состояние кнопки опрашивается на каждом проходе.
+    """
+    name = 'polling'
+    hook_fallback = 'опросом'
+
+    def __init__(self, monitor, interval=None, ceiling=None):
+        super().__init__(monitor)
+        self.scheduler = AdaptiveScheduler(interval or monitor.poll_floor, ceiling or monitor.poll_ceiling)
+
+    @property
+    def interval(self):
+        return self.scheduler.interval
+
+    def state(self, tick):
+        """Состояние, изменение которого возвращает частый опрос:
+        курсор, кнопка мыши, RuntimeId и значение элемента в фокусе"""
+        provider = self.monitor.provider
+        try:
+            cursor = (provider.get_cursor_pos(), provider.is_left_button_down())
+        except Exception:
+            cursor = None
+        focused = tick.focused()
+        runtime_id = value = None
+        if focused:
+            try:
+                runtime_id = tuple(focused.GetRuntimeId())
+                if focused.GetValuePattern():
+                    value = focused.Value
+            except Exception:
+                pass
+        return cursor, runtime_id, value
+
+    def run(self, sessions):
+        monitor = self.monitor
+        scheduler = self.scheduler
+        self.sessions = sessions
+        sample_clicks = not self.start_hook()
+        changed = False
+        try:
+            while monitor.is_monitoring:
+                attached, detached = self.rescan()
+                tick = monitor.poll(None, sample_clicks)
+                interval = scheduler.observe(self.state(tick), changed or bool(attached or detached))
+                # Ожидание в очереди: stop(), клики из перехвата и другие события будят цикл сразу
+                changed = self.drain(None, timeout=interval) > 0
+        finally:
+            self.stop_hook()
+
+    def get_stats(self):
+        stats = self.scheduler.get_stats()
+        if self.hook is not None:
+            stats.update(self.hook.get_stats())
+        if self.sessions is not None:
+            stats.update(self.sessions.get_stats())
+        return stats
+
+
+class EventBackend(CaptureBackend):
+    """Подписка на события UI Automation: фокус, изменение Value и Invoke
+
+    Подписка оформляется на каждое окно реестра; события всех окон приходят в одну очередь.
+    Клики при monitor.mouse_hook - из перехвата мыши (элемент под точкой нажатия), как при
+    опросе: Invoke есть только у кнопок и пунктов меню, клики по полям и ячейкам без него теряются.
+    """
+    name = 'events'
+    hook_fallback = 'по Invoke'
+
+    def __init__(self, monitor, wait_timeout=0.5):
+        super().__init__(monitor)
+        self.wait_timeout = wait_timeout
+
+    def attach(self, session):
+        self.monitor.provider.subscribe(session.window.element, self.post, cached=self.monitor.batch_properties)
+
+    def detach(self, session):
+        self.monitor.provider.unsubscribe(session.window.element)
+
+    def run(self, sessions):
+        monitor = self.monitor
+        provider = monitor.provider
+        self.sessions = sessions
+        self.start_hook()
+        try:
+            for session in sessions:
+                self.attach(session)
+            while monitor.is_monitoring:
+                # Поток спит в очереди, пока провайдер не пришлет событие
+                self.drain(None, timeout=self.wait_timeout)
+                self.rescan()
+        finally:
+            provider.unsubscribe()
+            self.stop_hook()
+
+    def get_stats(self):
+        stats = {}
+        if self.hook is not None:
+            stats.update(self.hook.get_stats())
+        if self.sessions is not None:
+            stats.update(self.sessions.get_stats())
+        return stats
+
+
+BACKENDS = {
+    PollingBackend.name: PollingBackend,
+    EventBackend.name: EventBackend,
+}
+
+
+def create_backend(name, monitor):
+    """Создать бэкенд захвата по имени"""
+    try:
+        return BACKENDS[name](monitor)
+    except KeyError:
+        raise ValueError(f"Неизвестный бэкенд захвата: {name}")
@@ -0,0 +1,450 @@
+"""
+Центральный сборщик: события и операции со служб мониторинга многих рабочих мест
+
+Службы (monitor.daemon --collector адрес) подключаются к сборщику и передают свой поток
+кадрами monitor.ipc. Первое сообщение - {'type': 'hello', 'workstation': имя, 'pid': ...}.
+Сборщик принимает соединения на asyncio, копит строки и пишет их пачками в EventStore (SQLite).
+Если запись отстает, чтение соединения приостанавливается до записи его строк (max_pending).
+Тогда служба упирается в TCP и копит сообщения у себя.
+
+Запуск:
+    python -m monitor.collector [--listen tcp://0.0.0.0:47820] [--database logs/collector.db]
+                                [--batch-size 1000] [--flush-interval 0.5] [--max-pending 5000]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from monitor.event_store import EventStore
+from monitor.ipc import FrameDecoder, encode_frame, parse_address, PROTOCOL_VERSION
+from monitor.operation_analyzer import STATUS_COMPLETED
+
+DEFAULT_COLLECTOR_ADDRESS = 'tcp://127.0.0.1:47820'
+DEFAULT_DATABASE = "logs/collector.db"
+
+_TEXT_TYPES = (str, type(None))
+_EVENT_TEXTS = ('event_type', 'control_type', 'name', 'automation_id', 'class_name', 'window',
+                'old_value', 'new_value')
+_OPERATION_TEXTS = ('operation', 'pattern_key', 'status')
+
+
+def _integer(value, required=False):
+    """Целое, которое SQLite сохранит (64 бита); None допустимо, если поле необязательное"""
+    if value is None:
+        return not required
+    return type(value) is int and -2**63 <= value < 2**63
+
+
+def _valid_message(message):
+    """Годится ли сообщение события/операции для записи в EventStore (иначе - отклоняется)"""
+    kind = message.get('type')
+    if kind == 'event':
+        path = message.get('path')
+        return (_integer(message.get('timestamp'), required=True) and _integer(message.get('pid'))
+                and all(isinstance(message.get(field), _TEXT_TYPES) for field in _EVENT_TEXTS)
+                and (path is None or (isinstance(path, (list, tuple)) and all(isinstance(s, str) for s in path))))
+    if kind == 'operation':
+        duration = message.get('duration')
+        return (all(_integer(message.get(field)) for field in ('start_ns', 'end_ns', 'actions'))
+                and all(isinstance(message.get(field), _TEXT_TYPES) for field in _OPERATION_TEXTS)
+                and (duration is None or (isinstance(duration, (int, float)) and not isinstance(duration, bool)))
+                and isinstance(message.get('context'), (dict, type(None))))
+    return True
+
+
+def _workstation_stats():
+    return {'connected': 0, 'events': 0, 'operations': 0, 'completed': 0, 'duration': 0.0, 'rejected': 0}
+
+
+class _Source:
+    """Подключенная служба мониторинга"""
+    __slots__ = ('peer', 'workstation', 'stats', 'pending', 'resume', 'pauses', 'writer')
+
+    def __init__(self, peer, writer):
+        self.peer = peer
+        self.workstation = peer  # до приветствия - адрес соединения
+        self.stats = None
+        self.pending = 0  # принятые, но еще не записанные строки
+        self.resume = asyncio.Event()
+        self.pauses = 0
+        self.writer = writer
+
+
+class Collector:
+    """Сервер сборщика: прием соединений, пакетная запись в SQLite и сводная статистика
+
+    serve() - корутина для своего цикла asyncio; start()/stop() запускают ее в отдельном потоке.
+    """
+
+    def __init__(self, address=DEFAULT_COLLECTOR_ADDRESS, database=DEFAULT_DATABASE,
+                 batch_size=1000, flush_interval=0.5, max_pending=5000):
+        self.address = address
+        self.store = database if isinstance(database, EventStore) else EventStore(database)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending  # строк на соединение до приостановки чтения
+        self.workstations = {}  # имя -> счетчики рабочего места
+        self._sources = set()
+        self._events = []
+        self._operations = []
+        self._credits = {}  # источник -> строк в текущей пачке
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='CollectorWriter')
+        self._loop = None
+        self._stopping = None
+        self._full = None
+        self._thread = None
+
+        # Счетчики
+        self.connections = 0
+        self.disconnects = 0
+        self.messages = 0
+        self.rows_written = 0
+        self.rows_dropped = 0  # строки пачек, транзакция которых не удалась
+        self.rejected = 0  # сообщения неверного вида (не попадают в пачку)
+        self.batches = 0
+        self.insert_seconds = 0.0
+        self.pauses = 0
+        self.errors = 0
+
+    async def serve(self, ready=None):
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._full = asyncio.Event()
+        family, sockaddr = parse_address(self.address)
+        if family == socket.AF_INET:
+            server = await asyncio.start_server(self._handle, *sockaddr, backlog=512)
+            if sockaddr[1] == 0:
+                self.address = f"tcp://{sockaddr[0]}:{server.sockets[0].getsockname()[1]}"
+        else:
+            if os.path.exists(sockaddr):
+                os.unlink(sockaddr)
+            server = await asyncio.start_unix_server(self._handle, sockaddr, backlog=512)
+        flusher = asyncio.create_task(self._flush_loop())
+        if ready is not None:
+            ready.set()
+
+        await self._stopping.wait()
+        server.close()
+        for source in list(self._sources):
+            source.writer.close()
+            source.resume.set()
+        await server.wait_closed()
+        flusher.cancel()
+        try:
+            await flusher
+        except asyncio.CancelledError:
+            pass
+        # Остаток принятых строк записывается до выхода
+        await self.flush()
+        if family != socket.AF_INET and os.path.exists(sockaddr):
+            os.unlink(sockaddr)
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        source = _Source(f"{peer[0]}:{peer[1]}" if isinstance(peer, tuple) else str(peer or 'local'), writer)
+        self._sources.add(source)
+        self.connections += 1
+        decoder = FrameDecoder()
+        try:
+            while not self._stopping.is_set():
+                data = await reader.read(256 * 1024)
+                if not data:
+                    break
+                for message in decoder.feed(data):
+                    self._ingest(source, message)
+                # Обратное давление: не читаем соединение, пока его строки не записаны
+                while source.pending >= self.max_pending and not self._stopping.is_set():
+                    source.resume.clear()
+                    source.pauses += 1
+                    self.pauses += 1
+                    await source.resume.wait()
+        except (ConnectionError, ValueError):
+            self.errors += 1
+        finally:
+            self._sources.discard(source)
+            if source.stats is not None:
+                source.stats['connected'] -= 1
+            self.disconnects += 1
+            writer.close()
+
+    def _ingest(self, source, message):
+        self.messages += 1
+        if not isinstance(message, dict) or not _valid_message(message):
+            # Одно неверное сообщение не должно сорвать запись пачки других рабочих мест
+            self.rejected += 1
+            if source.stats is not None:
+                source.stats['rejected'] += 1
+            return
+        kind = message.get('type')
+        if kind == 'event':
+            message['workstation'] = source.workstation
+            self._events.append(message)
+            if source.stats is not None:
+                source.stats['events'] += 1
+        elif kind == 'operation':
+            message['workstation'] = source.workstation
+            self._operations.append(message)
+            if source.stats is not None:
+                source.stats['operations'] += 1
+                if message.get('status') == STATUS_COMPLETED:
+                    source.stats['completed'] += 1
+                source.stats['duration'] += message.get('duration') or 0.0
+        elif kind == 'hello':
+            source.workstation = str(message.get('workstation') or source.peer)
+            source.stats = self.workstations.setdefault(source.workstation, _workstation_stats())
+            source.stats['connected'] += 1
+            return
+        else:
+            return
+        source.pending += 1
+        self._credits[source] = self._credits.get(source, 0) + 1
+        if len(self._events) + len(self._operations) >= self.batch_size:
+            self._full.set()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Записать накопленные строки одной транзакцией (в потоке записи); возвращает их число"""
+        if not self._events and not self._operations:
+            return 0
+        events, operations, credits = self._events, self._operations, self._credits
+        self._events, self._operations, self._credits = [], [], {}
+        rows = len(events) + len(operations)
+        started = time.perf_counter()
+        try:
+            await self._loop.run_in_executor(self._writer, self.store.append, events, operations)
+        except Exception:
+            # Пачка потеряна, но цикл записи продолжается
+            self.errors += 1
+            self.rows_dropped += rows
+            rows = 0
+        else:
+            self.batches += 1
+            self.rows_written += rows
+        finally:
+            self.insert_seconds += time.perf_counter() - started
+            # Кредиты освобождаются в любом случае - иначе соединения остаются приостановленными
+            for source, count in credits.items():
+                source.pending -= count
+                if source.pending < self.max_pending:
+                    source.resume.set()
+        return rows
+
+    def start(self):
+        """Запустить сборщик в отдельном потоке; возвращает self после открытия порта"""
+        ready = threading.Event()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self.serve(ready)), name='Collector', daemon=True)
+        self._thread.start()
+        ready.wait(10)
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._stopping is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self._writer.shutdown()
+        self.store.close()
+
+    def get_statistics(self):
+        """Сводная статистика по всем рабочим местам"""
+        workstations = {}
+        operations = completed = 0
+        duration = 0.0
+        for name, stats in list(self.workstations.items()):
+            operations += stats['operations']
+            completed += stats['completed']
+            duration += stats['duration']
+            workstations[name] = {
+                'connected': stats['connected'] > 0,
+                'events': stats['events'],
+                'operations': stats['operations'],
+                'completed': stats['completed'],
+                'rejected': stats['rejected'],
+                'avg_duration': stats['duration'] / stats['operations'] if stats['operations'] else 0.0,
+            }
+        return {
+            'clients': len(self._sources),
+            'workstations': len(workstations),
+            'connections': self.connections,
+            'disconnects': self.disconnects,
+            'messages': self.messages,
+            'events': sum(stats['events'] for stats in workstations.values()),
+            'operations': operations,
+            'completed': completed,
+            'interrupted_or_cancelled': operations - completed,
+            'avg_duration': duration / operations if operations else 0.0,
+            'buffered': len(self._events) + len(self._operations),
+            'rows_written': self.rows_written,
+            'rows_dropped': self.rows_dropped,
+            'rejected': self.rejected,
+            'batches': self.batches,
+            'avg_batch': self.rows_written / self.batches if self.batches else 0.0,
+            'insert_seconds': self.insert_seconds,
+            'pauses': self.pauses,
+            'errors': self.errors,
+            'per_workstation': workstations,
+        }
+
+
+class CollectorUplink:
+    """Отправка потока службы мониторинга на сборщик (свой поток, переподключение)
+
+    send_many() не ждет сети. Пока сборщик недоступен или приостановил чтение, сообщения
+    копятся в очереди не длиннее max_pending; при переполнении теряются самые старые.
+    """
+
+    def __init__(self, address=DEFAULT_COLLECTOR_ADDRESS, workstation=None, max_pending=50000,
+                 retry_interval=2.0):
+        self.address = address
+        self.workstation = workstation or socket.gethostname()
+        self.max_pending = max_pending
+        self.retry_interval = retry_interval
+        self._chunks = deque()  # (число сообщений, кадры)
+        self._pending = 0
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.sock = None
+
+        # Счетчики
+        self.sent = 0
+        self.dropped = 0
+        self.reconnects = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='CollectorUplink', daemon=True)
+        self._thread.start()
+        return self
+
+    def send_many(self, messages):
+        if not messages:
+            return
+        chunk = b''.join(encode_frame(message) for message in messages)
+        with self._condition:
+            self._chunks.append((len(messages), chunk))
+            self._pending += len(messages)
+            while self._pending > self.max_pending and len(self._chunks) > 1:
+                count, _ = self._chunks.popleft()
+                self._pending -= count
+                self.dropped += count
+            self._condition.notify()
+
+    def _connect(self):
+        family, sockaddr = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(5.0)
+        sock.connect(sockaddr)
+        sock.settimeout(None)
+        sock.sendall(encode_frame({'type': 'hello', 'version': PROTOCOL_VERSION,
+                                   'workstation': self.workstation, 'pid': os.getpid()}))
+        return sock
+
+    def _run(self):
+        while self._running:
+            if self.sock is None:
+                try:
+                    self.sock = self._connect()
+                except OSError:
+                    time.sleep(self.retry_interval)
+                    continue
+            with self._condition:
+                while self._running and not self._chunks:
+                    self._condition.wait(0.5)
+                if not self._chunks:
+                    continue
+                count, chunk = self._chunks[0]
+            try:
+                self.sock.sendall(chunk)
+            except OSError:
+                # Пачка остается в очереди и уходит после переподключения
+                self.sock.close()
+                self.sock = None
+                self.reconnects += 1
+                continue
+            with self._condition:
+                if self._chunks and self._chunks[0][1] is chunk:
+                    self._chunks.popleft()
+                    self._pending -= count
+            self.sent += count
+
+    def stop(self, timeout=1.0):
+        """Дождаться отправки очереди (не дольше timeout) и закрыть соединение"""
+        deadline = time.monotonic() + timeout
+        while self._pending and self.sock is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self._running = False
+        with self._condition:
+            self._condition.notify()
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def get_stats(self):
+        return {
+            'connected': self.sock is not None,
+            'sent': self.sent,
+            'pending': self._pending,
+            'dropped': self.dropped,
+            'reconnects': self.reconnects,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Центральный сборщик событий служб мониторинга")
+    parser.add_argument('--listen', default=DEFAULT_COLLECTOR_ADDRESS, help='адрес (tcp://хост:порт или unix://путь)')
+    parser.add_argument('--database', default=DEFAULT_DATABASE, help='файл SQLite')
+    parser.add_argument('--batch-size', type=int, default=1000, help='строк в транзакции')
+    parser.add_argument('--flush-interval', type=float, default=0.5, help='наибольшая задержка записи, с')
+    parser.add_argument('--max-pending', type=int, default=5000, help='незаписанных строк на соединение')
+    parser.add_argument('--stats-interval', type=float, default=60.0, help='период вывода статистики, с')
+    args = parser.parse_args(argv)
+
+    collector = Collector(args.listen, args.database, args.batch_size, args.flush_interval, args.max_pending)
+    stop_requested = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop_requested.set())
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, lambda *_: stop_requested.set())
+
+    collector.start()
+    print(f"[ИНФО] Сборщик: {collector.address}, база: {args.database}", file=sys.stderr)
+    next_report = time.monotonic() + args.stats_interval
+    try:
+        while not stop_requested.wait(0.5):
+            if time.monotonic() >= next_report:
+                next_report += args.stats_interval
+                stats = collector.get_statistics()
+                print(f"[ИНФО] Рабочих мест: {stats['workstations']} (подключено {stats['clients']}), "
+                      f"событий: {stats['events']}, операций: {stats['operations']}, "
+                      f"записано строк: {stats['rows_written']}", file=sys.stderr)
+    finally:
+        collector.stop()
+    stats = collector.get_statistics()
+    print(f"[ИНФО] Событий: {stats['events']}, операций: {stats['operations']} "
+          f"(завершено {stats['completed']}), пачек записи: {stats['batches']}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
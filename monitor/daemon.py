@@ -0,0 +1,209 @@
+"""
+Служба мониторинга без GUI: захват событий 1С, анализ операций и публикация по локальному сокету
+
+Подписчики (GUI, сборщики, утилиты) подключаются к адресу службы и получают поток сообщений
+monitor.ipc: события, распознанные операции и служебные сообщения.
+
+Запуск:
+    python -m monitor.daemon [--process 1cv8c.exe] [--listen tcp://127.0.0.1:47810]
+                             [--patterns config/operation_patterns.json] [--history logs/daemon_history.log]
+                             [--backend events|polling] [--no-focus] [--no-clicks] [--no-input]
+                             [--collector tcp://сервер:47820] [--workstation имя] [--archive logs/operations]
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+
+from monitor.collector import CollectorUplink
+from monitor.event_buffer import EventBuffer
+from monitor.history_writer import HistoryWriter
+from monitor.ipc import EventPublisher, DEFAULT_ADDRESS
+from monitor.operation_analyzer import OperationAnalyzer
+from monitor.operation_archive import OperationArchive
+from monitor.replay import DEFAULT_PATTERNS, load_patterns
+from monitor.ui_monitor import UIMonitor
+
+DEFAULT_HISTORY = "logs/daemon_history.log"
+
+
+class MonitorDaemon:
+    """Цикл захвата UIMonitor в отдельном потоке и публикация его результатов
+
+    Поток монитора только кладет события в EventBuffer; пачки разбирает поток публикации:
+    строки истории, анализ операций, рассылка подписчикам (как таймер главного окна).
+    uplink (CollectorUplink) дополнительно передает пачки на центральный сборщик.
+    """
+
+    def __init__(self, monitor, publisher, analyzer=None, history=None, drain_interval=0.05, uplink=None):
+        self.monitor = monitor
+        self.publisher = publisher
+        self.uplink = uplink
+        self.analyzer = analyzer or OperationAnalyzer()
+        self.history = history
+        self.drain_interval = drain_interval
+        self.buffer = EventBuffer()
+        self._stopped = threading.Event()
+        self._pending = []  # сообщения об операциях, закрытых в текущей пачке
+        self.analyzer.operation_listeners.append(self._on_operation)
+        self.capture_thread = None
+        self.pump_thread = None
+
+        # Счетчики
+        self.events = 0
+        self.operations = 0
+
+    def start(self):
+        self.publisher.start()
+        if self.uplink is not None:
+            self.uplink.start()
+        if self.history is not None:
+            self.history.start()
+        self.pump_thread = threading.Thread(target=self._pump, name='MonitorPump', daemon=True)
+        self.pump_thread.start()
+        self.capture_thread = threading.Thread(target=self._capture, name='MonitorCapture', daemon=True)
+        self.capture_thread.start()
+        return self
+
+    def _capture(self):
+        try:
+            self.monitor.start_monitoring(self._on_log, self._on_status, self.buffer.push)
+        finally:
+            # Мониторинг завершился сам (1С не найдена или ошибка) - служба останавливается
+            self._stopped.set()
+
+    def _on_log(self, message):
+        message = message.strip()
+        if not message:
+            return
+        if self.history is not None:
+            self.history.write(message)
+        self.publisher.publish({'type': 'log', 'message': message})
+
+    def _on_status(self, success, message):
+        status = {'type': 'status', 'success': success, 'message': message}
+        # Подписчик, подключившийся позже, сразу получает состояние подключения
+        self.publisher.greeting = self.publisher.greeting[:1] + [status]
+        self._on_log(f"[УСПЕХ] {message}" if success else f"[ОШИБКА] {message}")
+        self.publisher.publish(status)
+
+    def _on_operation(self, operation):
+        self.operations += 1
+        self._pending.append(dict(operation.to_dict(), type='operation'))
+
+    def _pump(self):
+        while not self._stopped.wait(self.drain_interval):
+            self.drain()
+        self.drain()
+
+    def drain(self):
+        """Обработать накопившиеся события пачкой; возвращает их число"""
+        events = self.buffer.drain()
+        if not events:
+            return 0
+        self.events += len(events)
+        if self.history is not None:
+            self.history.write_lines([event.to_log_line() for event in events])
+
+        messages = []
+        for event in events:
+            messages.append(dict(event.to_dict(), type='event'))
+            try:
+                result = self.analyzer.analyze_action(event)
+            except Exception:
+                continue
+            if result:
+                messages.append({'type': 'analysis', 'message': result})
+            if self._pending:
+                messages.extend(self._pending)
+                self._pending = []
+        self.publisher.publish_many(messages)
+        if self.uplink is not None:
+            self.uplink.send_many(messages)
+        return len(events)
+
+    def wait(self, timeout=None):
+        """Ждать остановки службы; True - остановлена"""
+        return self._stopped.wait(timeout)
+
+    def stop(self):
+        self.monitor.stop_monitoring()
+        if self.capture_thread is not None:
+            self.capture_thread.join(timeout=5.0)
+        # Поток публикации разбирает остаток событий и завершается
+        self._stopped.set()
+        if self.pump_thread is not None:
+            self.pump_thread.join(timeout=5.0)
+        self.publisher.stop()
+        if self.uplink is not None:
+            self.uplink.stop()
+        if self.history is not None:
+            self.history.close()
+        self.analyzer.completed_operations.close()
+
+    def get_stats(self):
+        stats = {
+            'events': self.events,
+            'operations': self.operations,
+            'buffer': self.buffer.get_stats(),
+            'publisher': self.publisher.get_stats(),
+            'archive': self.analyzer.completed_operations.get_stats(),
+        }
+        if self.uplink is not None:
+            stats['uplink'] = self.uplink.get_stats()
+        return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Служба мониторинга 1С без GUI")
+    parser.add_argument('--process', default='1cv8c.exe', help='имя процесса 1С')
+    parser.add_argument('--listen', default=DEFAULT_ADDRESS, help='адрес публикации (tcp://хост:порт или unix://путь)')
+    parser.add_argument('--patterns', default=DEFAULT_PATTERNS, help='файл паттернов операций (JSON)')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='файл истории событий (пусто - не писать)')
+    parser.add_argument('--backend', default='events', choices=('events', 'polling'))
+    parser.add_argument('--no-focus', action='store_true', help='не фиксировать переходы фокуса')
+    parser.add_argument('--no-clicks', action='store_true', help='не фиксировать клики')
+    parser.add_argument('--no-input', action='store_true', help='не фиксировать ввод')
+    parser.add_argument('--collector', help='адрес центрального сборщика (monitor.collector)')
+    parser.add_argument('--workstation', help='имя рабочего места для сборщика (по умолчанию - имя компьютера)')
+    parser.add_argument('--archive', help='каталог архива закрытых операций (без него в памяти только последние)')
+    args = parser.parse_args(argv)
+
+    analyzer = OperationAnalyzer()
+    if args.archive:
+        analyzer.completed_operations = OperationArchive(args.archive)
+    if os.path.exists(args.patterns):
+        analyzer.patterns = load_patterns(args.patterns)
+    history = None
+    if args.history:
+        os.makedirs(os.path.dirname(args.history) or '.', exist_ok=True)
+        history = HistoryWriter(args.history)
+    monitor = UIMonitor(args.process, not args.no_focus, not args.no_clicks, not args.no_input,
+                        backend=args.backend)
+    uplink = CollectorUplink(args.collector, args.workstation) if args.collector else None
+    daemon = MonitorDaemon(monitor, EventPublisher(args.listen), analyzer, history, uplink=uplink)
+
+    stop_requested = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop_requested.set())
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, lambda *_: stop_requested.set())
+
+    daemon.start()
+    print(f"[ИНФО] Служба мониторинга: {daemon.publisher.address}", file=sys.stderr)
+    try:
+        # Короткие ожидания - чтобы обработчик сигнала срабатывал и на Windows
+        while not stop_requested.is_set() and not daemon.wait(0.5):
+            pass
+    finally:
+        daemon.stop()
+    stats = daemon.get_stats()
+    print(f"[ИНФО] Событий: {stats['events']}, операций: {stats['operations']}, "
+          f"подписчиков подключалось: {stats['publisher']['connections']}", file=sys.stderr)
+    if 'uplink' in stats:
+        print(f"[ИНФО] Передано на сборщик: {stats['uplink']['sent']}, потеряно: {stats['uplink']['dropped']}",
+              file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
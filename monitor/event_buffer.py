@@ -0,0 +1,72 @@
+"""
+Ограниченный буфер событий между потоком мониторинга и GUI
+"""
+import threading
+from collections import deque
+from monitor.events import EVENT_FOCUS
+
+# Политики при переполнении буфера
+DROP_OLDEST = 'drop_oldest'  # вытеснить самое старое событие
+DROP_NEWEST = 'drop_newest'  # отбросить новое событие
+COALESCE = 'coalesce'  # объединить подряд идущие переходы фокуса, иначе вытеснить старое
+
+
+class EventBuffer:
+    """Кольцевой буфер: поток монитора добавляет события, GUI забирает их пачками по таймеру"""
+
+    def __init__(self, capacity=5000, policy=COALESCE):
+        if policy not in (DROP_OLDEST, DROP_NEWEST, COALESCE):
+            raise ValueError(f"Неизвестная политика буфера: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self._items = deque()
+        self._lock = threading.Lock()
+        self.pushed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.high_watermark = 0
+
+    def push(self, event):
+        """Добавить событие (вызывается из потока монитора)"""
+        with self._lock:
+            self.pushed += 1
+            items = self._items
+            if len(items) >= self.capacity:
+                if (self.policy == COALESCE and event.event_type == EVENT_FOCUS
+                        and items[-1].event_type == EVENT_FOCUS):
+                    # Промежуточный фокус при быстром переходе по таблице не важен
+                    items[-1] = event
+                    self.coalesced += 1
+                    return
+                self.dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return
+                items.popleft()
+            items.append(event)
+            if len(items) > self.high_watermark:
+                self.high_watermark = len(items)
+
+    def drain(self, limit=None):
+        """Забрать накопившиеся события (не больше limit)"""
+        with self._lock:
+            items = self._items
+            if limit is None or limit >= len(items):
+                batch = list(items)
+                items.clear()
+            else:
+                batch = [items.popleft() for _ in range(limit)]
+        return batch
+
+    def __len__(self):
+        return len(self._items)
+
+    def get_stats(self):
+        """Счетчики буфера"""
+        return {
+            'size': len(self._items),
+            'capacity': self.capacity,
+            'pushed': self.pushed,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'high_watermark': self.high_watermark,
+        }
@@ -0,0 +1,320 @@
+"""
+Хранилище событий и операций в SQLite: строки интернированы, выборки по индексам
+
+Типы элементов, имена, пути, окна и ключи паттернов повторяются в миллионах событий,
+поэтому хранятся один раз в таблице strings, а в событиях - их номера. Индексы: время
+события, тип события, имя элемента; у операций - время начала и ключ паттерна.
+Записи только добавляются.
+
+В памяти - только ограниченный кэш последних строк (номера документов в путях и окнах
+не ограничены, сборщик работает месяцами). Номер новой строки выдает сама база
+(уникальный индекс strings.text), выборки получают текст подзапросом.
+
+Запуск:
+    python -m monitor.event_store import logs/monitor_history*.log* [--database logs/events.db]
+                                  [--patterns config/operation_patterns.json] [--workstation ws01]
+    python -m monitor.event_store durations [--database logs/events.db] [--operation 'Создание документа']
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+
+from monitor.events import UIEvent, PATH_SEPARATOR
+from monitor.operation_analyzer import OperationAnalyzer
+from monitor.replay import iter_events, load_patterns
+
+DEFAULT_STORE = "logs/events.db"
+STRING_CACHE_SIZE = 20000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS strings (id INTEGER PRIMARY KEY, text TEXT NOT NULL);
+CREATE UNIQUE INDEX IF NOT EXISTS strings_text ON strings(text);
+CREATE TABLE IF NOT EXISTS events (
+    timestamp INTEGER NOT NULL, event_type INTEGER, control_type INTEGER, name INTEGER,
+    automation_id INTEGER, class_name INTEGER, path INTEGER, old_value TEXT, new_value TEXT,
+    pid INTEGER, window INTEGER, workstation INTEGER
+);
+CREATE INDEX IF NOT EXISTS events_time ON events(timestamp);
+CREATE INDEX IF NOT EXISTS events_type ON events(event_type, timestamp);
+CREATE INDEX IF NOT EXISTS events_name ON events(name, timestamp);
+CREATE TABLE IF NOT EXISTS operations (
+    start_ns INTEGER, end_ns INTEGER, operation INTEGER, pattern_key INTEGER, status INTEGER,
+    duration REAL, actions INTEGER, workstation INTEGER, context TEXT
+);
+CREATE INDEX IF NOT EXISTS operations_time ON operations(start_ns);
+CREATE INDEX IF NOT EXISTS operations_pattern ON operations(pattern_key, start_ns);
+"""
+
+# Фильтры выборок: имя аргумента -> столбец со строкой
+_EVENT_FIELDS = ('event_type', 'control_type', 'name', 'automation_id', 'class_name', 'window', 'workstation')
+_OPERATION_FIELDS = ('operation', 'pattern_key', 'status', 'workstation')
+
+
+def _text(column):
+    """Текст строки по номеру в столбце (NULL - NULL)"""
+    return f"(SELECT text FROM strings WHERE id = {column})"
+
+
+_EVENT_COLUMNS = ', '.join(['timestamp'] + [_text(column) for column in (
+    'event_type', 'control_type', 'name', 'automation_id', 'class_name', 'path')] +
+    ['old_value', 'new_value', 'pid', _text('window')])
+_OPERATION_COLUMNS = ', '.join(['start_ns', 'end_ns', _text('operation'), _text('pattern_key'), _text('status'),
+                                'duration', 'actions', _text('workstation'), 'context'])
+
+
+class EventStore:
+    """События UIEvent и операции в одном файле SQLite
+
+    append() принимает объекты (UIEvent, Operation) или их словари to_dict(); ключ
+    'workstation' в словаре заменяет рабочее место, переданное аргументом.
+    Выборки events()/operations() - по диапазону времени (нс) и точным значениям полей.
+    """
+
+    def __init__(self, path=DEFAULT_STORE, cache_size=STRING_CACHE_SIZE):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Запись и чтение ведет один поток (у сборщика - поток записи)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+        self._ids = OrderedDict()  # строка -> номер, последние использованные
+        self.cache_size = cache_size
+
+        # Счетчики
+        self.transactions = 0
+        self.events_written = 0
+        self.operations_written = 0
+        self.cache_misses = 0
+
+    def _remember(self, text, string_id):
+        self._ids[text] = string_id
+        if len(self._ids) > self.cache_size:
+            self._ids.popitem(last=False)
+
+    def _intern(self, text):
+        """Номер строки; новая строка добавляется в текущую транзакцию"""
+        if text is None:
+            return None
+        string_id = self._ids.get(text)
+        if string_id is not None:
+            self._ids.move_to_end(text)
+            return string_id
+        self.cache_misses += 1
+        cursor = self.connection.execute("INSERT OR IGNORE INTO strings (text) VALUES (?)", (text,))
+        if cursor.rowcount:
+            string_id = cursor.lastrowid
+        else:
+            string_id = self.connection.execute("SELECT id FROM strings WHERE text = ?", (text,)).fetchone()[0]
+        self._remember(text, string_id)
+        return string_id
+
+    def _lookup(self, text):
+        """Номер строки без добавления; None - такой строки нет"""
+        string_id = self._ids.get(text)
+        if string_id is None:
+            row = self.connection.execute("SELECT id FROM strings WHERE text = ?", (text,)).fetchone()
+            if row is not None:
+                string_id = row[0]
+                self._remember(text, string_id)
+        return string_id
+
+    def _event_row(self, event, workstation):
+        intern = self._intern
+        if isinstance(event, dict):
+            path = event.get('path')
+            return (event['timestamp'], intern(event.get('event_type')), intern(event.get('control_type')),
+                    intern(event.get('name')), intern(event.get('automation_id')), intern(event.get('class_name')),
+                    intern(PATH_SEPARATOR.join(path) if path else ''), event.get('old_value'),
+                    event.get('new_value'), event.get('pid'), intern(event.get('window')),
+                    intern(event.get('workstation', workstation)))
+        return (event.timestamp, intern(event.event_type), intern(event.control_type), intern(event.name),
+                intern(event.automation_id), intern(event.class_name),
+                intern(PATH_SEPARATOR.join(event.path) if event.path else ''), event.old_value,
+                event.new_value, event.pid, intern(event.window), intern(workstation))
+
+    def _operation_row(self, operation, workstation):
+        data = operation if isinstance(operation, dict) else operation.to_dict()
+        intern = self._intern
+        return (data.get('start_ns'), data.get('end_ns'), intern(data.get('operation')),
+                intern(data.get('pattern_key')), intern(data.get('status')), data.get('duration'),
+                data.get('actions'), intern(data.get('workstation', workstation)),
+                json.dumps(data.get('context') or {}, ensure_ascii=False))
+
+    def append(self, events=(), operations=(), workstation=''):
+        """Добавить пачку одной транзакцией"""
+        try:
+            with self.connection:
+                # Новые строки добавляются в той же транзакции, что и ссылающиеся на них записи
+                event_rows = [self._event_row(event, workstation) for event in events]
+                operation_rows = [self._operation_row(operation, workstation) for operation in operations]
+                if event_rows:
+                    self.connection.executemany(f"INSERT INTO events VALUES ({','.join('?' * 12)})", event_rows)
+                if operation_rows:
+                    self.connection.executemany(f"INSERT INTO operations VALUES ({','.join('?' * 9)})",
+                                                operation_rows)
+        except Exception:
+            # Транзакция откачена: номера строк, выданные в ней, недействительны
+            self._ids.clear()
+            raise
+        self.transactions += 1
+        self.events_written += len(event_rows)
+        self.operations_written += len(operation_rows)
+
+    def _where(self, fields, time_column, start, end, filters):
+        """Условие WHERE и параметры; None - фильтр по строке, которой нет в базе"""
+        clauses = []
+        params = []
+        for field, value in filters.items():
+            if value is None:
+                continue
+            if field not in fields:
+                raise TypeError(f"Неизвестный фильтр: {field}")
+            string_id = self._lookup(value)
+            if string_id is None:
+                return None
+            clauses.append(f"{field} = ?")
+            params.append(string_id)
+        if start is not None:
+            clauses.append(f"{time_column} >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append(f"{time_column} < ?")
+            params.append(end)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def events(self, start=None, end=None, limit=None, **filters):
+        """События за [start, end) по времени, отфильтрованные по полям (event_type, name, window, ...)"""
+        where = self._where(_EVENT_FIELDS, 'timestamp', start, end, filters)
+        if where is None:
+            return
+        sql = f"SELECT {_EVENT_COLUMNS} FROM events{where[0]} ORDER BY timestamp"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        for row in self.connection.execute(sql, where[1]):
+            path = row[6]
+            yield UIEvent(row[1], row[0], row[2] or '', row[3] or '', row[4] or '', row[5] or '',
+                          tuple(path.split(PATH_SEPARATOR)) if path else (),
+                          row[7], row[8], row[9], row[10])
+
+    def count_events(self, start=None, end=None, **filters):
+        where = self._where(_EVENT_FIELDS, 'timestamp', start, end, filters)
+        if where is None:
+            return 0
+        return self.connection.execute(f"SELECT COUNT(*) FROM events{where[0]}", where[1]).fetchone()[0]
+
+    def operations(self, start=None, end=None, limit=None, **filters):
+        """Операции (словари как Operation.to_dict()) по времени начала и полям"""
+        where = self._where(_OPERATION_FIELDS, 'start_ns', start, end, filters)
+        if where is None:
+            return
+        sql = f"SELECT {_OPERATION_COLUMNS} FROM operations{where[0]} ORDER BY start_ns"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        for row in self.connection.execute(sql, where[1]):
+            yield {
+                'start_ns': row[0],
+                'end_ns': row[1],
+                'operation': row[2],
+                'pattern_key': row[3],
+                'status': row[4],
+                'duration': row[5],
+                'actions': row[6],
+                'workstation': row[7] or '',
+                'context': json.loads(row[8]) if row[8] else {},
+            }
+
+    def durations(self, start=None, end=None, group_by='workstation', **filters):
+        """Длительность операций по группам: {значение group_by: {count, avg, min, max}}"""
+        if group_by not in _OPERATION_FIELDS:
+            raise TypeError(f"Неизвестное поле группировки: {group_by}")
+        where = self._where(_OPERATION_FIELDS, 'start_ns', start, end, filters)
+        if where is None:
+            return {}
+        sql = (f"SELECT {_text(group_by)}, COUNT(*), AVG(duration), MIN(duration), MAX(duration) "
+               f"FROM operations{where[0]} GROUP BY {group_by}")
+        return {
+            key: {'count': count, 'avg': avg, 'min': low, 'max': high}
+            for key, count, avg, low, high in self.connection.execute(sql, where[1])
+        }
+
+    def close(self):
+        self.connection.close()
+
+    def get_stats(self):
+        return {
+            'strings': self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM strings").fetchone()[0],
+            'strings_cached': len(self._ids),
+            'cache_misses': self.cache_misses,
+            'transactions': self.transactions,
+            'events_written': self.events_written,
+            'operations_written': self.operations_written,
+        }
+
+
+def import_history(store, paths, patterns=None, workstation='', batch_size=10000):
+    """Загрузить файлы истории в хранилище; с patterns - еще и распознанные операции"""
+    operations = []
+    analyzer = None
+    if patterns is not None:
+        analyzer = OperationAnalyzer()
+        analyzer.patterns = patterns
+        analyzer.operation_listeners.append(operations.append)
+
+    events = []
+    total = 0
+    for event in iter_events(paths):
+        events.append(event)
+        if analyzer is not None:
+            analyzer.analyze_action(event)
+        if len(events) >= batch_size:
+            store.append(events, operations, workstation)
+            total += len(events)
+            events, operations[:] = [], []
+    if analyzer is not None:
+        # Операции, не закрытые к концу лога, записываются прерванными
+        analyzer.finish()
+    store.append(events, operations, workstation)
+    return total + len(events)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Хранилище событий и операций монитора")
+    commands = parser.add_subparsers(dest='command', required=True)
+    load = commands.add_parser('import', help='загрузить файлы истории')
+    load.add_argument('logs', nargs='+', help='файлы monitor_history.log и сегменты .log.gz')
+    load.add_argument('--database', default=DEFAULT_STORE)
+    load.add_argument('--patterns', help='файл паттернов: распознать и сохранить операции')
+    load.add_argument('--workstation', default='', help='рабочее место, к которому относится история')
+    report = commands.add_parser('durations', help='длительность операций по рабочим местам')
+    report.add_argument('--database', default=DEFAULT_STORE)
+    report.add_argument('--operation', help='тип операции')
+    report.add_argument('--pattern-key', help='ключ паттерна')
+    report.add_argument('--group-by', default='workstation', choices=_OPERATION_FIELDS)
+    args = parser.parse_args(argv)
+
+    store = EventStore(args.database)
+    try:
+        if args.command == 'import':
+            patterns = load_patterns(args.patterns) if args.patterns else None
+            started = time.perf_counter()
+            events = import_history(store, args.logs, patterns, args.workstation)
+            elapsed = time.perf_counter() - started
+            print(f"[ИНФО] Загружено событий: {events}, операций: {store.operations_written}"
+                  f" за {elapsed:.2f} с", file=sys.stderr)
+        else:
+            for key, stats in sorted(store.durations(group_by=args.group_by, operation=args.operation,
+                                                     pattern_key=args.pattern_key).items(),
+                                     key=lambda item: str(item[0])):
+                print(f"{key or '-'}: {stats['count']} операций, средняя {stats['avg']:.1f} с,"
+                      f" от {stats['min']:.1f} до {stats['max']:.1f} с")
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""
+Структурированные события UI - передаются от монитора к анализатору и GUI без промежуточных строк
+"""
+import re
+import time
+from array import array
+from datetime import datetime, timedelta
+
+from monitor.symbols import SYMBOLS
+
+# Типы событий
+EVENT_FOCUS = 'ФОКУС'
+EVENT_CLICK = 'КЛИК'
+EVENT_INPUT = 'ВВОД'
+EVENT_TYPES = (EVENT_FOCUS, EVENT_CLICK, EVENT_INPUT)
+
+# Метки служебных сообщений в логе
+SERVICE_TAGS = ('[СТАРТ]', '[СТОП]', '[ИНФО]', '[НАСТРОЙКИ]', '[УСПЕХ]', '[ОШИБКА]', '[ЭКСПОРТ]')
+
+PATH_SEPARATOR = " → "
+
+# Точка отсчета: время эпохи, но монотонное в пределах процесса
+_EPOCH_BASE_NS = time.time_ns()
+_MONOTONIC_BASE_NS = time.monotonic_ns()
+
+
+def now_ns():
+    """Текущее время в наносекундах эпохи (монотонное, не скачет при коррекции часов)"""
+    return _EPOCH_BASE_NS + (time.monotonic_ns() - _MONOTONIC_BASE_NS)
+
+
+def format_clock(timestamp_ns):
+    """Время события в виде ЧЧ:ММ:СС.ммм"""
+    seconds, nanos = divmod(timestamp_ns, 1_000_000_000)
+    return f"{datetime.fromtimestamp(seconds):%H:%M:%S}.{nanos // 1_000_000:03d}"
+
+
+def format_path(path):
+    """Путь к элементу в виде строки"""
+    return PATH_SEPARATOR.join(path) if path else "Unknown"
+
+
+_TEXTS = SYMBOLS.texts
+
+
+def _symbol(slot):
+    """Строковый атрибут события, хранимый номером из SYMBOLS"""
+    def get(self):
+        return _TEXTS[getattr(self, slot)]
+
+    def set(self, text):
+        setattr(self, slot, SYMBOLS.intern(text))
+    return property(get, set)
+
+
+class UIEvent:
+    """Событие UI: клик, переход фокуса или ввод
+
+    Для ФОКУС new_value - значение элемента в момент перехода,
+    для ВВОД old_value/new_value - значение до и после изменения.
+    pid и window - процесс и заголовок окна верхнего уровня, где произошло событие.
+    Тип элемента, AutomationId и класс хранятся номерами из monitor.symbols; атрибуты
+    читаются и присваиваются как обычные строки. Имя, путь и окно - обычные строки.
+    """
+    FIELDS = ('event_type', 'timestamp', 'control_type', 'name', 'automation_id',
+              'class_name', 'path', 'old_value', 'new_value', 'pid', 'window')
+    __slots__ = ('event_type', 'timestamp', '_control_type', 'name', '_automation_id',
+                 '_class_name', 'path', 'old_value', 'new_value', 'pid', 'window')
+
+    def __init__(self, event_type, timestamp, control_type='', name='', automation_id='',
+                 class_name='', path=(), old_value=None, new_value=None, pid=None, window=None):
+        intern = SYMBOLS.intern
+        self.event_type = event_type
+        self.timestamp = timestamp  # нс эпохи, см. now_ns()
+        self._control_type = intern(control_type)
+        self.name = name
+        self._automation_id = intern(automation_id)
+        self._class_name = intern(class_name)
+        self.path = tuple(path) if path else ()  # Сегменты пути от окна к элементу
+        self.old_value = old_value
+        self.new_value = new_value
+        self.pid = pid
+        self.window = window
+
+    control_type = _symbol('_control_type')
+    automation_id = _symbol('_automation_id')
+    class_name = _symbol('_class_name')
+
+    @property
+    def clock(self):
+        return format_clock(self.timestamp)
+
+    @property
+    def path_text(self):
+        return format_path(self.path)
+
+    def to_log_line(self):
+        """Строка технического лога (формат monitor_history.log)"""
+        element_info = []
+        if self.control_type:
+            element_info.append(f"Type: {self.control_type}")
+        if self.name:
+            element_info.append(f"Name: '{self.name}'")
+        if self.automation_id:
+            element_info.append(f"AutomationId: '{self.automation_id}'")
+        if self.class_name:
+            element_info.append(f"ClassName: '{self.class_name}'")
+        if self.pid is not None:
+            element_info.append(f"PID: {self.pid}")
+        if self.window is not None:
+            element_info.append(f"Окно: '{self.window}'")
+        element_info.append(f"Путь: {self.path_text}")
+        if self.event_type == EVENT_INPUT:
+            element_info.append(f"Было: '{self.old_value}' → Стало: '{self.new_value}'")
+        elif self.new_value:
+            element_info.append(f"Value: '{self.new_value}'")
+        return f"[{self.clock}] {self.event_type} → {' | '.join(element_info)}"
+
+    def to_dict(self):
+        """Событие в виде словаря (для JSON)"""
+        data = {field: getattr(self, field) for field in self.FIELDS}
+        data['path'] = list(self.path)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Событие из словаря to_dict(); неизвестные ключи пропускаются"""
+        event = cls(data['event_type'], data['timestamp'])
+        for field in cls.FIELDS[2:]:
+            if field in data:
+                setattr(event, field, data[field])
+        event.path = tuple(event.path) if event.path else ()
+        return event
+
+    def __reduce__(self):
+        # Номера символов действительны только в своем процессе - передаем строки
+        return UIEvent.from_dict, (self.to_dict(),)
+
+    def __repr__(self):
+        return f"UIEvent({self.event_type!r}, {self.clock}, {self.control_type!r}, {self.name!r})"
+
+
+def _event_from_symbols(event_type, timestamp, symbols, texts, old_value, new_value):
+    """UIEvent из уже интернированных номеров (без повторного интернирования строк)"""
+    event = UIEvent.__new__(UIEvent)
+    event.event_type = _TEXTS[event_type]
+    event.timestamp = timestamp
+    event._control_type, event._automation_id, event._class_name, pid = symbols
+    event.name, event.path, event.window = texts
+    event.pid = None if pid < 0 else pid
+    event.old_value = old_value
+    event.new_value = new_value
+    return event
+
+
+class ActionLog:
+    """Последовательность событий в параллельных массивах; UIEvent собирается при обращении
+
+    Время - array('q'); тип события, тип элемента, AutomationId, класс (номера из SYMBOLS)
+    и PID (-1 - нет) - по STRIDE значений на событие в array('i'); имя, путь и окно - тройками
+    в списке. Значения полей почти всегда разные и хранятся списком пар, который создается
+    только при первом значении. Каждое обращение к элементу создает новый объект UIEvent.
+    """
+    STRIDE = 5
+    __slots__ = ('timestamps', '_fields', '_texts', '_values')
+
+    def __init__(self, events=()):
+        self.timestamps = array('q')
+        self._fields = array('i')
+        self._texts = []  # [имя, путь, окно, ...]
+        self._values = None  # [old, new, old, new, ...] после первого значения
+        for event in events:
+            self.append(event)
+
+    def append(self, event):
+        self.timestamps.append(event.timestamp)
+        self._fields.extend((SYMBOLS.intern(event.event_type), event._control_type, event._automation_id,
+                             event._class_name, -1 if event.pid is None else event.pid))
+        self._texts.extend((event.name, event.path, event.window))
+        if self._values is None:
+            if event.old_value is None and event.new_value is None:
+                return
+            self._values = [None] * (2 * (len(self.timestamps) - 1))
+        self._values.append(event.old_value)
+        self._values.append(event.new_value)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        start = index * self.STRIDE
+        fields = self._fields[start:start + self.STRIDE]
+        texts = self._texts[3 * index:3 * index + 3]
+        values = self._values
+        return _event_from_symbols(fields[0], self.timestamps[index], fields[1:], texts,
+                                   values[2 * index] if values else None,
+                                   values[2 * index + 1] if values else None)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __reduce__(self):
+        # Номера символов действительны только в своем процессе - передаем события
+        return ActionLog, (list(self),)
+
+
+_LINE_RE = re.compile(r'^\[(\d{2}):(\d{2}):(\d{2})\.(\d{3})\] (ФОКУС|КЛИК|ВВОД) → (.*)$')
+_QUOTED_FIELDS = {
+    'Name': 'name',
+    'AutomationId': 'automation_id',
+    'ClassName': 'class_name',
+    'Value': 'new_value',
+    'Окно': 'window',
+}
+
+
+class LogDay:
+    """Дата строк лога, в которых записано только время
+
+    Строки идут по времени, поэтому шаг назад больше чем на ROLLOVER секунд - переход
+    через полночь: следующие строки относятся к следующим суткам. Паузу в записи длиннее
+    суток по одному времени не отличить - для таких логов нужна дата из имени сегмента.
+    """
+    ROLLOVER = 12 * 3600
+
+    def __init__(self, day=None):
+        day = day or datetime.now()
+        self.date = day.date() if isinstance(day, datetime) else day
+        self.rollovers = 0
+        self._last = None  # секунды от начала суток у предыдущей строки
+        self._hours = {}  # час -> нс эпохи начала часа (с учетом перевода часов)
+
+    def timestamp(self, hours, minutes, seconds, millis):
+        """Нс эпохи для времени строки"""
+        clock = hours * 3600 + minutes * 60 + seconds
+        if self._last is not None and clock < self._last - self.ROLLOVER:
+            self.date += timedelta(days=1)
+            self.rollovers += 1
+            self._hours = {}
+        self._last = clock
+        base = self._hours.get(hours)
+        if base is None:
+            start = datetime(self.date.year, self.date.month, self.date.day, hours)
+            base = self._hours[hours] = int(start.timestamp()) * 1_000_000_000
+        return base + (minutes * 60 + seconds) * 1_000_000_000 + millis * 1_000_000
+
+
+def parse_log_line(line, day=None):
+    """Разобрать строку технического лога обратно в UIEvent (для старых логов)
+
+    day - дата, к которой относится время строки (по умолчанию сегодня), или LogDay:
+    при разборе файла подряд один LogDay учитывает переход через полночь.
+    Служебные и нераспознанные строки возвращают None.
+    """
+    match = _LINE_RE.match(line.rstrip('\r\n'))
+    if not match:
+        return None
+    hours, minutes, seconds, millis, event_type, body = match.groups()
+
+    if not isinstance(day, LogDay):
+        day = LogDay(day)
+    event = UIEvent(event_type, day.timestamp(int(hours), int(minutes), int(seconds), int(millis)))
+
+    for field in body.split(' | '):
+        key, _, value = field.partition(': ')
+        if key == 'Type':
+            event.control_type = value
+        elif key == 'PID':
+            event.pid = int(value) if value.isdigit() else None
+        elif key in _QUOTED_FIELDS:
+            setattr(event, _QUOTED_FIELDS[key], value[1:-1])
+        elif key == 'Путь':
+            event.path = () if value == "Unknown" else tuple(value.split(PATH_SEPARATOR))
+        elif key == 'Было':
+            old_value, _, new_value = value.partition(" → Стало: ")
+            event.old_value = old_value[1:-1]
+            event.new_value = new_value[1:-1]
+    return event
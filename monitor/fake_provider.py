@@ -0,0 +1,307 @@
+"""
+Тестовый провайдер UI Automation - сценарное дерево элементов в памяти процесса
+
+Позволяет запускать монитор и бэкенды захвата без Windows и 1С:
+элементы повторяют интерфейс uiautomation.Control, а каждое обращение
+к свойству считается как COM-вызов (с необязательной имитацией задержки).
+Пакетное чтение (fetch_*) считается одним вызовом, как BuildUpdatedCache.
+"""
+import itertools
+import threading
+import time
+from monitor.mouse_hook import SyntheticMouse
+
+
+class FakeValuePattern:
+    """Аналог ValuePattern"""
+    def __init__(self, element):
+        self._element = element
+
+    @property
+    def Value(self):
+        self._element.provider.count_call()
+        return self._element.value
+
+
+class FakeElement:
+    """Элемент тестового дерева с интерфейсом uiautomation.Control"""
+    def __init__(self, provider, control_type, name='', automation_id='', class_name='',
+                 parent=None, process_id=1000, value=None):
+        self.provider = provider
+        self.control_type = control_type
+        self.name = name
+        self.automation_id = automation_id
+        self.class_name = class_name
+        self.parent = parent
+        self.process_id = process_id
+        self.value = value
+        self.children = []
+        self.runtime_id = (42, next(provider.id_counter))
+        # Уникальная точка экрана для ControlFromPoint
+        self.point = (self.runtime_id[1] * 10, self.runtime_id[1] * 10)
+        if parent is not None:
+            parent.children.append(self)
+
+    def add(self, control_type, name='', automation_id='', class_name='', value=None):
+        """Добавить дочерний элемент"""
+        child = FakeElement(self.provider, control_type, name, automation_id, class_name,
+                            parent=self, process_id=self.process_id, value=value)
+        self.provider.register(child)
+        return child
+
+    @property
+    def ControlTypeName(self):
+        self.provider.count_call()
+        return self.control_type
+
+    @property
+    def Name(self):
+        self.provider.count_call()
+        return self.name
+
+    @property
+    def AutomationId(self):
+        self.provider.count_call()
+        return self.automation_id
+
+    @property
+    def ClassName(self):
+        self.provider.count_call()
+        return self.class_name
+
+    @property
+    def ProcessId(self):
+        self.provider.count_call()
+        return self.process_id
+
+    @property
+    def BoundingRectangle(self):
+        self.provider.count_call()
+        return FakeRect(self.point)
+
+    def GetParentControl(self):
+        self.provider.count_call()
+        return self.parent
+
+    def GetRuntimeId(self):
+        self.provider.count_call()
+        return list(self.runtime_id)
+
+    def GetValuePattern(self):
+        self.provider.count_call()
+        if self.value is None:
+            return None
+        return FakeValuePattern(self)
+
+    def Exists(self, max_search_seconds=0, search_interval_seconds=0):
+        return True
+
+
+class FakeRect:
+    """Аналог прямоугольника BoundingRectangle"""
+    def __init__(self, point):
+        self.left, self.top = point
+        self.right, self.bottom = point[0] + 10, point[1] + 10
+
+
+class FakeProvider:
+    """Сценарный провайдер: состояние мыши, фокус и события задаются из кода"""
+
+    def __init__(self, call_cost=0.0):
+        self.call_cost = call_cost  # Имитация стоимости межпроцессного вызова, сек
+        self.com_calls = 0  # межпроцессные вызовы (round trip), включая пакетные
+        self.batched_calls = 0  # из них пакетных чтений
+        self.id_counter = itertools.count(1)
+        self.windows = []
+        self.elements = {}
+        self.focused = None
+        self.cursor = (0, 0)
+        self.button_down = False
+        self.mouse = None  # синтетический драйвер мыши, если монитор перехватывает нажатия
+        self.process_names = {}  # ProcessId -> имя исполняемого файла (по умолчанию 1cv8c.exe)
+        self._sinks = []  # (окно, приемник)
+        self._lock = threading.Lock()
+
+    # --- учет вызовов ---
+
+    def count_call(self):
+        """Учесть один COM-вызов"""
+        self.com_calls += 1
+        if self.call_cost:
+            # Занятое ожидание: межпроцессный вызов тратит CPU, а не спит
+            deadline = time.perf_counter() + self.call_cost
+            while time.perf_counter() < deadline:
+                pass
+
+    def reset_calls(self):
+        self.com_calls = 0
+        self.batched_calls = 0
+
+    # --- построение дерева ---
+
+    def create_window(self, name, class_name='V8TopLevelFrameSDI', process_id=1000):
+        """Создать окно верхнего уровня"""
+        window = FakeElement(self, 'WindowControl', name, class_name=class_name, process_id=process_id)
+        self.register(window)
+        self.windows.append(window)
+        return window
+
+    def register(self, element):
+        self.elements[element.point] = element
+
+    # --- интерфейс провайдера ---
+
+    def initialize(self, multithreaded=False):
+        pass
+
+    def uninitialize(self):
+        pass
+
+    def get_focused(self):
+        self.count_call()
+        return self.focused
+
+    def element_from_point(self, x, y):
+        self.count_call()
+        return self.elements.get((x, y))
+
+    def get_cursor_pos(self):
+        return self.cursor
+
+    def is_left_button_down(self):
+        return self.button_down
+
+    def mouse_hook(self, sink):
+        """Перехват нажатий: press/release передаются через синтетический драйвер"""
+        self.mouse = SyntheticMouse(sink)
+        return self.mouse
+
+    # --- пакетное чтение свойств ---
+
+    def _batch(self, element):
+        """Свойства элемента одним вызовом"""
+        self.count_call()
+        self.batched_calls += 1
+        if element is None:
+            return None
+        return {
+            'ProcessId': element.process_id,
+            'ControlTypeName': element.control_type,
+            'Name': element.name,
+            'AutomationId': element.automation_id,
+            'ClassName': element.class_name,
+            'BoundingRectangle': FakeRect(element.point),
+            'RuntimeId': list(element.runtime_id),
+            'ValuePattern': element.value is not None,
+            'Value': element.value,
+        }
+
+    def fetch_properties(self, element):
+        return self._batch(element)
+
+    def fetch_parent(self, element):
+        parent = element.parent
+        return parent, self._batch(parent)
+
+    def fetch_focused(self):
+        focused = self.focused
+        return focused, self._batch(focused)
+
+    def fetch_from_point(self, x, y):
+        element = self.elements.get((x, y))
+        return element, self._batch(element)
+
+    def top_windows(self):
+        self.count_call()
+        return list(self.windows)
+
+    def process_name(self, pid):
+        return self.process_names.get(pid, '1cv8c.exe')
+
+    def subscribe(self, window, sink, cached=False):
+        with self._lock:
+            self._sinks.append((window, sink))
+
+    def unsubscribe(self, window=None):
+        with self._lock:
+            self._sinks = [(w, sink) for w, sink in self._sinks if window is not None and w is not window]
+
+    def _notify(self, kind, element, value=None):
+        """Фокус получает каждый приемник один раз, остальные события - подписчики окна элемента"""
+        with self._lock:
+            subscriptions = list(self._sinks)
+        if kind == 'focus':
+            sinks = []
+            for _, sink in subscriptions:
+                if sink not in sinks:
+                    sinks.append(sink)
+        else:
+            root = element
+            while root is not None and root.parent is not None:
+                root = root.parent
+            sinks = [sink for window, sink in subscriptions if window is root]
+        for sink in sinks:
+            sink(kind, element, value)
+
+    # --- сценарные действия оператора ---
+
+    def focus(self, element):
+        """Перевести фокус на элемент"""
+        self.focused = element
+        self._notify('focus', element)
+
+    def type_text(self, element, value):
+        """Изменить значение поля ввода"""
+        element.value = value
+        self._notify('value', element, value)
+
+    def rename(self, element, name):
+        """Изменить имя элемента (например, заголовок формы)"""
+        element.name = name
+        self._notify('renamed', element, name)
+
+    def remove(self, element):
+        """Удалить элемент из дерева (изменение структуры формы)"""
+        parent = element.parent
+        if parent is not None:
+            parent.children.remove(element)
+        self.elements.pop(element.point, None)
+        self._notify('structure', parent or element)
+
+    def close_window(self, window):
+        """Закрыть окно"""
+        if window in self.windows:
+            self.windows.remove(window)
+        self._notify('closed', window)
+
+    def press(self, element):
+        """Нажать левую кнопку мыши над элементом"""
+        self.cursor = element.point
+        self.button_down = True
+        if self.mouse is not None:
+            self.mouse.press(*element.point)
+        if element.control_type in ('ButtonControl', 'MenuItemControl', 'HyperlinkControl'):
+            self._notify('invoke', element)
+
+    def release(self):
+        """Отпустить левую кнопку мыши"""
+        self.button_down = False
+        if self.mouse is not None:
+            self.mouse.release(*self.cursor)
+
+    def invoke(self, element):
+        """Нажать кнопку с клавиатуры (Enter, пробел): Invoke без нажатия мыши"""
+        self._notify('invoke', element)
+
+    def click(self, element, duration=0.02):
+        """Клик заданной длительности"""
+        self.press(element)
+        time.sleep(duration)
+        self.release()
+
+    def play(self, script):
+        """Проиграть сценарий: список (пауза, действие, аргументы)"""
+        for delay, action, args in script:
+            if delay:
+                time.sleep(delay)
+            getattr(self, action)(*args)
@@ -0,0 +1,367 @@
+"""
+Фоновая запись файла истории с буферизацией, ротацией и сжатием старых сегментов
+"""
+import glob
+import gzip
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime, date, timedelta
+
+_READ_BLOCK = 64 * 1024
+# Время в начале строки истории: [ЧЧ:ММ:СС.ммм]
+_CLOCK_RE = re.compile(rb'^\[(\d{2}):(\d{2}):(\d{2})(?:\.(\d{3}))?\]')
+_HEAD_LINES = 100  # сколько первых строк просматривается в поисках времени
+
+# Имя закрытого сегмента: <имя>.ГГГГММДД-ЧЧММСС-мкс[-n].log[.gz], время - начало сегмента
+_SEGMENT_STAMP_RE = re.compile(r'\.(\d{8}-\d{6})-(\d{6})(?:-(\d+))?\.[^.]+(?:\.gz)?$')
+
+
+def _segment_order(path):
+    """Ключ сортировки сегмента: время начала из имени, затем номер повтора (-1, -2, ...)
+
+    По тексту имени 'x-1.log' < 'x.log' ('-' < '.'), поэтому номер сравнивается числом.
+    """
+    match = _SEGMENT_STAMP_RE.search(os.path.basename(path))
+    if match is None:
+        return '', '', 0, path
+    return match.group(1), match.group(2), int(match.group(3) or 0), path
+
+
+def history_segments(path):
+    """Закрытые сегменты истории от старых к новым"""
+    stem, ext = os.path.splitext(path)
+    found = glob.glob(f"{glob.escape(stem)}.*{ext}") + glob.glob(f"{glob.escape(stem)}.*{ext}.gz")
+    return sorted(found, key=_segment_order)
+
+
+def segment_started(path):
+    """Когда начат файл истории: из имени закрытого сегмента, иначе по первой строке файла"""
+    match = _SEGMENT_STAMP_RE.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), "%Y%m%d-%H%M%S")
+    return file_started(path)
+
+
+def file_started(path):
+    """Время первой строки файла истории (без .gz)
+
+    В строке записано только время; дата - последняя, при которой оно не позже
+    изменения файла (его последней записи). Без строк со временем - время изменения.
+    """
+    modified = datetime.fromtimestamp(os.path.getmtime(path))
+    try:
+        with open(path, 'rb') as f:
+            for _ in range(_HEAD_LINES):
+                line = f.readline()
+                if not line:
+                    break
+                match = _CLOCK_RE.match(line)
+                if match:
+                    hours, minutes, seconds, millis = match.groups()
+                    started = modified.replace(hour=int(hours), minute=int(minutes), second=int(seconds),
+                                               microsecond=int(millis or 0) * 1000)
+                    return started - timedelta(days=1) if started > modified else started
+    except OSError:
+        pass
+    return modified
+
+
+def _reversed_lines(path):
+    """Строки файла (или сегмента .gz) от последней к первой"""
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            data = f.read()
+        for line in reversed(data.split(b'\n')[:-1] if data.endswith(b'\n') else data.split(b'\n')):
+            yield line.decode('utf-8', 'replace')
+        return
+
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = None
+        while position > 0:
+            size = min(_READ_BLOCK, position)
+            position -= size
+            f.seek(position)
+            chunk = f.read(size)
+            if remainder is None:
+                # Завершающий перевод строки не образует пустую строку
+                if chunk.endswith(b'\n'):
+                    chunk = chunk[:-1]
+                remainder = b''
+            lines = (chunk + remainder).split(b'\n')
+            remainder = lines[0]
+            for line in reversed(lines[1:]):
+                yield line.decode('utf-8', 'replace')
+        if remainder:
+            yield remainder.decode('utf-8', 'replace')
+
+
+def read_history_before(path, skip, count):
+    """Прочитать count строк истории, предшествующих последним skip строкам
+
+    Строки берутся с конца текущего файла и дальше из закрытых сегментов.
+    Возвращает (строки от старых к новым, есть ли строки еще раньше).
+    """
+    sources = [path] if os.path.exists(path) else []
+    sources += reversed(history_segments(path))
+    lines = []
+    for source in sources:
+        try:
+            for line in _reversed_lines(source):
+                if skip:
+                    skip -= 1
+                elif len(lines) < count:
+                    lines.append(line)
+                else:
+                    lines.reverse()
+                    return lines, True
+        except OSError:
+            continue
+    lines.reverse()
+    return lines, False
+
+
+class HistoryWriter:
+    """Пишет строки истории в файл из отдельного потока
+
+    Строки копятся в памяти и сбрасываются на диск по объему (flush_bytes)
+    или по времени (flush_interval). Файл ротируется по размеру (rotate_bytes)
+    и/или при смене дня; закрытые сегменты можно сжимать в gzip,
+    хранится не больше retention сегментов. Если запись не удалась (диск заполнен,
+    файл заблокирован), строки остаются в буфере и записываются следующим сбросом;
+    сверх max_pending_bytes самые старые из них отбрасываются.
+    """
+
+    def __init__(self, path, flush_bytes=64 * 1024, flush_interval=1.0,
+                 rotate_bytes=10 * 1024 * 1024, rotate_daily=True, retention=30, compress=True,
+                 max_pending_bytes=16 * 1024 * 1024):
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_daily = rotate_daily
+        self.retention = retention
+        self.compress = compress
+        self.max_pending_bytes = max_pending_bytes
+
+        self._buffer = []  # (текст, число строк) от старых к новым
+        self._buffered_bytes = 0
+        self._failed = False  # последняя запись не удалась - повтор по интервалу, а не по объему
+        self._condition = threading.Condition()
+        self._flush_requested = 0
+        self._flush_done = 0
+        self._running = False
+        self._thread = None
+        self._file = None
+        self._file_size = 0
+        self._file_day = None
+        self._file_started = None
+
+        # Счетчики
+        self.lines_written = 0
+        self.lines_dropped = 0
+        self.bytes_written = 0
+        self.flushes = 0
+        self.rotations = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.errors = 0
+
+    def start(self):
+        """Запустить поток записи"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="HistoryWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, line):
+        """Добавить строку в буфер"""
+        self.write_lines([line])
+
+    def write_lines(self, lines):
+        """Добавить строки в буфер; поток записи будится при заполнении буфера"""
+        data = '\n'.join(lines) + '\n'
+        with self._condition:
+            self._buffer.append((data, len(lines)))
+            self._buffered_bytes += len(data)
+            if self._buffered_bytes >= self.flush_bytes and not self._failed:
+                self._condition.notify()
+
+    def flush(self, timeout=5.0):
+        """Записать буфер на диск и дождаться окончания записи"""
+        if not self._running:
+            self._write_pending()
+            return
+        with self._condition:
+            self._flush_requested += 1
+            ticket = self._flush_requested
+            self._condition.notify()
+            self._condition.wait_for(lambda: self._flush_done >= ticket or not self._running, timeout)
+
+    def close(self):
+        """Остановить поток, записать остаток и закрыть файл"""
+        if self._running:
+            with self._condition:
+                self._running = False
+                self._condition.notify()
+            self._thread.join()
+        self._write_pending()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: (not self._running or (self._buffered_bytes >= self.flush_bytes and not self._failed)
+                             or self._flush_requested > self._flush_done),
+                    self.flush_interval)
+                if not self._running:
+                    return
+                ticket = self._flush_requested
+            self._write_pending()
+            with self._condition:
+                self._flush_done = ticket
+                self._condition.notify_all()
+
+    def _write_pending(self):
+        """Забрать буфер и записать его одним вызовом; при ошибке строки возвращаются в буфер"""
+        with self._condition:
+            if not self._buffer:
+                return
+            chunks = self._buffer
+            self._buffer = []
+            self._buffered_bytes = 0
+        data = ''.join(text for text, _ in chunks)
+
+        started = time.perf_counter()
+        try:
+            self._rotate_if_needed()
+            if self._file is None:
+                self._open()
+            encoded = data.encode('utf-8')
+            self._file.write(encoded)
+            self._file.flush()
+        except Exception:
+            self.errors += 1
+            if self._file is not None:
+                # Следующая попытка открывает файл заново (например, после снятия блокировки)
+                try:
+                    self._file.close()
+                except Exception:
+                    pass
+                self._file = None
+            with self._condition:
+                self._failed = True
+                self._buffer[:0] = chunks
+                self._buffered_bytes += len(data)
+                # Запись не восстанавливается слишком долго - отбрасываются самые старые строки
+                while self._buffered_bytes > self.max_pending_bytes and len(self._buffer) > 1:
+                    text, count = self._buffer.pop(0)
+                    self._buffered_bytes -= len(text)
+                    self.lines_dropped += count
+            return
+
+        self._failed = False
+        self._file_size += len(encoded)
+        self.bytes_written += len(encoded)
+        self.lines_written += sum(count for _, count in chunks)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.flushes += 1
+        self.last_flush_ms = elapsed_ms
+        self.total_flush_ms += elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'ab')
+        self._file_size = self._file.tell()
+        if self._file_size:
+            # Дописываемый файл начат его первой строкой, а не последней записью
+            self._file_started = file_started(self.path)
+        else:
+            self._file_started = datetime.now()
+        self._file_day = self._file_started.date()
+
+    def _rotate_if_needed(self):
+        if self._file is None:
+            if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+                return
+            self._open()
+        new_day = self.rotate_daily and self._file_day != date.today()
+        too_big = self.rotate_bytes and self._file_size >= self.rotate_bytes
+        if new_day or too_big:
+            self.rotate()
+
+    def rotate(self):
+        """Закрыть текущий сегмент и начать новый"""
+        started = self._file_started
+        if self._file:
+            self._file.close()
+            self._file = None
+        self._file_started = None
+        if not os.path.exists(self.path):
+            return
+
+        # Сегмент называется по времени начала, чтобы дата строк в нем была известна при разборе
+        if started is None:
+            started = file_started(self.path)
+        stem, ext = os.path.splitext(self.path)
+        stamp = started.strftime("%Y%m%d-%H%M%S-%f")
+        segment = f"{stem}.{stamp}{ext}"
+        suffix = 1
+        while os.path.exists(segment) or os.path.exists(segment + '.gz'):
+            segment = f"{stem}.{stamp}-{suffix}{ext}"
+            suffix += 1
+        os.replace(self.path, segment)
+        self.rotations += 1
+
+        if self.compress:
+            with open(segment, 'rb') as source, gzip.open(segment + '.gz', 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(segment)
+
+        self._apply_retention()
+
+    def segments(self):
+        """Закрытые сегменты истории от старых к новым"""
+        return history_segments(self.path)
+
+    def read_before(self, skip, count):
+        """Дописать буфер и прочитать более ранние строки истории (см. read_history_before)"""
+        self.flush()
+        return read_history_before(self.path, skip, count)
+
+    def _apply_retention(self):
+        if not self.retention:
+            return
+        segments = self.segments()
+        for segment in segments[:-self.retention]:
+            try:
+                os.remove(segment)
+            except OSError:
+                self.errors += 1
+
+    def get_stats(self):
+        """Счетчики записи"""
+        return {
+            'lines_written': self.lines_written,
+            'lines_dropped': self.lines_dropped,
+            'bytes_written': self.bytes_written,
+            'flushes': self.flushes,
+            'rotations': self.rotations,
+            'last_flush_ms': self.last_flush_ms,
+            'max_flush_ms': self.max_flush_ms,
+            'avg_flush_ms': self.total_flush_ms / self.flushes if self.flushes else 0.0,
+            'buffered_bytes': self._buffered_bytes,
+            'errors': self.errors,
+        }
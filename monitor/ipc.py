@@ -0,0 +1,361 @@
+"""
+Локальный поток событий монитора: публикация по сокету кадрами «длина + JSON»
+
+Кадр - 4 байта длины (big-endian) и сообщение JSON в UTF-8. Сообщение - словарь с полем type:
+'hello' - приветствие службы, 'status' - результат подключения к 1С, 'log' - служебное
+сообщение монитора, 'event' - UIEvent.to_dict(), 'operation' - Operation.to_dict(),
+'analysis' - строка результата анализатора.
+
+Адрес: tcp://127.0.0.1:47810 (по умолчанию) или unix:///путь/к/сокету.
+"""
+import json
+import os
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+DEFAULT_ADDRESS = 'tcp://127.0.0.1:47810'
+MAX_FRAME = 16 * 1024 * 1024
+PROTOCOL_VERSION = 1
+
+_HEADER = struct.Struct('>I')
+
+
+def parse_address(address):
+    """(семейство сокета, адрес) из строки tcp://хост:порт или unix://путь"""
+    if address.startswith('unix://'):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise ValueError("Unix-сокеты недоступны на этой платформе")
+        return socket.AF_UNIX, address[len('unix://'):]
+    if address.startswith('tcp://'):
+        address = address[len('tcp://'):]
+    host, _, port = address.rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f"Неверный адрес: {address}")
+    return socket.AF_INET, (host, int(port))
+
+
+def encode_frame(message):
+    """Кадр для отправки: длина и JSON"""
+    payload = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return _HEADER.pack(len(payload)) + payload
+
+
+class FrameDecoder:
+    """Разбор потока байтов на сообщения (кадры могут приходить частями)"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        """Добавить полученные байты; возвращает список полных сообщений"""
+        buffer = self._buffer
+        buffer += data
+        messages = []
+        offset = 0
+        while len(buffer) - offset >= _HEADER.size:
+            (length,) = _HEADER.unpack_from(buffer, offset)
+            if length > MAX_FRAME:
+                raise ValueError(f"Слишком длинный кадр: {length} байт")
+            end = offset + _HEADER.size + length
+            if len(buffer) < end:
+                break
+            messages.append(json.loads(bytes(buffer[offset + _HEADER.size:end]).decode('utf-8')))
+            offset = end
+        if offset:
+            del buffer[:offset]
+        return messages
+
+
+class _Client:
+    """Подписчик на стороне службы: очередь неотправленных кадров"""
+    __slots__ = ('sock', 'chunks', 'offset', 'pending', 'writing')
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.chunks = deque()
+        self.offset = 0  # отправлено байт из первого блока
+        self.pending = 0
+        self.writing = False
+
+
+class EventPublisher:
+    """Служба рассылки: отправляет каждое сообщение всем подключенным подписчикам
+
+    publish() вызывается из любого потока и не ждет сети: пачка кодируется один раз
+    и ставится в очередь каждого подписчика, отправку ведет отдельный поток.
+    Очередь подписчика ограничена max_pending байтами: медленный подписчик теряет
+    самые старые пачки, а не задерживает монитор и остальных подписчиков.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, max_pending=8 * 1024 * 1024):
+        self.address = address
+        self.max_pending = max_pending
+        self.greeting = [{'type': 'hello', 'version': PROTOCOL_VERSION, 'pid': os.getpid()}]
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._selector = None
+        self._server = None
+        self._wake_reader = self._wake_writer = None
+        self._wake_pending = False
+        self._thread = None
+        self._running = False
+
+        # Счетчики
+        self.published = 0
+        self.bytes_sent = 0
+        self.dropped_batches = 0
+        self.connections = 0
+        self.disconnects = 0
+
+    def start(self):
+        family, sockaddr = parse_address(self.address)
+        if family != socket.AF_INET and os.path.exists(sockaddr):
+            os.unlink(sockaddr)
+        server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(sockaddr)
+        server.listen(16)
+        server.setblocking(False)
+        self._server = server
+        if family == socket.AF_INET and sockaddr[1] == 0:
+            # Порт выбран системой - запоминаем фактический адрес
+            self.address = f"tcp://{sockaddr[0]}:{server.getsockname()[1]}"
+
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._wake_reader.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(server, selectors.EVENT_READ, 'accept')
+        self._selector.register(self._wake_reader, selectors.EVENT_READ, 'wake')
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name='EventPublisher', daemon=True)
+        self._thread.start()
+        return self
+
+    def publish(self, message):
+        self.publish_many([message])
+
+    def publish_many(self, messages):
+        """Разослать пачку сообщений одним блоком"""
+        if not messages:
+            return
+        chunk = b''.join(encode_frame(message) for message in messages)
+        with self._lock:
+            self.published += len(messages)
+            for client in self._clients.values():
+                self._enqueue(client, chunk)
+            if self._clients and not self._wake_pending:
+                self._wake_pending = True
+                wake = True
+            else:
+                wake = False
+        if wake:
+            try:
+                self._wake_writer.send(b'\0')
+            except OSError:
+                pass
+
+    def _enqueue(self, client, chunk):
+        client.chunks.append(chunk)
+        client.pending += len(chunk)
+        # Переполнение: выбрасываем самые старые пачки, кроме начатой отправкой
+        while client.pending > self.max_pending and len(client.chunks) > 1:
+            index = 1 if client.offset else 0
+            client.pending -= len(client.chunks[index])
+            del client.chunks[index]
+            self.dropped_batches += 1
+
+    def _loop(self):
+        selector = self._selector
+        while self._running:
+            for key, mask in selector.select(timeout=0.5):
+                if key.data == 'accept':
+                    self._accept()
+                elif key.data == 'wake':
+                    self._wake()
+                else:
+                    client = key.data
+                    if client.sock.fileno() == -1:
+                        continue
+                    if mask & selectors.EVENT_READ and not self._read(client):
+                        continue
+                    if mask & selectors.EVENT_WRITE:
+                        self._write(client)
+
+    def _accept(self):
+        try:
+            sock, _ = self._server.accept()
+        except OSError:
+            return
+        sock.setblocking(False)
+        if sock.family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = _Client(sock)
+        with self._lock:
+            self._clients[sock.fileno()] = client
+            self._enqueue(client, b''.join(encode_frame(message) for message in self.greeting))
+        self.connections += 1
+        self._selector.register(sock, selectors.EVENT_READ, client)
+        self._watch(client)
+
+    def _wake(self):
+        try:
+            while self._wake_reader.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        with self._lock:
+            self._wake_pending = False
+            clients = [client for client in self._clients.values() if client.chunks]
+        for client in clients:
+            self._watch(client)
+
+    def _watch(self, client):
+        """Ждать готовности к записи, пока у подписчика есть неотправленные данные"""
+        writing = bool(client.chunks)
+        if writing != client.writing:
+            client.writing = writing
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            try:
+                self._selector.modify(client.sock, events, client)
+            except (KeyError, ValueError, OSError):
+                pass
+
+    def _read(self, client):
+        """Подписчики только читают; пустое чтение - отключение"""
+        try:
+            data = client.sock.recv(4096)
+        except BlockingIOError:
+            return True
+        except OSError:
+            data = b''
+        if not data:
+            self._drop(client)
+            return False
+        return True
+
+    def _write(self, client):
+        while True:
+            with self._lock:
+                if not client.chunks:
+                    break
+                chunk = client.chunks[0]
+                offset = client.offset
+            try:
+                sent = client.sock.send(memoryview(chunk)[offset:])
+            except BlockingIOError:
+                return
+            except OSError:
+                self._drop(client)
+                return
+            self.bytes_sent += sent
+            with self._lock:
+                if client.chunks and client.chunks[0] is chunk:
+                    client.pending -= sent
+                    if offset + sent >= len(chunk):
+                        client.chunks.popleft()
+                        client.offset = 0
+                    else:
+                        client.offset = offset + sent
+                        return
+        self._watch(client)
+
+    def _drop(self, client):
+        if client.sock.fileno() == -1:
+            return
+        with self._lock:
+            self._clients.pop(client.sock.fileno(), None)
+        try:
+            self._selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+        self.disconnects += 1
+
+    def stop(self):
+        """Отправить остаток (не дольше секунды) и закрыть все соединения"""
+        if not self._running:
+            return
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not any(client.chunks for client in self._clients.values()):
+                    break
+            time.sleep(0.01)
+        self._running = False
+        self._thread.join(timeout=1.0)
+        for client in list(self._clients.values()):
+            self._drop(client)
+        self._selector.close()
+        self._server.close()
+        self._wake_reader.close()
+        self._wake_writer.close()
+        family, sockaddr = parse_address(self.address)
+        if family != socket.AF_INET and os.path.exists(sockaddr):
+            os.unlink(sockaddr)
+
+    def get_stats(self):
+        with self._lock:
+            pending = sum(client.pending for client in self._clients.values())
+            subscribers = len(self._clients)
+        return {
+            'subscribers': subscribers,
+            'published': self.published,
+            'bytes_sent': self.bytes_sent,
+            'pending_bytes': pending,
+            'dropped_batches': self.dropped_batches,
+            'connections': self.connections,
+            'disconnects': self.disconnects,
+        }
+
+
+class EventSubscriber:
+    """Подписчик потока событий службы
+
+    messages() - генератор сообщений до закрытия соединения; close() из другого потока
+    прерывает ожидание.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=5.0):
+        self.address = address
+        self.timeout = timeout
+        self.sock = None
+        self.received = 0
+
+    def connect(self):
+        family, sockaddr = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(sockaddr)
+        sock.settimeout(None)
+        if family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        return self
+
+    def messages(self):
+        if self.sock is None:
+            self.connect()
+        decoder = FrameDecoder()
+        while True:
+            try:
+                data = self.sock.recv(256 * 1024)
+            except OSError:
+                return
+            if not data:
+                return
+            for message in decoder.feed(data):
+                self.received += 1
+                yield message
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
@@ -0,0 +1,162 @@
+"""
+Перехват нажатий мыши: низкоуровневый хук Windows (WH_MOUSE_LL) и синтетический источник для тестов
+
+Источник вызывает sink(вид, (x, y), время_нс) на каждый переход кнопки: MOUSE_DOWN или MOUSE_UP.
+Время фиксируется в момент перехода, элемент под точкой определяет получатель в своем потоке -
+поток хука должен вернуть управление системе как можно быстрее.
+"""
+import threading
+import time
+from monitor.events import now_ns
+
+MOUSE_DOWN = 'down'
+MOUSE_UP = 'up'
+
+WH_MOUSE_LL = 14
+WM_QUIT = 0x0012
+WM_LBUTTONDOWN = 0x0201
+WM_LBUTTONUP = 0x0202
+
+
+class MouseHook:
+    """Хук WH_MOUSE_LL в отдельном потоке с циклом сообщений (только Windows)"""
+
+    def __init__(self, sink, start_timeout=2.0):
+        self.sink = sink
+        self.start_timeout = start_timeout
+        self.thread = None
+        self._thread_id = None
+        self._ready = threading.Event()
+        self._error = None
+
+        # Счетчики
+        self.downs = 0
+        self.ups = 0
+
+    def start(self):
+        """Установить хук; исключение, если система его не приняла"""
+        self.thread = threading.Thread(target=self._run, name='MouseHook', daemon=True)
+        self.thread.start()
+        if not self._ready.wait(self.start_timeout):
+            raise RuntimeError("Хук мыши не установлен за отведенное время")
+        if self._error:
+            raise self._error
+
+    def stop(self):
+        """Снять хук и завершить поток"""
+        if self.thread is None:
+            return
+        if self._thread_id:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+        self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def _run(self):
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+
+        class MSLLHOOKSTRUCT(ctypes.Structure):
+            _fields_ = [('pt', wintypes.POINT), ('mouseData', wintypes.DWORD), ('flags', wintypes.DWORD),
+                        ('time', wintypes.DWORD), ('dwExtraInfo', ctypes.c_size_t)]
+
+        LRESULT = ctypes.c_ssize_t
+        HOOKPROC = ctypes.WINFUNCTYPE(LRESULT, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
+        user32.SetWindowsHookExW.argtypes = (ctypes.c_int, HOOKPROC, wintypes.HINSTANCE, wintypes.DWORD)
+        user32.SetWindowsHookExW.restype = ctypes.c_void_p
+        user32.CallNextHookEx.argtypes = (ctypes.c_void_p, ctypes.c_int, wintypes.WPARAM, wintypes.LPARAM)
+        user32.CallNextHookEx.restype = LRESULT
+        user32.UnhookWindowsHookEx.argtypes = (ctypes.c_void_p,)
+        kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+
+        def callback(code, message, data):
+            if code >= 0 and message in (WM_LBUTTONDOWN, WM_LBUTTONUP):
+                captured_at = now_ns()
+                info = ctypes.cast(data, ctypes.POINTER(MSLLHOOKSTRUCT)).contents
+                try:
+                    if message == WM_LBUTTONDOWN:
+                        self.downs += 1
+                        self.sink(MOUSE_DOWN, (info.pt.x, info.pt.y), captured_at)
+                    else:
+                        self.ups += 1
+                        self.sink(MOUSE_UP, (info.pt.x, info.pt.y), captured_at)
+                except Exception:
+                    pass
+            return user32.CallNextHookEx(None, code, message, data)
+
+        # Ссылка на callback должна жить, пока установлен хук
+        proc = HOOKPROC(callback)
+        self._thread_id = kernel32.GetCurrentThreadId()
+        hook = user32.SetWindowsHookExW(WH_MOUSE_LL, proc, kernel32.GetModuleHandleW(None), 0)
+        if not hook:
+            self._error = ctypes.WinError()
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            message = wintypes.MSG()
+            # Хук вызывается системой только пока поток выбирает сообщения
+            while user32.GetMessageW(ctypes.byref(message), None, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(message))
+                user32.DispatchMessageW(ctypes.byref(message))
+        finally:
+            user32.UnhookWindowsHookEx(hook)
+
+    def get_stats(self):
+        return {'mouse_downs': self.downs, 'mouse_ups': self.ups}
+
+
+class SyntheticMouse:
+    """Синтетический драйвер мыши с интерфейсом MouseHook - проверка захвата кликов без рабочего стола
+
+    Нажатия подаются методами press/release/click и передаются sink так же, как из хука.
+    Все поданные переходы запоминаются в sent (вид, точка, время_нс) - это эталон
+    для оценки точности и задержки захвата.
+    """
+
+    def __init__(self, sink, delivery_delay=0.0):
+        self.sink = sink
+        self.delivery_delay = delivery_delay  # задержка доставки перехода хуку, с
+        self.active = False
+        self.sent = []
+
+        # Счетчики
+        self.downs = 0
+        self.ups = 0
+
+    def start(self):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def _send(self, kind, point):
+        captured_at = now_ns()
+        self.sent.append((kind, point, captured_at))
+        if not self.active:
+            return
+        if kind == MOUSE_DOWN:
+            self.downs += 1
+        else:
+            self.ups += 1
+        if self.delivery_delay:
+            time.sleep(self.delivery_delay)
+        self.sink(kind, point, captured_at)
+
+    def press(self, x, y):
+        self._send(MOUSE_DOWN, (x, y))
+
+    def release(self, x, y):
+        self._send(MOUSE_UP, (x, y))
+
+    def click(self, x, y, duration=0.02):
+        """Клик заданной длительности"""
+        self.press(x, y)
+        time.sleep(duration)
+        self.release(x, y)
+
+    def get_stats(self):
+        return {'mouse_downs': self.downs, 'mouse_ups': self.ups}
@@ -1,40 +1,55 @@
 """
 Анализатор операций - преобразует последовательности действий в бизнес-операции
 """
-from datetime import datetime, timedelta
 from collections import deque
+from monitor.events import EVENT_INPUT, ActionLog, LogDay, format_clock, parse_log_line
+from monitor.operation_archive import OperationArchive
+from monitor.statistics import OperationStatistics, STATUS_COMPLETED, STATUS_INTERRUPTED, STATUS_CANCELLED
+from monitor.trigger_index import TriggerIndex
 
 
 class Operation:
-    """Класс для представления бизнес-операции"""
-    def __init__(self, operation_type, start_time, pattern_key=None):
+    """Класс для представления бизнес-операции
+
+    Действия хранятся в ActionLog (массивы номеров символов), UIEvent собирается при обращении.
+    """
+    __slots__ = ('operation_type', 'pattern_key', 'start_ns', 'end_ns', 'actions', 'context', 'completed',
+                 'status', 'middle_triggers_matched', 'matched_middle_triggers', 'unrelated_actions_count',
+                 'alternative_operations')
+    
+    def __init__(self, operation_type, start_ns, pattern_key=None):
         self.operation_type = operation_type
         self.pattern_key = pattern_key  # Ключ паттерна для идентификации
-        self.start_time = start_time
-        self.end_time = None
-        self.actions = []
+        self.start_ns = start_ns  # нс эпохи первого действия (UIEvent.timestamp)
+        self.end_ns = None  # нс эпохи последнего действия
+        self.actions = ActionLog()
         self.context = {}
         self.completed = False
+        self.status = None  # STATUS_* после закрытия операции
         self.middle_triggers_matched = False  # Флаг: были ли промежуточные триггеры
-        self.matched_middle_triggers = []  # Список сработавших промежуточных триггеров
+        self.matched_middle_triggers = ()  # Сработавшие промежуточные триггеры
         self.unrelated_actions_count = 0  # Счетчик посторонних действий
-        self.alternative_operations = []  # Альтернативные операции при конфликте триггеров
+        self.alternative_operations = ()  # Альтернативные операции при конфликте триггеров
     
     def add_action(self, action):
-        """Добавить действие в операцию"""
+        """Добавить действие (UIEvent) в операцию"""
         self.actions.append(action)
-        self.end_time = action.get('timestamp')
+        self.end_ns = action.timestamp
+    
+    @property
+    def start_time(self):
+        """Время начала в виде ЧЧ:ММ:СС.ммм (для отображения)"""
+        return format_clock(self.start_ns) if self.start_ns is not None else None
+    
+    @property
+    def end_time(self):
+        return format_clock(self.end_ns) if self.end_ns is not None else None
     
     def get_duration(self):
-        """Получить длительность операции"""
-        if self.start_time and self.end_time:
-            try:
-                start = datetime.strptime(self.start_time, "%H:%M:%S.%f")
-                end = datetime.strptime(self.end_time, "%H:%M:%S.%f")
-                return (end - start).total_seconds()
-            except:
-                return 0
-        return 0
+        """Получить длительность операции в секундах"""
+        if self.start_ns is None or self.end_ns is None:
+            return 0
+        return (self.end_ns - self.start_ns) / 1_000_000_000
     
     def to_string(self):
         """Преобразовать операцию в строку для отображения"""
@@ -53,6 +68,22 @@ class Operation:
             result += " | ✅ Завершено"
         
         return result
+    
+    def to_dict(self):
+        """Операция в виде словаря (для JSONL и сводных отчетов)"""
+        return {
+            'operation': self.operation_type,
+            'pattern_key': self.pattern_key,
+            'status': self.status,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'start_ns': self.start_ns,
+            'end_ns': self.end_ns,
+            'duration': self.get_duration(),
+            'actions': len(self.actions),
+            'middle_triggers': list(self.matched_middle_triggers),
+            'context': dict(self.context),
+        }
 
 
 class OperationAnalyzer:
@@ -60,261 +91,50 @@ class OperationAnalyzer:
     
     def __init__(self):
         self.recent_actions = deque(maxlen=50)  # Последние 50 действий
-        self.current_operation = None
-        self.completed_operations = []
+        self.candidates = {}  # ключ паттерна -> открытая операция (в порядке начала)
+        self.completed_operations = OperationArchive()  # Последние 1000 в памяти; с каталогом - остальные на диске
+        self.statistics = OperationStatistics()  # Агрегаты закрытых операций (обновляются при закрытии)
         self.operation_timeout = 30  # Таймаут операции в секундах
         self.max_unrelated_actions = 5  # Максимум посторонних действий
+        self.max_candidates = 16  # Открытых операций одновременно
+        self.operation_listeners = []  # Вызываются с Operation при ее закрытии
+        self.log_day = LogDay()  # Дата строк лога, переданных строками (переход через полночь)
         
         # Паттерны операций (загружаются из файла или создаются в редакторе)
+        self.trigger_index = TriggerIndex()
         self.patterns = {}
-    
-    def parse_action(self, log_message):
-        """Разобрать лог-сообщение в структурированное действие"""
-        try:
-            # Пропускаем служебные сообщения
-            if any(x in log_message for x in ['[СТАРТ]', '[СТОП]', '[ИНФО]', '[НАСТРОЙКИ]', '[УСПЕХ]', '[ОШИБКА]', '[ЭКСПОРТ]']):
-                return None
-            
-            action = {}
-            
-            # Извлекаем timestamp
-            import re
-            timestamp_match = re.search(r'\[(\d{2}:\d{2}:\d{2}\.\d{3})\]', log_message)
-            if timestamp_match:
-                action['timestamp'] = timestamp_match.group(1)
-            
-            # Извлекаем тип события
-            if 'ФОКУС' in log_message:
-                action['event_type'] = 'ФОКУС'
-            elif 'КЛИК' in log_message:
-                action['event_type'] = 'КЛИК'
-            elif 'ВВОД' in log_message:
-                action['event_type'] = 'ВВОД'
-            else:
-                return None
-            
-            # Извлекаем тип элемента
-            type_match = re.search(r'Type: (\w+)', log_message)
-            if type_match:
-                action['control_type'] = type_match.group(1)
-            
-            # Извлекаем имя элемента
-            name_match = re.search(r"Name: '([^']*)'", log_message)
-            if name_match:
-                action['element_name'] = name_match.group(1)
-            
-            # Извлекаем путь
-            path_match = re.search(r"Путь: (.+?)(?:\s*$)", log_message)
-            if path_match:
-                action['path'] = path_match.group(1).strip()
-            
-            # Для ввода - извлекаем значения
-            if action['event_type'] == 'ВВОД':
-                value_match = re.search(r"Было: '([^']*)' → Стало: '([^']*)'", log_message)
-                if value_match:
-                    action['old_value'] = value_match.group(1)
-                    action['new_value'] = value_match.group(2)
-            
-            return action
-            
-        except Exception as e:
-            return None
-    
-    def match_trigger(self, trigger, text):
-        """Проверить соответствие триггера тексту с учетом границ слов"""
-        if not text:
-            return False
         
-        # Убираем лишние пробелы из текста
-        text = text.strip()
-        
-        # Если триггер - это тип события (ВВОД, КЛИК, ФОКУС), проверяем точное совпадение
-        if trigger in ['ВВОД', 'КЛИК', 'ФОКУС']:
-            return trigger == text
-        
-        # Для остальных триггеров проверяем как отдельное слово
-        import re
-        # Создаем паттерн для поиска слова с границами
-        pattern = r'\b' + re.escape(trigger) + r'\b'
-        return bool(re.search(pattern, text, re.IGNORECASE))
+        # Результат сканирования последнего действия по индексу триггеров
+        self._scanned_action = None
+        self._scanned_matches = None
     
-    def detect_operation_start(self, action):
-        """Определить начало новой операции"""
-        element_name = action.get('element_name', '')
-        event_type = action.get('event_type', '')
-        path = action.get('path', '')
-        
-        matched_operations = []
-        
-        for pattern_key, pattern in self.patterns.items():
-            # Если триггеров начала нет - операция всегда активна
-            if not pattern.get('triggers'):
-                # Проверяем, нет ли уже активной операции этого типа
-                if self.current_operation and self.current_operation.operation_type == pattern['name']:
-                    continue
-                matched_operations.append((pattern_key, pattern['name']))
-                continue
-            
-            # Если триггеры начала есть - проверяем их
-            for trigger in pattern['triggers']:
-                if self.match_trigger(trigger, element_name) or self.match_trigger(trigger, event_type) or self.match_trigger(trigger, path):
-                    matched_operations.append((pattern_key, pattern['name']))
-                    break  # Достаточно одного совпадения для этого паттерна
-        
-        if len(matched_operations) == 0:
-            return None, None, []
-        elif len(matched_operations) == 1:
-            return matched_operations[0][0], matched_operations[0][1], matched_operations
-        else:
-            # Несколько операций могут начаться - возвращаем первую, но передаем список всех
-            return matched_operations[0][0], matched_operations[0][1], matched_operations
+    @property
+    def patterns(self):
+        return self._patterns
     
-    def check_middle_triggers(self, action):
-        """Проверить соответствие промежуточным триггерам"""
-        if not self.current_operation:
-            return False, None
-        
-        element_name = action.get('element_name', '')
-        event_type = action.get('event_type', '')
-        path = action.get('path', '')
-        
-        # Если есть альтернативные операции, проверяем возможность переключения
-        if self.current_operation.alternative_operations:
-            switch_result = self.check_operation_switch(action, element_name, event_type, path)
-            if switch_result:
-                return True, switch_result
-        
-        # Получаем паттерн текущей операции
-        pattern = self.patterns.get(self.current_operation.pattern_key)
-        if not pattern:
-            return True, None
-        
-        middle_triggers = pattern.get('middle_triggers', [])
-        
-        if not middle_triggers:
-            # Если промежуточных триггеров нет, считаем что они всегда выполнены
-            self.current_operation.middle_triggers_matched = True
-            # НО все равно считаем посторонние действия для отмены
-            self.current_operation.unrelated_actions_count += 1
-            return True, None
-        
-        # Проверяем соответствие хотя бы одному промежуточному триггеру
-        matched = False
-        for trigger in middle_triggers:
-            if self.match_trigger(trigger, element_name) or self.match_trigger(trigger, event_type) or self.match_trigger(trigger, path):
-                matched = True
-                # Проверяем, не был ли этот триггер уже зафиксирован
-                if trigger not in self.current_operation.matched_middle_triggers:
-                    # Отмечаем, что промежуточный триггер сработал
-                    self.current_operation.middle_triggers_matched = True
-                    # Добавляем триггер в список сработавших
-                    self.current_operation.matched_middle_triggers.append(trigger)
-                    # Сбрасываем счетчик посторонних действий
-                    self.current_operation.unrelated_actions_count = 0
-                    # Возвращаем сообщение о срабатывании триггера
-                    return True, f"   🔄 Промежуточный триггер: {trigger}"
-                # Триггер уже был, но это релевантное действие - сбрасываем счетчик
-                self.current_operation.unrelated_actions_count = 0
-                return True, None
-        
-        # Действие не соответствует промежуточным триггерам
-        if not matched:
-            # Увеличиваем счетчик посторонних действий
-            self.current_operation.unrelated_actions_count += 1
-        
-        return True, None
+    @patterns.setter
+    def patterns(self, patterns):
+        self._patterns = patterns
+        self.rebuild_index()
     
-    def check_operation_switch(self, action, element_name, event_type, path):
-        """Проверить возможность переключения на альтернативную операцию"""
-        # Проверяем промежуточные триггеры всех альтернативных операций
-        for alt_pattern_key in self.current_operation.alternative_operations:
-            alt_pattern = self.patterns.get(alt_pattern_key)
-            if not alt_pattern:
-                continue
-            
-            alt_middle_triggers = alt_pattern.get('middle_triggers', [])
-            
-            # Если у альтернативной операции нет промежуточных триггеров
-            # проверяем триггеры завершения - возможно это она
-            if not alt_middle_triggers:
-                for trigger in alt_pattern.get('completion_triggers', []):
-                    if self.match_trigger(trigger, element_name):
-                        # Найдено соответствие триггеру завершения - переключаемся
-                        old_operation_name = self.current_operation.operation_type
-                        new_operation_name = alt_pattern['name']
-                        
-                        # Обновляем текущую операцию
-                        self.current_operation.operation_type = new_operation_name
-                        self.current_operation.pattern_key = alt_pattern_key
-                        self.current_operation.alternative_operations = []
-                        self.current_operation.middle_triggers_matched = True
-                        self.current_operation.unrelated_actions_count = 0
-                        
-                        return f"   🔀 Переключение: {old_operation_name} → {new_operation_name} (по триггеру завершения)"
-                continue
-            
-            # Проверяем соответствие промежуточным триггерам альтернативной операции
-            for trigger in alt_middle_triggers:
-                if self.match_trigger(trigger, element_name) or self.match_trigger(trigger, event_type) or self.match_trigger(trigger, path):
-                    # Найдено соответствие - переключаемся на эту операцию
-                    old_operation_name = self.current_operation.operation_type
-                    new_operation_name = alt_pattern['name']
-                    
-                    # Обновляем текущую операцию
-                    self.current_operation.operation_type = new_operation_name
-                    self.current_operation.pattern_key = alt_pattern_key
-                    self.current_operation.alternative_operations = []  # Очищаем альтернативы
-                    self.current_operation.middle_triggers_matched = True
-                    self.current_operation.matched_middle_triggers.append(trigger)
-                    self.current_operation.unrelated_actions_count = 0
-                    
-                    return f"   🔀 Переключение: {old_operation_name} → {new_operation_name}\n   🔄 Промежуточный триггер: {trigger}"
-        
-        return None
+    def rebuild_index(self):
+        """Перекомпилировать индекс триггеров (после изменения паттернов на месте)"""
+        self.trigger_index.build(self._patterns)
+        self._scanned_action = None
     
-    def detect_operation_completion(self, action):
-        """Определить завершение текущей операции"""
-        if not self.current_operation:
-            return False
-        
-        element_name = action.get('element_name', '')
-        
-        # Получаем паттерн текущей операции по ключу
-        pattern = self.patterns.get(self.current_operation.pattern_key)
-        if not pattern:
-            return False
-        
-        # Проверяем триггеры завершения
-        for trigger in pattern['completion_triggers']:
-            if self.match_trigger(trigger, element_name):
-                # Проверяем, были ли промежуточные триггеры (если они требуются)
-                middle_triggers = pattern.get('middle_triggers', [])
-                
-                if middle_triggers and not self.current_operation.middle_triggers_matched:
-                    # Промежуточные триггеры требуются, но не были выполнены
-                    return False
-                
-                # Все условия выполнены - операция завершена
-                return True
-        
-        return False
+    def scan_triggers(self, action):
+        """Все совпавшие триггеры для действия (один проход по каждому полю)"""
+        if self._scanned_action is not action:
+            self._scanned_matches = self.trigger_index.scan(action.name, action.event_type, action.path_text)
+            self._scanned_action = action
+        return self._scanned_matches
     
-    def check_operation_timeout(self, current_time):
-        """Проверить таймаут текущей операции"""
-        if not self.current_operation or not self.current_operation.end_time:
-            return False
-        
+    def parse_action(self, log_message):
+        """Разобрать строку лога в событие UIEvent (для логов в старом текстовом формате)"""
         try:
-            last_action_time = datetime.strptime(self.current_operation.end_time, "%H:%M:%S.%f")
-            current = datetime.strptime(current_time, "%H:%M:%S.%f")
-            
-            # Если прошло больше таймаута - операция прервана
-            if (current - last_action_time).total_seconds() > self.operation_timeout:
-                return True
-        except:
-            pass
-        
-        return False
+            return parse_log_line(log_message, self.log_day)
+        except Exception as e:
+            return None
     
     def extract_context(self, actions):
         """Извлечь контекст операции из действий"""
@@ -323,9 +143,9 @@ class OperationAnalyzer:
         # Ищем заполненные поля для операций ввода
         filled_fields = []
         for action in actions:
-            if action.get('event_type') == 'ВВОД':
-                element_name = action.get('element_name', '')
-                new_value = action.get('new_value', '')
+            if action.event_type == EVENT_INPUT:
+                element_name = action.name
+                new_value = action.new_value
                 if element_name and new_value:
                     filled_fields.append(f"{element_name}={new_value}")
         
@@ -334,107 +154,171 @@ class OperationAnalyzer:
         
         return context
     
-    def analyze_action(self, log_message):
-        """Анализировать действие и обновить состояние операций"""
-        action = self.parse_action(log_message)
+    @property
+    def current_operation(self):
+        """Последняя начатая из открытых операций (None - открытых нет)"""
+        if not self.candidates:
+            return None
+        return next(reversed(self.candidates.values()))
+    
+    def _close_operation(self, operation, status):
+        """Закрыть операцию-кандидата с указанным статусом и уведомить подписчиков"""
+        # Кандидат мог быть уже снят из таблицы (альтернатива завершенной операции)
+        if self.candidates.get(operation.pattern_key) is operation:
+            del self.candidates[operation.pattern_key]
+        operation.status = status
+        operation.completed = status == STATUS_COMPLETED
+        operation.context = self.extract_context(operation.actions)
+        self.completed_operations.append(operation)
+        self.statistics.add(operation)
+        for listener in self.operation_listeners:
+            listener(operation)
+        return operation
+    
+    def _interrupt_operation(self, operation, messages):
+        """Прервать кандидата (таймаут, вытеснение, повторный старт) с сообщением для лога"""
+        self._close_operation(operation, STATUS_INTERRUPTED)
+        messages.append(operation.to_string() + " | ⚠️ Прервано")
+    
+    def _start_operation(self, pattern_key, action, rivals, messages):
+        if len(self.candidates) >= self.max_candidates:
+            # Таблица заполнена - вытесняем кандидата, дольше всех не получавшего действий
+            stale = min(self.candidates.values(), key=lambda operation: operation.end_ns)
+            self._interrupt_operation(stale, messages)
+        operation = Operation(self.patterns[pattern_key]['name'], action.timestamp, pattern_key)
+        operation.alternative_operations = tuple(key for key in rivals if key != pattern_key)
+        operation.add_action(action)
+        self.candidates[pattern_key] = operation
+        return operation
+    
+    def analyze_action(self, action):
+        """Анализировать действие (UIEvent или строку лога) и обновить состояние операций
+        
+        Открытых операций может быть несколько (оператор переключается между задачами):
+        по одному кандидату на паттерн. Каждое действие за один проход продвигает всех
+        кандидатов, завершает, отменяет или прерывает их и открывает новых.
+        Возвращает сообщения для лога (через перевод строки) или None.
+        """
+        if isinstance(action, str):
+            action = self.parse_action(action)
         
         if not action:
             return None
         
         self.recent_actions.append(action)
-        
-        current_time = action.get('timestamp')
-        
-        # Проверяем таймаут текущей операции
-        if self.current_operation and current_time:
-            if self.check_operation_timeout(current_time):
-                # Операция прервана по таймауту
-                self.current_operation.context = self.extract_context(self.current_operation.actions)
-                self.completed_operations.append(self.current_operation)
-                result = self.current_operation.to_string() + " | ⚠️ Прервано"
-                self.current_operation = None
-                return result
-        
-        # Инициализируем переменную для сообщения о промежуточном триггере
-        middle_trigger_msg = None
-        
-        # Проверяем завершение текущей операции
-        if self.current_operation:
-            # Проверяем промежуточные триггеры (не прерываем, просто отмечаем)
-            _, middle_trigger_msg = self.check_middle_triggers(action)
-            
-            # Проверяем превышение лимита посторонних действий
-            if self.current_operation.unrelated_actions_count > self.max_unrelated_actions:
-                # Операция отменена из-за слишком большого количества посторонних действий
-                self.current_operation.context = self.extract_context(self.current_operation.actions)
-                self.completed_operations.append(self.current_operation)
-                result = self.current_operation.to_string() + f" | ❌ Отменено (>{self.max_unrelated_actions} посторонних действий)"
-                self.current_operation = None
-                return result
-            
-            # Если сработал новый промежуточный триггер - выводим сообщение
-            if middle_trigger_msg:
-                result = middle_trigger_msg
-            
-            self.current_operation.add_action(action)
-            
-            if self.detect_operation_completion(action):
-                # Операция завершена
-                self.current_operation.completed = True
-                self.current_operation.context = self.extract_context(self.current_operation.actions)
-                self.completed_operations.append(self.current_operation)
-                result = self.current_operation.to_string()
-                self.current_operation = None
-                return result
-        
-        # Возвращаем сообщение о промежуточном триггере если оно было
-        if self.current_operation and middle_trigger_msg:
-            return middle_trigger_msg
-        
-        # Проверяем начало новой операции
-        pattern_key, operation_name, all_operations = self.detect_operation_start(action)
-        
-        if pattern_key and operation_name:
-            # Если есть незавершенная операция - завершаем её
-            if self.current_operation:
-                self.current_operation.context = self.extract_context(self.current_operation.actions)
-                self.completed_operations.append(self.current_operation)
-            
-            # Начинаем новую операцию
-            self.current_operation = Operation(operation_name, current_time, pattern_key)
-            self.current_operation.add_action(action)
-            
-            # Сохраняем альтернативные операции для возможного переключения
-            if len(all_operations) > 1:
-                # Сохраняем ключи паттернов альтернативных операций
-                self.current_operation.alternative_operations = [
-                    key for key, name in all_operations if name != operation_name
-                ]
-            
-            # Проверяем, есть ли триггеры начала
-            pattern = self.patterns.get(pattern_key, {})
-            if pattern.get('triggers'):
-                # Если несколько операций могут начаться - показываем все варианты
-                if len(all_operations) > 1:
-                    operations_str = " или ".join([name for _, name in all_operations])
-                    return f"▶️ Начало операции: {operations_str}"
-                else:
-                    return f"▶️ Начало операции: {operation_name}"
+        messages = []
+        candidates = self.candidates
+        
+        # Таймаут: кандидаты без действий дольше operation_timeout прерываются
+        if candidates:
+            deadline = action.timestamp - self.operation_timeout * 1_000_000_000
+            for operation in [op for op in candidates.values() if op.end_ns < deadline]:
+                self._interrupt_operation(operation, messages)
+        
+        matches = self.scan_triggers(action)
+        triggered = matches.start_keys()
+        start_keys = triggered | set(self.trigger_index.without_start)
+        
+        # Проход по кандидатам: что из триггеров совпало у каждого
+        related = []
+        unrelated = []
+        for pattern_key, operation in candidates.items():
+            pattern = self.patterns.get(pattern_key)
+            if pattern is None:
+                unrelated.append((operation, None))
+                continue
+            if matches.first_in_name(pattern_key, 'completion') is not None and (
+                    operation.middle_triggers_matched or not pattern.get('middle_triggers')):
+                related.append((operation, 'completion', None))
+                continue
+            trigger = matches.first(pattern_key, 'middle') if pattern.get('middle_triggers') else None
+            if trigger is not None:
+                related.append((operation, 'middle', trigger))
+            elif pattern_key in start_keys and pattern.get('triggers'):
+                related.append((operation, 'start', None))
             else:
-                # Операция без триггеров начала - не выводим сообщение о начале
-                return None
+                unrelated.append((operation, pattern))
+        
+        # Повторный триггер начала у кандидата, уже прошедшего промежуточные шаги, - новая операция
+        restarted = [operation for operation, kind, _ in related
+                     if kind == 'start' and operation.matched_middle_triggers]
+        explained = bool(related) or any(key not in candidates for key in triggered)
         
-        return None
+        several = len(candidates) > 1
+        finished = []
+        for operation, kind, trigger in related:
+            if operation in restarted:
+                continue
+            operation.add_action(action)
+            operation.unrelated_actions_count = 0
+            if kind == 'completion':
+                finished.append(operation)
+            elif kind == 'middle':
+                operation.middle_triggers_matched = True
+                if trigger not in operation.matched_middle_triggers:
+                    operation.matched_middle_triggers += (trigger,)
+                    suffix = f" ({operation.operation_type})" if several else ""
+                    messages.append(f"   🔄 Промежуточный триггер: {trigger}{suffix}")
+        
+        # Действие, не объясненное ни одним кандидатом, - постороннее только для текущей операции:
+        # кандидаты в других окнах от него не отменяются
+        if unrelated and not explained:
+            foreground = self.current_operation
+            for operation, pattern in unrelated:
+                if operation is not foreground:
+                    continue
+                if pattern is not None and not pattern.get('middle_triggers'):
+                    operation.middle_triggers_matched = True
+                operation.unrelated_actions_count += 1
+                operation.add_action(action)
+                if operation.unrelated_actions_count > self.max_unrelated_actions:
+                    self._close_operation(operation, STATUS_CANCELLED)
+                    messages.append(operation.to_string()
+                                    + f" | ❌ Отменено (>{self.max_unrelated_actions} посторонних действий)")
+        
+        for operation in finished:
+            self._close_operation(operation, STATUS_COMPLETED)
+            messages.append(operation.to_string())
+            # Альтернативы, начатые тем же действием и не продвинувшиеся, больше не нужны
+            # (кроме завершенных этим же действием - они закрываются своей итерацией)
+            for key in operation.alternative_operations:
+                rival = candidates.get(key)
+                if (rival is not None and rival not in finished and rival.start_ns == operation.start_ns
+                        and not rival.matched_middle_triggers):
+                    candidates.pop(key, None)
+        
+        for operation in restarted:
+            self._interrupt_operation(operation, messages)
+        
+        # Новые кандидаты: паттерны с совпавшим триггером начала, которых еще нет в таблице
+        order = self.trigger_index.pattern_order
+        new_keys = sorted((key for key in start_keys if key not in candidates and key in order), key=order.get)
+        announced = []
+        for pattern_key in new_keys:
+            self._start_operation(pattern_key, action, new_keys, messages)
+            if self.patterns[pattern_key].get('triggers'):
+                announced.append(self.patterns[pattern_key]['name'])
+        if announced:
+            messages.append(f"▶️ Начало операции: {' или '.join(announced)}")
+        
+        return "\n".join(messages) if messages else None
     
-    def get_statistics(self):
-        """Получить статистику по операциям"""
-        if not self.completed_operations:
+    def finish(self):
+        """Конец потока событий (конец лога): открытые операции прерываются; возвращает сообщения или None"""
+        messages = []
+        for operation in list(self.candidates.values()):
+            self._interrupt_operation(operation, messages)
+        return "\n".join(messages) if messages else None
+    
+    def get_statistics(self, pattern_key=None, start=None, end=None):
+        """Получить статистику по операциям (всем или паттерна pattern_key, начатым в [start, end) нс эпохи)"""
+        stats = self.statistics.query(pattern_key, start, end)
+        if not stats.count:
             return "Нет завершенных операций"
         
-        total = len(self.completed_operations)
-        completed = sum(1 for op in self.completed_operations if op.completed)
-        interrupted = total - completed
-        
-        avg_duration = sum(op.get_duration() for op in self.completed_operations) / total
-        
-        return f"📈 Статистика: {total} операций | ✅ {completed} завершено | ⚠️ {interrupted} прервано | ⏱️ Средняя длительность: {avg_duration:.1f}с"
+        title = "📈 Статистика"
+        if pattern_key is not None:
+            title += f" ({self.patterns.get(pattern_key, {}).get('name', pattern_key)})"
+        p50, p95 = stats.sketch.quantiles((0.5, 0.95))
+        return (f"{title}: {stats.count} операций | ✅ {stats.completed} завершено | ⚠️ {stats.interrupted} прервано"
+                f" | ❌ {stats.cancelled} отменено | ⏱️ Средняя длительность: {stats.mean:.1f}с | p50 {p50:.1f}с, p95 {p95:.1f}с")
@@ -0,0 +1,307 @@
+"""
+Архив закрытых операций: последние в памяти (кольцо), более старые - пачками в файлы сегментов
+
+Для круглосуточной работы: память анализатора не растет с числом операций. Операции,
+вытесненные из кольца, копятся до batch_size и записываются одним сегментом
+operations.<нс начала>.seg; без каталога (directory=None) они отбрасываются (счетчик dropped,
+о первой потере сообщается в log_callback или журнал logging модуля).
+
+Формат сегмента: b'OPS1', длина и JSON заголовка (число операций, диапазон времени начала,
+ключи паттернов - для отбора сегментов без чтения), затем сжатое zlib тело: таблица строк
+сегмента и записи struct - операция и ее действия (время, номера строк, PID).
+"""
+import glob
+import json
+import logging
+import os
+import re
+import struct
+import sys
+import time
+import zlib
+from collections import deque
+
+from monitor.events import UIEvent, PATH_SEPARATOR
+from monitor.statistics import STATUS_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'OPS1'
+_LENGTH = struct.Struct('<I')
+# имя, ключ паттерна, статус, JSON доп. полей, начало нс, конец нс, посторонних действий, действий
+_OPERATION = struct.Struct('<IIIIqqII')
+# время нс, тип события, тип элемента, имя, AutomationId, класс, путь, было, стало, окно, PID (-1 - нет)
+_ACTION = struct.Struct('<qIIIIIIIIIi')
+# Имя сегмента: operations.<нс начала>[-n].seg
+_SEGMENT_NAME_RE = re.compile(r'^operations\.(\d+)(?:-(\d+))?\.seg$')
+
+
+def _encode(operations):
+    """Тело сегмента (до сжатия)"""
+    ids = {None: 0}
+    texts = []
+
+    def intern(text):
+        symbol = ids.get(text)
+        if symbol is None:
+            symbol = ids[text] = len(texts) + 1
+            texts.append(text)
+        return symbol
+
+    records = []
+    for operation in operations:
+        extra = json.dumps({'context': operation.context, 'middle': list(operation.matched_middle_triggers)},
+                           ensure_ascii=False)
+        records.append(_OPERATION.pack(
+            intern(operation.operation_type), intern(operation.pattern_key), intern(operation.status),
+            intern(extra), operation.start_ns or 0, operation.end_ns or 0,
+            operation.unrelated_actions_count, len(operation.actions)))
+        for action in operation.actions:
+            records.append(_ACTION.pack(
+                action.timestamp, intern(action.event_type), intern(action.control_type), intern(action.name),
+                intern(action.automation_id), intern(action.class_name), intern(PATH_SEPARATOR.join(action.path)),
+                intern(action.old_value), intern(action.new_value), intern(action.window),
+                -1 if action.pid is None else action.pid))
+
+    parts = [_LENGTH.pack(len(texts))]
+    for text in texts:
+        data = text.encode('utf-8')
+        parts.append(_LENGTH.pack(len(data)))
+        parts.append(data)
+    parts.append(_LENGTH.pack(len(operations)))
+    parts.extend(records)
+    return b''.join(parts)
+
+
+def _decode(body, wanted=None):
+    """Операции (Operation) из тела сегмента; wanted(ключ паттерна, начало нс) отбирает их до разбора действий"""
+    # operation_analyzer импортирует этот модуль - класс берется при вызове
+    from monitor.operation_analyzer import Operation
+
+    offset = 0
+    count, = _LENGTH.unpack_from(body, offset)
+    offset += _LENGTH.size
+    texts = [None]
+    for _ in range(count):
+        size, = _LENGTH.unpack_from(body, offset)
+        offset += _LENGTH.size
+        texts.append(body[offset:offset + size].decode('utf-8'))
+        offset += size
+
+    count, = _LENGTH.unpack_from(body, offset)
+    offset += _LENGTH.size
+    for _ in range(count):
+        name, pattern_key, status, extra, start_ns, end_ns, unrelated, actions = _OPERATION.unpack_from(body, offset)
+        offset += _OPERATION.size
+        if wanted is not None and not wanted(texts[pattern_key], start_ns or None):
+            offset += actions * _ACTION.size
+            continue
+        operation = Operation(texts[name], start_ns or None, texts[pattern_key])
+        operation.status = texts[status]
+        operation.completed = operation.status == STATUS_COMPLETED
+        extra = json.loads(texts[extra])
+        operation.context = extra['context']
+        operation.matched_middle_triggers = tuple(extra['middle'])
+        operation.middle_triggers_matched = bool(operation.matched_middle_triggers)
+        operation.unrelated_actions_count = unrelated
+        for _ in range(actions):
+            (timestamp, event_type, control_type, element, automation_id, class_name, path,
+             old_value, new_value, window, pid) = _ACTION.unpack_from(body, offset)
+            offset += _ACTION.size
+            path = texts[path]
+            operation.actions.append(UIEvent(
+                texts[event_type], timestamp, texts[control_type], texts[element], texts[automation_id],
+                texts[class_name], tuple(path.split(PATH_SEPARATOR)) if path else (),
+                texts[old_value], texts[new_value], None if pid < 0 else pid, texts[window]))
+        operation.end_ns = end_ns or None
+        yield operation
+
+
+def _segment_order(path):
+    """Ключ сортировки сегмента: время начала, затем номер повтора (по тексту 'x-1.seg' < 'x.seg')"""
+    match = _SEGMENT_NAME_RE.match(os.path.basename(path))
+    if match is None:
+        return 0, 0, path
+    return int(match.group(1)), int(match.group(2) or 0), path
+
+
+def read_segment_header(path):
+    """Заголовок сегмента: count, start_ns, last_start_ns, patterns"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Не сегмент архива операций: {path}")
+        size, = _LENGTH.unpack(f.read(_LENGTH.size))
+        return _load_header(f.read(size))
+
+
+def _load_header(data):
+    header = json.loads(data.decode('utf-8'))
+    # Заголовки всех сегментов держатся в памяти - ключи паттернов общие
+    header['patterns'] = frozenset(sys.intern(key) for key in header['patterns'])
+    return header
+
+
+def read_segment(path, wanted=None):
+    """Операции сегмента в порядке закрытия (wanted - см. _decode)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    size, = _LENGTH.unpack_from(data, len(MAGIC))
+    return _decode(zlib.decompress(data[len(MAGIC) + _LENGTH.size + size:]), wanted)
+
+
+class OperationArchive:
+    """Закрытые операции: capacity последних в памяти, остальные - в сегментах каталога directory
+
+    Поддерживает append/len/iter, как прежний список completed_operations: len и iter - только
+    операции, добавленные в этот архив (и еще не удаленные по retention). Выборки по времени
+    начала и ключу паттерна - query(), она читает и сегменты прежних запусков из каталога.
+    """
+
+    def __init__(self, directory=None, capacity=1000, batch_size=500, retention=1000):
+        self.directory = directory
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.retention = retention  # сегментов на диске (0 - без ограничения)
+        self.recent = deque()
+        self._spill = []  # вытесненные из кольца, еще не записанные
+        self._segments = []  # (путь, заголовок) от старых к новым
+        self._own = set()  # сегменты, записанные этим архивом
+        self.log_callback = None  # служебные сообщения для GUI (без него - в logger)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            for path in sorted(glob.glob(os.path.join(directory, 'operations.*.seg')), key=_segment_order):
+                try:
+                    self._segments.append((path, read_segment_header(path)))
+                except (OSError, ValueError):
+                    pass
+
+        # Счетчики
+        self.appended = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.segments_written = 0
+        self.bytes_written = 0
+        self.spill_seconds = 0.0
+        self.errors = 0
+
+    def append(self, operation):
+        self.appended += 1
+        self.recent.append(operation)
+        if len(self.recent) <= self.capacity:
+            return
+        oldest = self.recent.popleft()
+        if not self.directory:
+            self.dropped += 1
+            if self.dropped == 1:
+                self._log(logging.INFO, f"[ИНФО] Архив операций без каталога: в памяти хранятся последние"
+                                        f" {self.capacity}, более ранние операции не сохраняются")
+            return
+        self._spill.append(oldest)
+        if len(self._spill) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Записать вытесненные операции сегментом (вызывается и при остановке)"""
+        if not self._spill:
+            return
+        started = time.perf_counter()
+        operations, self._spill = self._spill, []
+        starts = [operation.start_ns or 0 for operation in operations]
+        header = json.dumps({
+            'count': len(operations),
+            'start_ns': min(starts),
+            'last_start_ns': max(starts),
+            'patterns': sorted({operation.pattern_key for operation in operations if operation.pattern_key}),
+        }, ensure_ascii=False).encode('utf-8')
+        data = MAGIC + _LENGTH.pack(len(header)) + header + zlib.compress(_encode(operations), 6)
+        path = os.path.join(self.directory, f"operations.{min(starts):020d}.seg")
+        suffix = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, f"operations.{min(starts):020d}-{suffix}.seg")
+            suffix += 1
+        try:
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            self.errors += 1
+            self.dropped += len(operations)
+            self._log(logging.ERROR, f"[ОШИБКА] Не удалось записать сегмент архива операций"
+                                     f" ({len(operations)} операций): {e}")
+            return
+        self._segments.append((path, _load_header(header)))
+        self._own.add(path)
+        self.spilled += len(operations)
+        self.segments_written += 1
+        self.bytes_written += len(data)
+        self.spill_seconds += time.perf_counter() - started
+        self._apply_retention()
+
+    def close(self):
+        """При остановке: с каталогом на диск записываются и операции из памяти"""
+        if self.directory:
+            self._spill.extend(self.recent)
+            self.recent.clear()
+        self.flush()
+
+    def _apply_retention(self):
+        if not self.retention:
+            return
+        while len(self._segments) > self.retention:
+            path, _ = self._segments.pop(0)
+            self._own.discard(path)
+            try:
+                os.remove(path)
+            except OSError:
+                self.errors += 1
+
+    def _log(self, level, message):
+        if self.log_callback is not None:
+            self.log_callback(message)
+        else:
+            logger.log(level, message)
+
+    def query(self, start=None, end=None, pattern_key=None, own=False):
+        """Операции, начатые в [start, end) (нс эпохи), с ключом pattern_key: сначала с диска, затем из памяти
+
+        own=True - только операции этого архива, без сегментов прежних запусков.
+        """
+        def wanted(key, started):
+            if pattern_key is not None and key != pattern_key:
+                return False
+            started = started or 0
+            return (start is None or started >= start) and (end is None or started < end)
+
+        for path, header in list(self._segments):
+            if own and path not in self._own:
+                continue
+            if pattern_key is not None and pattern_key not in header['patterns']:
+                continue
+            if (start is not None and header['last_start_ns'] < start) or (end is not None and header['start_ns'] >= end):
+                continue
+            try:
+                yield from read_segment(path, wanted)
+            except (OSError, ValueError, struct.error, zlib.error):
+                self.errors += 1
+        for operation in self._spill + list(self.recent):
+            if wanted(operation.pattern_key, operation.start_ns):
+                yield operation
+
+    def __iter__(self):
+        return self.query(own=True)
+
+    def __len__(self):
+        on_disk = sum(header['count'] for path, header in self._segments if path in self._own)
+        return on_disk + len(self._spill) + len(self.recent)
+
+    def get_stats(self):
+        return {
+            'appended': self.appended,
+            'in_memory': len(self.recent) + len(self._spill),
+            'spilled': self.spilled,
+            'dropped': self.dropped,
+            'segments': len(self._segments),
+            'bytes_written': self.bytes_written,
+            'spill_ms': self.spill_seconds * 1000,
+            'errors': self.errors,
+        }
@@ -0,0 +1,180 @@
+"""
+Построение пути к элементу с кэшированием предков по RuntimeId
+"""
+from collections import OrderedDict
+
+
+def describe_element(element):
+    """Описание элемента для пути: (тип, подпись)
+
+    Приоритет подписи: имя > AutomationId > пустая строка.
+    """
+    control_type = element.ControlTypeName
+    name = element.Name
+    if name and name.strip():
+        return control_type, name
+    automation_id = element.AutomationId
+    if automation_id and automation_id.strip():
+        return control_type, automation_id
+    return control_type, ''
+
+
+def render_path(descriptors):
+    """Собрать сегменты пути из описаний (от элемента к корню); результат - от корня к элементу"""
+    path = []
+    for control_type, label in descriptors:
+        if label:
+            path.append(f"{control_type}['{label}']")
+        elif control_type != 'PaneControl' or len(path) == 0:
+            # Не добавляем безымянные PaneControl в путь, если они не несут информации
+            path.append(f"{control_type}")
+
+    # Убираем дубликаты безымянных PaneControl подряд
+    cleaned_path = []
+    prev = None
+    for item in reversed(path):
+        if item == 'PaneControl' and prev == 'PaneControl':
+            continue
+        cleaned_path.append(item)
+        prev = item
+
+    return tuple(cleaned_path)
+
+
+class PathResolver:
+    """Кэш цепочек предков по RuntimeId с вытеснением давно неиспользуемых (LRU)
+
+    Сам элемент всегда читается заново (его имя часто совпадает со значением поля),
+    а обход родителей останавливается на первом предке, найденном в кэше.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        # RuntimeId -> (RuntimeId предков, описания предков, цепочка полная до корня)
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def resolve(self, element, max_depth=10):
+        """Получить сегменты пути к элементу через родительские элементы"""
+        descriptors = []
+        new_ids = []
+        tail_ids = ()
+        tail = ()
+        complete = False
+        current = element
+        depth = 0
+
+        try:
+            while current and depth < max_depth:
+                if depth > 0:
+                    runtime_id = tuple(current.GetRuntimeId())
+                    entry = self._lookup(runtime_id, max_depth - depth)
+                    if entry:
+                        tail_ids, tail, complete = entry
+                        break
+                    new_ids.append(runtime_id)
+
+                descriptors.append(describe_element(current))
+
+                # Переходим к родителю
+                try:
+                    parent = current.GetParentControl()
+                    if not parent or parent == current:
+                        complete = True
+                        break
+                    current = parent
+                    depth += 1
+                except:
+                    break
+
+        except:
+            # Цепочка оборвалась - кэшировать ее нельзя
+            new_ids = []
+
+        self._store(new_ids, descriptors[1:], tail_ids, tail, complete)
+        return render_path(descriptors + list(tail[:max_depth - len(descriptors)]))
+
+    def _lookup(self, runtime_id, needed):
+        """Найти предка в кэше; годится полная цепочка или достаточно длинная"""
+        entry = self._cache.get(runtime_id)
+        if entry is None or (not entry[2] and len(entry[1]) < needed):
+            self.misses += 1
+            return None
+        self._cache.move_to_end(runtime_id)
+        self.hits += 1
+        return entry
+
+    def _store(self, new_ids, new_descriptors, tail_ids, tail, complete):
+        """Запомнить цепочки для впервые пройденных предков"""
+        if self.capacity <= 0:
+            return
+        ids = tail_ids
+        chain = tail
+        for runtime_id, descriptor in zip(reversed(new_ids), reversed(new_descriptors)):
+            ids = (runtime_id,) + ids
+            chain = (descriptor,) + chain
+            self._cache[runtime_id] = (ids, chain, complete)
+            self._cache.move_to_end(runtime_id)
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+            self.evictions += 1
+
+    def _ancestors(self, element):
+        """Запись кэша для родителя элемента: (RuntimeId предков, описания, полнота)
+
+        Цепочка предков берется из кэша; при промахе путь строится один раз.
+        """
+        try:
+            parent_id = tuple(element.GetParentControl().GetRuntimeId())
+        except:
+            return None
+        entry = self._cache.get(parent_id)
+        if entry is None:
+            self.resolve(element)
+            entry = self._cache.get(parent_id)
+        return entry
+
+    def window_id(self, element, control_type='WindowControl'):
+        """RuntimeId ближайшего предка заданного типа (форма, которой принадлежит поле)"""
+        entry = self._ancestors(element)
+        if entry is None:
+            return None
+        ids, chain, _ = entry
+        for runtime_id, (ancestor_type, _) in zip(ids, chain):
+            if ancestor_type == control_type:
+                return runtime_id
+        return None
+
+    def ancestor_ids(self, element):
+        """RuntimeId предков элемента от родителя к корню (пусто, если цепочка недоступна)"""
+        entry = self._ancestors(element)
+        return entry[0] if entry else ()
+
+    def invalidate(self, runtime_id):
+        """Сбросить элемент и всех его потомков (окно закрыто или изменилась структура)"""
+        runtime_id = tuple(runtime_id)
+        stale = [key for key, (ids, _, _) in self._cache.items() if runtime_id in ids]
+        for key in stale:
+            del self._cache[key]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        """Полностью очистить кэш"""
+        self.invalidations += len(self._cache)
+        self._cache.clear()
+
+    def get_stats(self):
+        """Счетчики кэша"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,131 @@
+"""
+Повторный прогон записанной истории через OperationAnalyzer без GUI
+
+Читает один или несколько файлов monitor_history.log (в том числе сжатые сегменты .gz),
+сливает события по времени и выдает распознанные операции в формате JSONL.
+
+Запуск:
+    python -m monitor.replay logs/monitor_history*.log* [--patterns config/operation_patterns.json]
+                             [--output operations.jsonl] [--realtime [--speed 10]]
+"""
+import argparse
+import gzip
+import heapq
+import json
+import sys
+import time
+
+from monitor.events import LogDay, parse_log_line
+from monitor.history_writer import segment_started
+from monitor.operation_analyzer import OperationAnalyzer
+
+DEFAULT_PATTERNS = "config/operation_patterns.json"
+
+
+def open_log(path):
+    """Открыть файл истории как текст (сегменты .gz распаковываются на лету)"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def iter_log_events(path, day=None):
+    """События UIEvent из файла истории; служебные строки пропускаются
+
+    day - дата первых строк файла; по умолчанию берется из имени сегмента или по первой
+    строке файла. Переход через полночь внутри файла определяется по времени строк.
+    """
+    day = LogDay(day or segment_started(path))
+    with open_log(path) as f:
+        for line in f:
+            event = parse_log_line(line, day)
+            if event is not None:
+                yield event
+
+
+def iter_events(paths):
+    """События всех файлов, слитые по времени"""
+    streams = [iter_log_events(path) for path in paths]
+    if len(streams) == 1:
+        return streams[0]
+    return heapq.merge(*streams, key=lambda event: event.timestamp)
+
+
+def load_patterns(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def replay(paths, patterns, on_operation=None, realtime=False, speed=1.0, analyzer=None):
+    """Прогнать события из файлов через анализатор
+
+    on_operation(operation) вызывается для каждой закрытой операции, в том числе прерванных
+    в конце лога (unfinished в счетчиках).
+    realtime - выдерживать исходные интервалы между событиями (ускоренно в speed раз),
+    иначе события идут с максимальной скоростью.
+    Возвращает счетчики прогона.
+    """
+    if analyzer is None:
+        analyzer = OperationAnalyzer()
+        analyzer.patterns = patterns
+    if on_operation:
+        analyzer.operation_listeners.append(on_operation)
+
+    events = 0
+    first_timestamp = None
+    started = time.perf_counter()
+    try:
+        for event in iter_events(paths):
+            if realtime:
+                if first_timestamp is None:
+                    first_timestamp = event.timestamp
+                delay = (event.timestamp - first_timestamp) / 1e9 / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            analyzer.analyze_action(event)
+            events += 1
+        # Конец лога: операции, открытые к этому моменту, закрываются прерванными
+        unfinished = len(analyzer.candidates)
+        analyzer.finish()
+    finally:
+        if on_operation:
+            analyzer.operation_listeners.remove(on_operation)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'files': len(paths),
+        'events': events,
+        'operations': analyzer.statistics.totals.count,
+        'unfinished': unfinished,
+        'elapsed': elapsed,
+        'events_per_sec': events / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Повторный прогон истории монитора через анализатор операций")
+    parser.add_argument('logs', nargs='+', help='файлы monitor_history.log и сегменты .log.gz')
+    parser.add_argument('--patterns', default=DEFAULT_PATTERNS, help='файл паттернов операций (JSON)')
+    parser.add_argument('--output', '-o', help='файл JSONL с операциями (по умолчанию stdout)')
+    parser.add_argument('--realtime', action='store_true', help='выдерживать исходные интервалы между событиями')
+    parser.add_argument('--speed', type=float, default=1.0, help='ускорение для --realtime')
+    args = parser.parse_args(argv)
+
+    patterns = load_patterns(args.patterns)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+
+    def write_operation(operation):
+        output.write(json.dumps(operation.to_dict(), ensure_ascii=False) + '\n')
+
+    try:
+        stats = replay(args.logs, patterns, write_operation, args.realtime, args.speed)
+    finally:
+        if args.output:
+            output.close()
+
+    print(f"[ИНФО] Файлов: {stats['files']}, событий: {stats['events']}, операций: {stats['operations']}"
+          f" за {stats['elapsed']:.2f} с ({stats['events_per_sec']:.0f} событий/с)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Адаптивный интервал опроса: частый опрос при работе оператора, редкий в простое
+"""
+
+
+class AdaptiveScheduler:
+    """Интервал опроса с экспоненциальным отступом
+
+    Пока состояние (курсор, элемент в фокусе, значение поля) не меняется, интервал
+    умножается на factor, но не больше ceiling. Первое же изменение возвращает floor.
+    """
+
+    def __init__(self, floor=0.05, ceiling=1.0, factor=2.0, idle_ticks=3):
+        if floor <= 0 or ceiling < floor:
+            raise ValueError(f"Неверные границы интервала опроса: {floor}..{ceiling}")
+        self.floor = floor
+        self.ceiling = ceiling
+        self.factor = factor
+        self.idle_ticks = idle_ticks  # проходов без изменений до начала отступа
+        self.interval = floor
+        self._state = None
+        self._unchanged = 0
+
+        # Счетчики
+        self.wakeups = 0
+        self.active_wakeups = 0  # пробуждения, на которых замечено изменение
+        self.idle_wakeups = 0
+        self.resets = 0  # возвраты к частому опросу после отступа
+        self.slept = 0.0
+
+    def observe(self, state, changed=False):
+        """Учесть состояние после прохода опроса; возвращает интервал до следующего
+
+        changed - изменение замечено помимо состояния (например, пришли события из очереди).
+        """
+        self.wakeups += 1
+        self.slept += self.interval
+        if changed or state != self._state:
+            self._state = state
+            self._unchanged = 0
+            self.active_wakeups += 1
+            if self.interval > self.floor:
+                self.resets += 1
+            self.interval = self.floor
+            return self.interval
+
+        self.idle_wakeups += 1
+        self._unchanged += 1
+        if self._unchanged > self.idle_ticks:
+            self.interval = min(self.interval * self.factor, self.ceiling)
+        return self.interval
+
+    def reset(self):
+        """Вернуться к частому опросу"""
+        self._state = None
+        self._unchanged = 0
+        self.interval = self.floor
+
+    def get_stats(self):
+        """Текущий интервал и счетчики пробуждений"""
+        return {
+            'interval': self.interval,
+            'floor': self.floor,
+            'ceiling': self.ceiling,
+            'wakeups': self.wakeups,
+            'active_wakeups': self.active_wakeups,
+            'idle_wakeups': self.idle_wakeups,
+            'resets': self.resets,
+            'wakeups_per_sec': self.wakeups / self.slept if self.slept else 0.0,
+        }
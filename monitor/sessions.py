@@ -0,0 +1,179 @@
+"""
+Реестр сеансов 1С: все окна верхнего уровня нужных процессов на рабочем столе
+
+Монитор работает с несколькими клиентами 1С (и их отдельными окнами) одним циклом захвата:
+реестр находит окна, подключает новые и отключает закрытые, а для каждого элемента
+определяет окно, которому он принадлежит.
+"""
+import os
+from monitor.events import now_ns
+from monitor.snapshot import ElementSnapshot
+
+
+class Session:
+    """Подключенное окно верхнего уровня"""
+    __slots__ = ('window', 'runtime_id', 'pid', 'process_name', 'title', 'class_name',
+                 'attached_at')
+
+    def __init__(self, window, runtime_id, pid, process_name, title, class_name):
+        self.window = window  # снимок окна: ProcessId и заголовок читаются один раз
+        self.runtime_id = runtime_id
+        self.pid = pid
+        self.process_name = process_name
+        self.title = title
+        self.class_name = class_name
+        self.attached_at = now_ns()
+
+    def describe(self):
+        return f"PID: {self.pid}, Окно: '{self.title}'"
+
+    def __repr__(self):
+        return f"Session({self.pid}, {self.title!r})"
+
+
+class SessionRegistry:
+    """Окна верхнего уровня процессов process_name (и классов class_names, если заданы)
+
+    refresh() сравнивает рабочий стол с реестром и возвращает (подключенные, отключенные).
+    Элемент относится к окну по цепочке предков из PathResolver; если у процесса одно окно -
+    достаточно ProcessId.
+    """
+
+    def __init__(self, provider, path_resolver, process_name='1cv8c.exe', class_names=None,
+                 rescan_interval=2.0):
+        self.provider = provider
+        self.path_resolver = path_resolver
+        self.process_names = {name.lower() for name in
+                              (process_name if isinstance(process_name, (list, tuple, set)) else (process_name,))}
+        self.class_names = set(class_names) if class_names else None
+        self.rescan_interval = rescan_interval
+        self.sessions = {}  # RuntimeId окна -> Session
+        self._by_pid = {}  # ProcessId -> [Session]
+        self._process_names = {}  # ProcessId -> имя исполняемого файла
+        self._last_scan = 0
+
+        # Счетчики
+        self.scans = 0
+        self.attached = 0
+        self.detached = 0
+        self.unmatched = 0  # элементы вне подключенных окон
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __iter__(self):
+        return iter(list(self.sessions.values()))
+
+    def matches(self, pid, class_name):
+        """Окно относится к отслеживаемым процессам"""
+        if self.class_names is not None and class_name not in self.class_names:
+            return False
+        name = self._process_names.get(pid)
+        if name is None:
+            try:
+                name = os.path.basename(self.provider.process_name(pid) or '').lower()
+            except Exception:
+                name = ''
+            self._process_names[pid] = name
+        return name in self.process_names
+
+    def discover(self):
+        """Подходящие окна рабочего стола: {RuntimeId: (снимок окна, pid, имя класса)}
+
+        У уже подключенных окон читается только RuntimeId.
+        """
+        found = {}
+        for window in self.provider.top_windows():
+            snapshot = window if isinstance(window, ElementSnapshot) else ElementSnapshot(window)
+            try:
+                runtime_id = tuple(snapshot.GetRuntimeId())
+                session = self.sessions.get(runtime_id)
+                if session is not None:
+                    found[runtime_id] = (session.window, session.pid, session.class_name)
+                    continue
+                pid = snapshot.ProcessId
+                class_name = snapshot.ClassName
+            except Exception:
+                continue
+            if self.matches(pid, class_name):
+                found[runtime_id] = (snapshot, pid, class_name)
+        return found
+
+    def refresh(self, force=True):
+        """Подключить новые окна и отключить исчезнувшие; force=False - не чаще rescan_interval"""
+        now = now_ns()
+        if not force and now - self._last_scan < self.rescan_interval * 1_000_000_000:
+            return [], []
+        self._last_scan = now
+        self.scans += 1
+
+        found = self.discover()
+        detached = [self.detach(runtime_id) for runtime_id in list(self.sessions) if runtime_id not in found]
+        attached = []
+        for runtime_id, (window, pid, class_name) in found.items():
+            if runtime_id in self.sessions:
+                continue
+            try:
+                title = window.Name or ''
+            except Exception:
+                title = ''
+            session = Session(window, runtime_id, pid, self._process_names.get(pid, ''), title, class_name)
+            self.sessions[runtime_id] = session
+            self._by_pid.setdefault(pid, []).append(session)
+            self.attached += 1
+            attached.append(session)
+        return attached, [session for session in detached if session is not None]
+
+    def detach(self, runtime_id):
+        """Отключить окно (закрыто); возвращает сеанс или None"""
+        session = self.sessions.pop(tuple(runtime_id), None)
+        if session is None:
+            return None
+        sessions = self._by_pid.get(session.pid, [])
+        if session in sessions:
+            sessions.remove(session)
+        if not sessions:
+            self._by_pid.pop(session.pid, None)
+            self._process_names.pop(session.pid, None)
+        self.detached += 1
+        return session
+
+    def session_for(self, element):
+        """Окно, которому принадлежит элемент, или None (элемент не из отслеживаемых окон)"""
+        try:
+            sessions = self._by_pid.get(element.ProcessId)
+        except Exception:
+            sessions = None
+        if not sessions:
+            self.unmatched += 1
+            return None
+        if len(sessions) == 1:
+            return sessions[0]
+        # Несколько окон одного процесса - ищем окно среди предков элемента
+        try:
+            runtime_id = tuple(element.GetRuntimeId())
+        except Exception:
+            runtime_id = None
+        session = self.sessions.get(runtime_id)
+        if session is not None:
+            return session
+        for ancestor_id in self.path_resolver.ancestor_ids(element):
+            session = self.sessions.get(ancestor_id)
+            if session is not None:
+                return session
+        self.unmatched += 1
+        return None
+
+    def processes(self):
+        """ProcessId подключенных процессов"""
+        return sorted(self._by_pid)
+
+    def get_stats(self):
+        return {
+            'sessions': len(self.sessions),
+            'processes': len(self._by_pid),
+            'scans': self.scans,
+            'attached': self.attached,
+            'detached': self.detached,
+            'unmatched': self.unmatched,
+        }
@@ -0,0 +1,163 @@
+"""
+Снимки элементов: каждое свойство читается через COM не больше одного раза за проход опроса
+
+Если провайдер умеет пакетное чтение (fetch_properties и др.), все нужные свойства элемента
+приходят одним межпроцессным вызовом, а путь к корню - одним вызовом на предка.
+"""
+
+_MISSING = object()
+
+# Свойства, которые провайдер возвращает одним пакетом
+BATCH_KEYS = frozenset(('ProcessId', 'ControlTypeName', 'Name', 'AutomationId', 'ClassName',
+                        'BoundingRectangle', 'RuntimeId', 'ValuePattern', 'Value'))
+
+
+class _ReadError:
+    """Запомненная ошибка чтения - повторный вызов к недоступному элементу не делается"""
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+class Tick:
+    """Один проход опроса: общий снимок элемента в фокусе и счетчик COM-чтений"""
+
+    def __init__(self, provider, batch=False):
+        self.provider = provider
+        self.batch = batch  # читать свойства пакетами через провайдер
+        self.reads = 0
+        self._focused = _MISSING
+
+    def focused(self):
+        """Снимок элемента в фокусе (запрашивается один раз за проход)"""
+        if self._focused is _MISSING:
+            self.reads += 1
+            if self.batch:
+                element, values = self.provider.fetch_focused()
+                self._focused = self.snapshot(element, values)
+            else:
+                self._focused = self.snapshot(self.provider.get_focused())
+        return self._focused
+
+    def element_from_point(self, x, y):
+        """Снимок элемента под точкой экрана"""
+        self.reads += 1
+        if self.batch:
+            element, values = self.provider.fetch_from_point(x, y)
+            return self.snapshot(element, values)
+        return self.snapshot(self.provider.element_from_point(x, y))
+
+    def snapshot(self, element, values=None):
+        """Снимок элемента, чтения которого учитываются в этом проходе"""
+        if element is None or isinstance(element, ElementSnapshot):
+            return element
+        return ElementSnapshot(element, self, self.provider if self.batch else None, values)
+
+
+class ElementSnapshot:
+    """Элемент с ленивым чтением и запоминанием свойств
+
+    Повторяет интерфейс элемента uiautomation в той части, которую использует монитор.
+    Снимок сам служит ValuePattern: GetValuePattern() возвращает снимок, если у элемента
+    есть шаблон значения, а Value тоже читается один раз.
+    С provider первое обращение к свойству читает их все одним пакетом,
+    а GetParentControl возвращает снимок родителя, полученный тоже одним вызовом.
+    """
+    __slots__ = ('element', 'counter', 'provider', '_values', '_fetched')
+
+    def __init__(self, element, counter=None, provider=None, values=None):
+        self.element = element
+        self.counter = counter  # объект с полем reads (например, Tick)
+        self.provider = provider  # провайдер с пакетным чтением или None
+        self._values = dict(values) if values else {}
+        self._fetched = bool(values)
+
+    def _count(self):
+        if self.counter is not None:
+            self.counter.reads += 1
+
+    def _fetch(self):
+        """Прочитать все свойства одним вызовом; при ошибке - обычное чтение по одному"""
+        self._fetched = True
+        try:
+            values = self.provider.fetch_properties(self.element)
+        except Exception:
+            return
+        finally:
+            self._count()
+        for key, value in values.items():
+            self._values.setdefault(key, value)
+
+    def _read(self, key, read):
+        value = self._values.get(key, _MISSING)
+        if value is _MISSING and self.provider is not None and not self._fetched and key in BATCH_KEYS:
+            self._fetch()
+            value = self._values.get(key, _MISSING)
+        if value is _MISSING:
+            try:
+                value = read()
+            except Exception as e:
+                value = _ReadError(e)
+            self._values[key] = value
+            self._count()
+        if isinstance(value, _ReadError):
+            raise value.error
+        return value
+
+    @property
+    def ProcessId(self):
+        return self._read('ProcessId', lambda: self.element.ProcessId)
+
+    @property
+    def ControlTypeName(self):
+        return self._read('ControlTypeName', lambda: self.element.ControlTypeName)
+
+    @property
+    def Name(self):
+        return self._read('Name', lambda: self.element.Name)
+
+    @property
+    def AutomationId(self):
+        return self._read('AutomationId', lambda: self.element.AutomationId)
+
+    @property
+    def ClassName(self):
+        return self._read('ClassName', lambda: self.element.ClassName)
+
+    @property
+    def BoundingRectangle(self):
+        return self._read('BoundingRectangle', lambda: self.element.BoundingRectangle)
+
+    def GetRuntimeId(self):
+        return self._read('RuntimeId', self.element.GetRuntimeId)
+
+    def GetParentControl(self):
+        if self.provider is not None and 'Parent' not in self._values:
+            try:
+                parent, values = self.provider.fetch_parent(self.element)
+                self._values['Parent'] = (ElementSnapshot(parent, self.counter, self.provider, values)
+                                          if parent is not None else None)
+            except Exception:
+                pass
+            self._count()
+        return self._read('Parent', self.element.GetParentControl)
+
+    def GetValuePattern(self):
+        pattern = self._read('ValuePattern', self.element.GetValuePattern)
+        return self if pattern else None
+
+    @property
+    def Value(self):
+        return self._read('Value', lambda: self._read('ValuePattern', self.element.GetValuePattern).Value)
+
+    def __eq__(self, other):
+        if isinstance(other, ElementSnapshot):
+            other = other.element
+        return self.element == other
+
+    def __hash__(self):
+        return hash(self.element)
+
+    def __repr__(self):
+        return f"ElementSnapshot({self.element!r}, прочитано {len(self._values)})"
@@ -0,0 +1,207 @@
+"""
+Накопительная статистика операций: обновляется за O(1) при закрытии операции
+
+Для каждого паттерна и в целом хранятся счетчики по статусам, сумма и сумма квадратов
+длительностей и скетч процентилей. Для выборок за период те же агрегаты ведутся по
+минутным корзинам (по времени начала операции, как в EventStore); период округляется
+до корзин, хранятся последние сутки.
+"""
+import math
+
+# Чем закончилась операция
+STATUS_COMPLETED = 'completed'  # сработал триггер завершения
+STATUS_INTERRUPTED = 'interrupted'  # таймаут или началась другая операция
+STATUS_CANCELLED = 'cancelled'  # слишком много посторонних действий
+
+# Длительности короче этой (с) считаются нулевыми
+_MIN_DURATION = 0.001
+
+
+class DurationSketch:
+    """Скетч процентилей с логарифмическими корзинами (относительная погрешность relative_accuracy)
+
+    Длительность x попадает в корзину ceil(log(x) / log(gamma)); корзины - словарь счетчиков,
+    поэтому добавление O(1), а скетчи разных паттернов и периодов складываются.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value < _MIN_DURATION:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.zeros += other.zeros
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def quantiles(self, qs):
+        """Значения квантилей qs (0..1, по возрастанию) за один проход по корзинам; None - скетч пуст"""
+        if not self.count:
+            return [None] * len(qs)
+        result = []
+        ranks = iter([q * (self.count - 1) for q in qs])
+        rank = next(ranks, None)
+        seen = self.zeros
+        while rank is not None and rank < seen:
+            result.append(0.0)
+            rank = next(ranks, None)
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            while rank is not None and rank < seen:
+                result.append(2 * self.gamma ** index / (self.gamma + 1))
+                rank = next(ranks, None)
+        while len(result) < len(qs):
+            result.append(2 * self.gamma ** max(self.buckets) / (self.gamma + 1))
+        return result
+
+    def quantile(self, q):
+        return self.quantiles((q,))[0]
+
+
+class OperationStats:
+    """Агрегаты группы операций"""
+
+    def __init__(self):
+        self.count = 0
+        self.completed = 0
+        self.interrupted = 0
+        self.cancelled = 0
+        self.total = 0.0  # сумма длительностей, с
+        self.total_sq = 0.0
+        self.min = None
+        self.max = None
+        self.sketch = DurationSketch()
+
+    def add(self, status, duration):
+        """status - одна из констант STATUS_*"""
+        self.count += 1
+        if status == STATUS_COMPLETED:
+            self.completed += 1
+        elif status == STATUS_INTERRUPTED:
+            self.interrupted += 1
+        elif status == STATUS_CANCELLED:
+            self.cancelled += 1
+        self.total += duration
+        self.total_sq += duration * duration
+        if self.min is None or duration < self.min:
+            self.min = duration
+        if self.max is None or duration > self.max:
+            self.max = duration
+        self.sketch.add(duration)
+
+    def merge(self, other):
+        if not other.count:
+            return
+        self.count += other.count
+        self.completed += other.completed
+        self.interrupted += other.interrupted
+        self.cancelled += other.cancelled
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def stdev(self):
+        if self.count < 2:
+            return 0.0
+        variance = (self.total_sq - self.total * self.total / self.count) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def to_dict(self):
+        p50, p95, p99 = self.sketch.quantiles((0.5, 0.95, 0.99))
+        return {
+            'count': self.count,
+            'completed': self.completed,
+            'interrupted': self.interrupted,
+            'cancelled': self.cancelled,
+            'avg': self.mean,
+            'stdev': self.stdev,
+            'min': self.min,
+            'max': self.max,
+            'p50': p50,
+            'p95': p95,
+            'p99': p99,
+        }
+
+
+class OperationStatistics:
+    """Статистика закрытых операций: в целом, по паттернам и по минутным корзинам"""
+
+    def __init__(self, bucket_seconds=60, retention=24 * 3600):
+        self.bucket_ns = bucket_seconds * 1_000_000_000
+        self.max_buckets = max(1, retention // bucket_seconds)
+        self.reset()
+
+    def reset(self):
+        self.totals = OperationStats()
+        self.per_pattern = {}  # ключ паттерна -> OperationStats
+        self.windows = {}  # номер корзины -> {ключ паттерна: OperationStats}
+
+    def add(self, operation):
+        """Учесть закрытую операцию (Operation)"""
+        duration = operation.get_duration()
+        status = operation.status
+        key = operation.pattern_key
+        self.totals.add(status, duration)
+        stats = self.per_pattern.get(key)
+        if stats is None:
+            stats = self.per_pattern[key] = OperationStats()
+        stats.add(status, duration)
+
+        if operation.start_ns is None:
+            return
+        index = operation.start_ns // self.bucket_ns
+        window = self.windows.get(index)
+        if window is None:
+            window = self.windows[index] = {}
+            if len(self.windows) > self.max_buckets:
+                del self.windows[min(self.windows)]
+        stats = window.get(key)
+        if stats is None:
+            stats = window[key] = OperationStats()
+        stats.add(status, duration)
+
+    def query(self, pattern_key=None, start=None, end=None):
+        """Агрегаты (OperationStats) паттерна или всех операций, начатых в [start, end) (нс эпохи)"""
+        if start is None and end is None:
+            if pattern_key is None:
+                return self.totals
+            return self.per_pattern.get(pattern_key) or OperationStats()
+
+        first = None if start is None else start // self.bucket_ns
+        last = None if end is None else (end - 1) // self.bucket_ns
+        result = OperationStats()
+        for index, window in self.windows.items():
+            if (first is not None and index < first) or (last is not None and index > last):
+                continue
+            if pattern_key is None:
+                for stats in window.values():
+                    result.merge(stats)
+            elif pattern_key in window:
+                result.merge(window[pattern_key])
+        return result
+
+    def get_stats(self):
+        return {
+            'operations': self.totals.count,
+            'patterns': len(self.per_pattern),
+            'buckets': len(self.windows),
+        }
@@ -0,0 +1,56 @@
+"""
+Таблица символов: повторяющиеся строки событий хранятся один раз, события держат номера
+
+Тип события, тип элемента, AutomationId и класс повторяются в тысячах событий, а каждое
+чтение свойства через COM дает новую строку. SymbolTable выдает строке номер.
+
+Таблица общая для процесса (SYMBOLS) и только растет: номер действителен, пока жив процесс.
+Поэтому в нее попадают только поля с ограниченным набором значений (их задают
+конфигурация и формы 1С). Имя элемента, заголовок окна и путь (номера документов,
+ячейки таблиц) и значения полей не интернируются - иначе память службы растет без предела.
+Между процессами события передаются словарями (UIEvent.to_dict()).
+"""
+import sys
+import threading
+
+
+class SymbolTable:
+    """Строка <-> номер; номер 0 - None"""
+
+    def __init__(self):
+        self._ids = {}
+        self.texts = [None]  # номер -> строка (список общий, только дополняется)
+        self._lock = threading.Lock()
+
+    def intern(self, text):
+        symbol = self._ids.get(text)
+        if symbol is not None:
+            return symbol
+        if text is None:
+            return 0
+        with self._lock:
+            symbol = self._ids.get(text)
+            if symbol is None:
+                symbol = len(self.texts)
+                self.texts.append(text)
+                self._ids[text] = symbol
+        return symbol
+
+    def lookup(self, text):
+        """Номер строки без добавления; None - строка не встречалась"""
+        return 0 if text is None else self._ids.get(text)
+
+    def text(self, symbol):
+        return self.texts[symbol]
+
+    def __len__(self):
+        return len(self.texts) - 1
+
+    def get_stats(self):
+        return {
+            'symbols': len(self),
+            'bytes': sum(sys.getsizeof(text) for text in self.texts[1:]),
+        }
+
+
+SYMBOLS = SymbolTable()
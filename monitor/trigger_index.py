@@ -0,0 +1,203 @@
+"""
+Индекс триггеров операций - все триггеры всех паттернов в одном автомате Ахо-Корасик
+
+Один проход по тексту поля находит все совпавшие триггеры. Совпадение засчитывается
+по тем же правилам, что и прежняя проверка регуляркой на каждый триггер (см. benchmarks/bench_triggers.py):
+типы событий (ВВОД, КЛИК, ФОКУС) сравниваются целиком, остальные триггеры ищутся без учета регистра с границами слов (\\b).
+"""
+from collections import deque
+from monitor.events import EVENT_TYPES
+
+# Вид триггера -> ключ списка триггеров в паттерне
+TRIGGER_KINDS = {
+    'start': 'triggers',
+    'middle': 'middle_triggers',
+    'completion': 'completion_triggers',
+}
+
+
+def _is_word(char):
+    return char.isalnum() or char == '_'
+
+
+def _is_boundary(text, position):
+    """Граница слова в позиции (аналог \\b)"""
+    left = position > 0 and _is_word(text[position - 1])
+    right = position < len(text) and _is_word(text[position])
+    return left != right
+
+
+class _Automaton:
+    """Автомат Ахо-Корасик над строками в нижнем регистре"""
+
+    def __init__(self, words):
+        self.lengths = [len(word) for word in words]
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for word_id, word in enumerate(words):
+            node = 0
+            for char in word:
+                next_node = self.goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self.goto)
+                    self.goto[node][char] = next_node
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                node = next_node
+            self.output[node].append(word_id)
+
+        # Суффиксные ссылки обходом в ширину
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def search(self, text):
+        """Все вхождения: (номер строки, начало, конец)"""
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                end = position + 1
+                for word_id in output[node]:
+                    yield word_id, end - self.lengths[word_id], end
+
+
+class TriggerMatches:
+    """Результат сканирования действия
+
+    Хранит только номера совпавших групп (уникальных текстов триггеров);
+    выборка по конкретному паттерну делается по запросу.
+    any_field - совпадения в имени, типе события или пути;
+    name_only - совпадения только в имени элемента (для триггеров завершения).
+    """
+    __slots__ = ('index', 'any_field', 'name_only')
+
+    def __init__(self, index, any_field, name_only):
+        self.index = index
+        self.any_field = any_field
+        self.name_only = name_only
+
+    def _first(self, group_ids, pattern_key, kind):
+        groups = self.index.groups
+        best = None
+        for group_id in group_ids:
+            hit = groups[group_id].get((pattern_key, kind))
+            if hit is not None and (best is None or hit < best):
+                best = hit
+        return best[1] if best else None
+
+    def first(self, pattern_key, kind):
+        """Первый по порядку паттерна триггер, совпавший в любом поле"""
+        return self._first(self.any_field, pattern_key, kind)
+
+    def first_in_name(self, pattern_key, kind):
+        """Первый по порядку паттерна триггер, совпавший в имени элемента"""
+        return self._first(self.name_only, pattern_key, kind)
+
+    def start_keys(self):
+        """Паттерны, у которых совпал хотя бы один триггер начала"""
+        keys = set()
+        for group_id in self.any_field:
+            keys.update(self.index.start_keys[group_id])
+        return keys
+
+
+class TriggerIndex:
+    """Скомпилированный индекс триггеров всех паттернов
+
+    Группа - уникальный текст триггера; для каждой группы хранится
+    {(ключ паттерна, вид): (позиция в паттерне, триггер)}.
+    """
+
+    def __init__(self, patterns=None):
+        self.pattern_order = {}  # ключ паттерна -> порядковый номер
+        self.without_start = []  # паттерны без триггеров начала
+        self.groups = []
+        self.start_keys = []  # для каждой группы: паттерны, где она - триггер начала
+        self._exact = {}  # тип события -> номер группы
+        self._word_groups = []  # номер слова автомата -> номер группы
+        self._automaton = _Automaton([])
+        if patterns:
+            self.build(patterns)
+
+    def build(self, patterns):
+        """Скомпилировать паттерны"""
+        self.pattern_order = {}
+        self.without_start = []
+        self.groups = []
+        self.start_keys = []
+        self._exact = {}
+        self._word_groups = []
+        words = []
+        group_ids = {}
+
+        for order, (pattern_key, pattern) in enumerate(patterns.items()):
+            self.pattern_order[pattern_key] = order
+            if not pattern.get('triggers'):
+                self.without_start.append(pattern_key)
+
+            for kind, field in TRIGGER_KINDS.items():
+                for position, trigger in enumerate(pattern.get(field) or []):
+                    if not trigger:
+                        continue
+                    # Типы событий сравниваются точно, остальное - без учета регистра
+                    text = trigger if trigger in EVENT_TYPES else trigger.lower()
+                    group_key = (trigger in EVENT_TYPES, text)
+                    group_id = group_ids.get(group_key)
+                    if group_id is None:
+                        group_id = group_ids[group_key] = len(self.groups)
+                        self.groups.append({})
+                        self.start_keys.append(set())
+                        if trigger in EVENT_TYPES:
+                            self._exact[text] = group_id
+                        else:
+                            words.append(text)
+                            self._word_groups.append(group_id)
+                    self.groups[group_id].setdefault((pattern_key, kind), (position, trigger))
+                    if kind == 'start':
+                        self.start_keys[group_id].add(pattern_key)
+
+        self._automaton = _Automaton(words)
+
+    def match(self, text):
+        """Номера групп триггеров, встречающихся в тексте"""
+        if not text:
+            return []
+        text = text.strip()
+        found = []
+        exact = self._exact.get(text)
+        if exact is not None:
+            found.append(exact)
+
+        lowered = text.lower()
+        seen = set()
+        for word_id, start, end in self._automaton.search(lowered):
+            if word_id in seen:
+                continue
+            if _is_boundary(lowered, start) and _is_boundary(lowered, end):
+                seen.add(word_id)
+                found.append(self._word_groups[word_id])
+        return found
+
+    def scan(self, element_name, event_type, path):
+        """Сопоставить действие со всеми триггерами за один проход по каждому полю"""
+        name_only = self.match(element_name)
+        any_field = set(name_only)
+        any_field.update(self.match(event_type))
+        any_field.update(self.match(path))
+        return TriggerMatches(self, any_field, name_only)
@@ -1,38 +1,24 @@
 """
 Модуль для мониторинга UI элементов через UI Automation
 """
-import time
-import uiautomation as auto
-from datetime import datetime
-import pythoncom
-import ctypes
-from ctypes import wintypes
-from comtypes import client
+from monitor.capture import create_backend, PollingBackend
+from monitor.events import UIEvent, EVENT_CLICK, EVENT_FOCUS, EVENT_INPUT, format_path, now_ns
+from monitor.path_resolver import PathResolver, describe_element, render_path
+from monitor.sessions import SessionRegistry
+from monitor.value_tracker import ValueTracker
+from monitor.snapshot import Tick
 
 
 def get_element_path(element, max_depth=10):
-    """Получить путь к элементу через родительские элементы"""
-    path = []
+    """Получить путь к элементу через родительские элементы (без кэширования)"""
+    descriptors = []
     current = element
     depth = 0
     
     try:
         while current and depth < max_depth:
             # Получаем информацию о текущем элементе
-            control_type = current.ControlTypeName
-            name = current.Name
-            automation_id = current.AutomationId
-            
-            # Формируем описание элемента
-            # Приоритет: имя > AutomationId > просто тип
-            if name and name.strip():
-                path.append(f"{control_type}['{name}']")
-            elif automation_id and automation_id.strip():
-                path.append(f"{control_type}['{automation_id}']")
-            else:
-                # Не добавляем безымянные PaneControl в путь, если они не несут информации
-                if control_type != 'PaneControl' or len(path) == 0:
-                    path.append(f"{control_type}")
+            descriptors.append(describe_element(current))
             
             # Переходим к родителю
             try:
@@ -47,20 +33,13 @@ def get_element_path(element, max_depth=10):
     except:
         pass
     
-    # Убираем дубликаты безымянных PaneControl подряд
-    cleaned_path = []
-    prev = None
-    for item in reversed(path):
-        if item == 'PaneControl' and prev == 'PaneControl':
-            continue
-        cleaned_path.append(item)
-        prev = item
-    
-    return " → ".join(cleaned_path) if cleaned_path else "Unknown"
+    return format_path(render_path(descriptors))
 
 
 class UIMonitor:
-    def __init__(self, process_name="1cv8c.exe", log_focus=True, log_clicks=True, log_input=True):
+    def __init__(self, process_name="1cv8c.exe", log_focus=True, log_clicks=True, log_input=True,
+                 backend="events", provider=None, batch_properties=True, poll_floor=0.05, poll_ceiling=1.0,
+                 mouse_hook=True, window_classes=None, rescan_interval=2.0):
         self.is_monitoring = False
         self.target_process = process_name
         self.log_focus = log_focus
@@ -68,30 +47,58 @@ class UIMonitor:
         self.log_input = log_input
         self.last_focused_element = None
         self.last_invoke_time = 0
-        self.input_values = {}  # Хранение последних значений полей для отслеживания изменений
+        # Последние значения полей для отслеживания изменений (LRU, время жизни, сброс при закрытии формы)
+        self.input_values = ValueTracker()
+        self.backend_name = backend  # 'events' - подписка на события UIA, 'polling' - опрос
+        self.backend = None
+        # Границы адаптивного интервала опроса, с: при работе оператора и в простое
+        self.poll_floor = poll_floor
+        self.poll_ceiling = poll_ceiling
+        # Клики - из перехвата мыши (WH_MOUSE_LL), а не опросом состояния кнопки или по Invoke
+        self.mouse_hook = mouse_hook
+        # Окна 1С на рабочем столе (создается при запуске мониторинга)
+        self.window_classes = window_classes  # None - все окна верхнего уровня процесса
+        self.rescan_interval = rescan_interval  # период поиска новых и закрытых окон, с
+        self.sessions = None
+        self.provider = provider  # Доступ к UI Automation (реальный или тестовый)
+        self.path_resolver = PathResolver()  # Кэш цепочек предков по RuntimeId
+        # Читать свойства элемента одним пакетом (CacheRequest), если провайдер это умеет
+        self.batch_properties = batch_properties
+        # COM-чтения свойств за проходы опроса
+        self.tick_count = 0
+        self.tick_reads = 0
+        self.last_tick_reads = 0
         
-    def start_monitoring(self, log_callback, connection_callback):
-        """Начать мониторинг UI элементов"""
+    def start_monitoring(self, log_callback, connection_callback, event_callback=None):
+        """Начать мониторинг UI элементов
+
+        log_callback получает служебные сообщения, event_callback - события UIEvent.
+        Без event_callback события выводятся в log_callback строками лога.
+        """
         self.is_monitoring = True
         self.log_callback = log_callback
         self.connection_callback = connection_callback
+        self.event_callback = event_callback
+        
+        if self.provider is None:
+            from monitor.uia_provider import UIAutomationProvider
+            self.provider = UIAutomationProvider()
         
         # Инициализация COM для работы с UI Automation
-        pythoncom.CoInitialize()
+        self.provider.initialize(multithreaded=self.backend_name == 'events')
         
         try:
-            # Поиск окна 1С по имени процесса
-            window = auto.WindowControl(searchDepth=1, ClassName="V8TopLevelFrameSDI")
+            # Поиск всех окон процессов 1С
+            self.sessions = SessionRegistry(self.provider, self.path_resolver, self.target_process,
+                                            self.window_classes, self.rescan_interval)
+            self.sessions.refresh()
             
-            if not window.Exists(0, 0):
+            if not len(self.sessions):
                 self.connection_callback(False, f"Окно процесса {self.target_process} не найдено. Убедитесь, что 1С запущена.")
                 return
             
-            # Проверяем, что это нужный процесс
-            process_id = window.ProcessId
-            window_title = window.Name
-            
-            self.connection_callback(True, f"Процесс {self.target_process} (PID: {process_id}, Окно: '{window_title}')")
+            windows = '; '.join(session.describe() for session in self.sessions)
+            self.connection_callback(True, f"Процесс {self.target_process} ({windows})")
             
             events = []
             if self.log_focus:
@@ -103,93 +110,154 @@ class UIMonitor:
             self.log_callback(f"[ИНФО] Отслеживаем: {', '.join(events)}\n")
             
             # Основной цикл мониторинга
-            while self.is_monitoring:
-                if self.log_clicks:
-                    self.check_for_clicks(window)
-                if self.log_focus:
-                    self.monitor_events(window)
-                if self.log_input:
-                    self.monitor_input(window)
-                time.sleep(0.05)
+            self.backend = create_backend(self.backend_name, self)
+            try:
+                self.backend.run(self.sessions)
+            except Exception as e:
+                if isinstance(self.backend, PollingBackend) or not self.is_monitoring:
+                    raise
+                # Подписка на события недоступна - переходим на опрос
+                self.log_callback(f"[ИНФО] События UI Automation недоступны ({e}), переход на опрос")
+                self.backend = PollingBackend(self)
+                self.backend.run(self.sessions)
                 
         except Exception as e:
             self.log_callback(f"[ОШИБКА] {str(e)}")
         finally:
             # Освобождаем COM
-            pythoncom.CoUninitialize()
+            self.provider.uninitialize()
         
-    def check_for_clicks(self, window):
-        """Проверка кликов мыши на элементах"""
+    def emit_event(self, event):
+        """Передать событие получателю"""
+        if self.event_callback:
+            self.event_callback(event)
+        else:
+            self.log_callback(event.to_log_line())
+    
+    def describe_event(self, event_type, element, captured_at, name=None, window=None):
+        """Собрать событие из свойств элемента; window - окно верхнего уровня для PID и заголовка"""
+        event = UIEvent(
+            event_type,
+            captured_at or now_ns(),
+            element.ControlTypeName or '',
+            (element.Name or '') if name is None else name,
+            element.AutomationId or '',
+            element.ClassName or '',
+            self.path_resolver.resolve(element, max_depth=10),
+        )
+        if window is not None:
+            try:
+                event.pid = window.ProcessId
+                event.window = window.Name or ''
+            except:
+                pass
+        return event
+    
+    def window_for(self, element, window=None):
+        """Окно верхнего уровня, которому принадлежит элемент
+
+        window задан - монитор привязан к одному окну. Иначе окно ищется в реестре сеансов;
+        None - элемент не из отслеживаемых окон.
+        """
+        if window is not None:
+            return window
+        if self.sessions is None:
+            return None
+        session = self.sessions.session_for(element)
+        return session.window if session is not None else None
+    
+    def poll(self, window=None, sample_clicks=True):
+        """Один проход опроса: элемент в фокусе запрашивается один раз,
+        его свойства читаются по требованию и общие для всех детекторов
+
+        window=None - окно каждого элемента определяется по реестру сеансов.
+        sample_clicks=False - клики приходят из перехвата мыши, состояние кнопки не опрашивается.
+        """
+        tick = Tick(self.provider, self.batch_properties)
+        if self.log_clicks and sample_clicks:
+            self.check_for_clicks(window, tick)
+        if self.log_focus:
+            self.monitor_events(window, tick.focused())
+        if self.log_input:
+            self.monitor_input(window, tick.focused())
+        
+        self.tick_count += 1
+        self.tick_reads += tick.reads
+        self.last_tick_reads = tick.reads
+        return tick
+    
+    def get_capture_stats(self):
+        """Счетчики бэкенда захвата (для опроса - текущий интервал и пробуждения)"""
+        return self.backend.get_stats() if self.backend else {}
+    
+    def get_tick_stats(self):
+        """Счетчики COM-чтений за проходы опроса"""
+        return {
+            'ticks': self.tick_count,
+            'reads': self.tick_reads,
+            'last_reads': self.last_tick_reads,
+            'reads_per_tick': self.tick_reads / self.tick_count if self.tick_count else 0.0,
+        }
+    
+    def check_for_clicks(self, window, tick=None):
+        """Проверка кликов мыши на элементах (опрос состояния кнопки)"""
         try:
-            # Получаем позицию курсора
-            point = wintypes.POINT()
-            ctypes.windll.user32.GetCursorPos(ctypes.byref(point))
-            
             # Проверяем состояние левой кнопки мыши
-            left_button_state = ctypes.windll.user32.GetAsyncKeyState(0x01)
+            if not self.provider.is_left_button_down():
+                return
             
-            # Если кнопка нажата (старший бит установлен)
-            if left_button_state & 0x8000:
-                current_time = time.time()
-                
-                # Минимальная защита от дублирования (50мс)
-                if current_time - self.last_invoke_time < 0.05:
-                    return
-                
-                self.last_invoke_time = current_time
-                
-                # Получаем элемент под курсором
-                try:
-                    element = auto.ControlFromPoint(point.x, point.y)
-                    
-                    if not element:
-                        return
-                    
-                    # Проверяем, что элемент из процесса 1С
-                    if element.ProcessId != window.ProcessId:
-                        return
-                    
-                    timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                    element_info = []
-                    
-                    control_type = element.ControlTypeName
-                    if control_type:
-                        element_info.append(f"Type: {control_type}")
-                    
-                    name = element.Name
-                    if name:
-                        element_info.append(f"Name: '{name}'")
-                    
-                    automation_id = element.AutomationId
-                    if automation_id:
-                        element_info.append(f"AutomationId: '{automation_id}'")
-                    
-                    class_name = element.ClassName
-                    if class_name:
-                        element_info.append(f"ClassName: '{class_name}'")
-                    
-                    # Добавляем путь к элементу
-                    element_path = get_element_path(element, max_depth=10)
-                    element_info.append(f"Путь: {element_path}")
-                    
-                    if element_info:
-                        info_str = " | ".join(element_info)
-                        self.log_callback(f"[{timestamp}] КЛИК → {info_str}")
-                        
-                except:
-                    pass
+            current_time = now_ns()
+            
+            # Минимальная защита от дублирования (50мс)
+            if current_time - self.last_invoke_time < 50_000_000:
+                return
+            
+            self.last_invoke_time = current_time
+            
+            # Получаем элемент под курсором
+            x, y = self.provider.get_cursor_pos()
+            if tick is not None:
+                element = tick.element_from_point(x, y)
+            else:
+                element = self.provider.element_from_point(x, y)
+            self.handle_click(window, element, current_time)
                     
         except Exception as e:
             pass
     
-    def monitor_events(self, window):
-        """Мониторинг событий нажатий и фокуса"""
+    def handle_click(self, window, element, captured_at=None):
+        """Зафиксировать клик (нажатие) на элементе"""
         try:
-            # Получаем элемент в фокусе
-            focused = auto.GetFocusedControl()
+            if not element:
+                return
+            window = self.window_for(element, window)
+            if window is None:
+                return
+            
+            # Проверяем, что элемент из процесса 1С
+            if element.ProcessId != window.ProcessId:
+                return
             
+            self.emit_event(self.describe_event(EVENT_CLICK, element, captured_at, window=window))
+                
+        except:
+            pass
+    
+    def monitor_events(self, window, focused=None):
+        """Мониторинг фокуса (опрос); focused - снимок элемента, общий для прохода"""
+        try:
+            self.handle_focus(window, focused if focused is not None else self.provider.get_focused())
+        except Exception as e:
+            pass  # Игнорируем ошибки
+    
+    def handle_focus(self, window, focused, captured_at=None):
+        """Зафиксировать переход фокуса на элемент"""
+        try:
             if not focused:
                 return
+            window = self.window_for(focused, window)
+            if window is None:
+                return
             
             # Проверяем, что элемент принадлежит процессу 1С
             try:
@@ -213,59 +281,40 @@ class UIMonitor:
             except:
                 return
             
-            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-            element_info = []
-            
-            # Тип элемента
-            control_type = focused.ControlTypeName
-            if control_type:
-                element_info.append(f"Type: {control_type}")
-            
-            # Имя
-            name = focused.Name
-            if name:
-                element_info.append(f"Name: '{name}'")
-            
-            # AutomationId
-            automation_id = focused.AutomationId
-            if automation_id:
-                element_info.append(f"AutomationId: '{automation_id}'")
-            
-            # ClassName
-            class_name = focused.ClassName
-            if class_name:
-                element_info.append(f"ClassName: '{class_name}'")
-            
-            # Добавляем путь к элементу
-            element_path = get_element_path(focused, max_depth=10)
-            element_info.append(f"Путь: {element_path}")
+            event = self.describe_event(EVENT_FOCUS, focused, captured_at, window=window)
             
             # Значение
             try:
                 if hasattr(focused, 'GetValuePattern'):
                     value_pattern = focused.GetValuePattern()
                     if value_pattern:
-                        value = value_pattern.Value
-                        if value:
-                            element_info.append(f"Value: '{value}'")
+                        event.new_value = value_pattern.Value
             except:
                 pass
             
-            if element_info:
-                info_str = " | ".join(element_info)
-                self.log_callback(f"[{timestamp}] ФОКУС → {info_str}")
+            self.emit_event(event)
                     
         except Exception as e:
             pass  # Игнорируем ошибки
     
-    def monitor_input(self, window):
-        """Мониторинг ввода текста в поля"""
+    def monitor_input(self, window, focused=None):
+        """Мониторинг ввода текста в поля (опрос); focused - снимок элемента, общий для прохода"""
+        try:
+            self.handle_input(window, focused if focused is not None else self.provider.get_focused())
+        except Exception as e:
+            pass  # Игнорируем ошибки
+    
+    def handle_input(self, window, focused, current_value=None, captured_at=None):
+        """Зафиксировать изменение значения поля ввода
+
+        current_value передается бэкендом событий (новое Value); при опросе читается из элемента.
+        """
         try:
-            # Получаем элемент в фокусе
-            focused = auto.GetFocusedControl()
-            
             if not focused:
                 return
+            window = self.window_for(focused, window)
+            if window is None:
+                return
             
             # Проверяем, что элемент из процесса 1С
             try:
@@ -281,10 +330,8 @@ class UIMonitor:
             
             # Получаем текущее значение
             try:
-                current_value = None
-                
                 # Пробуем получить значение через ValuePattern
-                if hasattr(focused, 'GetValuePattern'):
+                if current_value is None and hasattr(focused, 'GetValuePattern'):
                     value_pattern = focused.GetValuePattern()
                     if value_pattern:
                         current_value = value_pattern.Value
@@ -314,44 +361,26 @@ class UIMonitor:
                 element_id = runtime_id
                 
                 # Проверяем, изменилось ли значение
-                if element_id in self.input_values:
-                    old_value = self.input_values[element_id]
-                    
+                old_value = self.input_values.get(element_id)
+                if old_value is not None:
                     # Если значение изменилось
                     if old_value != current_value:
-                        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                        element_info = []
-                        
-                        if control_type:
-                            element_info.append(f"Type: {control_type}")
-                        
+                        # Имя, совпадающее со значением поля, не несет информации
                         name = focused.Name
-                        if name and name != current_value:
-                            element_info.append(f"Name: '{name}'")
-                        
-                        automation_id = focused.AutomationId
-                        if automation_id:
-                            element_info.append(f"AutomationId: '{automation_id}'")
-                        
-                        class_name = focused.ClassName
-                        if class_name:
-                            element_info.append(f"ClassName: '{class_name}'")
-                        
-                        # Добавляем путь к элементу
-                        element_path = get_element_path(focused, max_depth=10)
-                        element_info.append(f"Путь: {element_path}")
+                        if name == current_value:
+                            name = ''
                         
-                        # Показываем изменение значения
-                        element_info.append(f"Было: '{old_value}' → Стало: '{current_value}'")
-                        
-                        info_str = " | ".join(element_info)
-                        self.log_callback(f"[{timestamp}] ВВОД → {info_str}")
+                        event = self.describe_event(EVENT_INPUT, focused, captured_at, name=name or '', window=window)
+                        event.old_value = old_value
+                        event.new_value = current_value
+                        self.emit_event(event)
                         
                         # Обновляем сохраненное значение
-                        self.input_values[element_id] = current_value
+                        self.input_values.set(element_id, current_value)
                 else:
-                    # Первый раз видим этот элемент - сохраняем значение
-                    self.input_values[element_id] = current_value
+                    # Первый раз видим этот элемент - сохраняем значение в области его формы
+                    scope = self.path_resolver.window_id(focused)
+                    self.input_values.set(element_id, current_value, scope)
                     
             except:
                 pass
@@ -359,6 +388,32 @@ class UIMonitor:
         except Exception as e:
             pass  # Игнорируем ошибки
     
+    def invalidate_element(self, element, closed=False):
+        """Сбросить кэш путей для элемента, чья структура или имя изменились
+
+        closed - окно закрыто: сбрасываются и запомненные значения полей этой формы.
+        """
+        try:
+            runtime_id = tuple(element.GetRuntimeId())
+        except:
+            # Элемент уже недоступен (окно закрыто) - сбрасываем весь кэш путей
+            # и устаревшие значения полей
+            self.path_resolver.clear()
+            self.input_values.sweep()
+            return
+        self.path_resolver.invalidate(runtime_id)
+        if closed:
+            self.input_values.drop_scope(runtime_id)
+    
+    def sessions_changed(self, attached, detached):
+        """Сообщить о подключенных и закрытых окнах 1С"""
+        for session in attached:
+            self.log_callback(f"[ИНФО] Подключено окно: {session.describe()}\n")
+        for session in detached:
+            self.log_callback(f"[ИНФО] Отключено окно: {session.describe()}\n")
+    
     def stop_monitoring(self):
         """Остановить мониторинг"""
         self.is_monitoring = False
+        if self.backend:
+            self.backend.stop()
@@ -0,0 +1,233 @@
+"""
+Провайдер UI Automation для Windows - единая точка доступа к COM API
+"""
+import ctypes
+from ctypes import wintypes
+import pythoncom
+import comtypes
+import uiautomation as auto
+from monitor.snapshot import ElementSnapshot
+
+
+class UIAutomationProvider:
+    """Обертка над uiautomation/comtypes, используемая монитором и бэкендами захвата"""
+
+    def __init__(self):
+        self._focus_handler = None
+        self._handlers = {}  # RuntimeId окна -> (элемент окна, обработчики)
+        self._ia = None
+        self._cache_request = None
+
+    def initialize(self, multithreaded=False):
+        """Инициализация COM в текущем потоке"""
+        # Обработчики событий UIA вызываются из фоновых потоков UIA,
+        # поэтому для подписки нужен MTA-апартамент
+        if multithreaded:
+            pythoncom.CoInitializeEx(pythoncom.COINIT_MULTITHREADED)
+        else:
+            pythoncom.CoInitialize()
+
+    def uninitialize(self):
+        """Освобождение COM"""
+        pythoncom.CoUninitialize()
+
+    def top_windows(self):
+        """Окна верхнего уровня рабочего стола"""
+        return auto.GetRootControl().GetChildren()
+
+    def process_name(self, pid):
+        """Путь к исполняемому файлу процесса"""
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return ''
+        try:
+            buffer = ctypes.create_unicode_buffer(1024)
+            size = wintypes.DWORD(len(buffer))
+            if not kernel32.QueryFullProcessImageNameW(handle, 0, buffer, ctypes.byref(size)):
+                return ''
+            return buffer.value
+        finally:
+            kernel32.CloseHandle(handle)
+
+    def get_focused(self):
+        """Элемент в фокусе"""
+        return auto.GetFocusedControl()
+
+    def element_from_point(self, x, y):
+        """Элемент под указанной точкой экрана"""
+        return auto.ControlFromPoint(x, y)
+
+    def get_cursor_pos(self):
+        """Позиция курсора мыши"""
+        point = wintypes.POINT()
+        ctypes.windll.user32.GetCursorPos(ctypes.byref(point))
+        return point.x, point.y
+
+    def is_left_button_down(self):
+        """Нажата ли левая кнопка мыши (старший бит GetAsyncKeyState)"""
+        return bool(ctypes.windll.user32.GetAsyncKeyState(0x01) & 0x8000)
+
+    def mouse_hook(self, sink):
+        """Перехват нажатий левой кнопки (WH_MOUSE_LL); запускается методом start()"""
+        from monitor.mouse_hook import MouseHook
+        return MouseHook(sink)
+
+    # --- пакетное чтение свойств (CacheRequest) ---
+
+    def cache_request(self):
+        """Запрос кэша со всеми свойствами, которые читает монитор
+
+        Кэшировать можно только сам элемент (TreeScope_Element): TreeScope_Parent и
+        TreeScope_Ancestors в запросах кэша UIA не поддерживаются, поэтому предки
+        читаются по одному вызову GetParentElementBuildCache на уровень.
+        """
+        if self._cache_request is None:
+            request = auto._AutomationClient.instance().IUIAutomation.CreateCacheRequest()
+            for property_id in (auto.PropertyId.ControlTypeProperty, auto.PropertyId.NameProperty,
+                                auto.PropertyId.AutomationIdProperty, auto.PropertyId.ClassNameProperty,
+                                auto.PropertyId.ProcessIdProperty, auto.PropertyId.BoundingRectangleProperty,
+                                auto.PropertyId.RuntimeIdProperty, auto.PropertyId.IsValuePatternAvailableProperty,
+                                auto.PropertyId.ValueValueProperty):
+                request.AddProperty(property_id)
+            self._cache_request = request
+        return self._cache_request
+
+    def _cached_values(self, element):
+        """Свойства из кэша IUIAutomationElement (без обращения к процессу 1С)"""
+        rect = element.CachedBoundingRectangle
+        has_value = bool(element.GetCachedPropertyValue(auto.PropertyId.IsValuePatternAvailableProperty))
+        return {
+            'ProcessId': element.CachedProcessId,
+            'ControlTypeName': auto.ControlTypeNames.get(element.CachedControlType, ''),
+            'Name': element.CachedName,
+            'AutomationId': element.CachedAutomationId,
+            'ClassName': element.CachedClassName,
+            'BoundingRectangle': auto.Rect(rect.left, rect.top, rect.right, rect.bottom),
+            'RuntimeId': list(element.GetCachedPropertyValue(auto.PropertyId.RuntimeIdProperty) or ()),
+            'ValuePattern': has_value,
+            'Value': element.GetCachedPropertyValue(auto.PropertyId.ValueValueProperty) if has_value else None,
+        }
+
+    def _cached_control(self, element):
+        """(Control, свойства) для элемента, полученного с кэшем"""
+        if not element:
+            return None, None
+        return auto.Control.CreateControlFromElement(element), self._cached_values(element)
+
+    def fetch_properties(self, control):
+        """Все свойства элемента одним вызовом (BuildUpdatedCache)"""
+        return self._cached_values(control.Element.BuildUpdatedCache(self.cache_request()))
+
+    def fetch_parent(self, control):
+        """Родитель элемента вместе со свойствами одним вызовом"""
+        walker = auto._AutomationClient.instance().ViewWalker
+        return self._cached_control(walker.GetParentElementBuildCache(control.Element, self.cache_request()))
+
+    def fetch_focused(self):
+        """Элемент в фокусе вместе со свойствами одним вызовом"""
+        ia = auto._AutomationClient.instance().IUIAutomation
+        return self._cached_control(ia.GetFocusedElementBuildCache(self.cache_request()))
+
+    def fetch_from_point(self, x, y):
+        """Элемент под точкой вместе со свойствами одним вызовом"""
+        ia = auto._AutomationClient.instance().IUIAutomation
+        return self._cached_control(ia.ElementFromPointBuildCache(wintypes.POINT(x, y), self.cache_request()))
+
+    def subscribe(self, window, sink, cached=False):
+        """Подписаться на события UIA окна: изменение Value/Name, Invoke,
+        изменение структуры и закрытие окон; смена фокуса - одна подписка на все окна
+
+        sink(kind, element, value) вызывается из потока UIA и должен быть быстрым.
+        cached - события приходят с уже заполненным кэшем свойств (элемент - ElementSnapshot).
+        Повторный вызов для другого окна добавляет его к подписке.
+        """
+        client = auto._AutomationClient.instance()
+        core = client.UIAutomationCore
+        self._ia = client.IUIAutomation
+        request = self.cache_request() if cached else None
+
+        def wrap(sender):
+            control = auto.Control.CreateControlFromElement(sender)
+            if request is None:
+                return control
+            try:
+                return ElementSnapshot(control, provider=self, values=self._cached_values(sender))
+            except Exception:
+                return control
+
+        class FocusHandler(comtypes.COMObject):
+            _com_interfaces_ = [core.IUIAutomationFocusChangedEventHandler]
+
+            def HandleFocusChangedEvent(self, sender):
+                sink('focus', wrap(sender), None)
+
+        class PropertyHandler(comtypes.COMObject):
+            _com_interfaces_ = [core.IUIAutomationPropertyChangedEventHandler]
+
+            def HandlePropertyChangedEvent(self, sender, property_id, new_value):
+                kind = 'renamed' if property_id == auto.PropertyId.NameProperty else 'value'
+                sink(kind, wrap(sender), getattr(new_value, 'value', new_value))
+
+        class AutomationHandler(comtypes.COMObject):
+            _com_interfaces_ = [core.IUIAutomationEventHandler]
+
+            def HandleAutomationEvent(self, sender, event_id):
+                kind = 'closed' if event_id == auto.EventId.Window_WindowClosedEvent else 'invoke'
+                sink(kind, wrap(sender), None)
+
+        class StructureHandler(comtypes.COMObject):
+            _com_interfaces_ = [core.IUIAutomationStructureChangedEventHandler]
+
+            def HandleStructureChangedEvent(self, sender, change_type, runtime_id):
+                sink('structure', wrap(sender), None)
+
+        focus_handler = FocusHandler()
+        property_handler = PropertyHandler()
+        automation_handler = AutomationHandler()
+        structure_handler = StructureHandler()
+
+        properties = (ctypes.c_int * 2)(auto.PropertyId.ValueValueProperty, auto.PropertyId.NameProperty)
+        if self._focus_handler is None:
+            self._ia.AddFocusChangedEventHandler(request, focus_handler)
+            self._focus_handler = focus_handler
+        self._ia.AddPropertyChangedEventHandlerNativeArray(
+            window.Element, auto.TreeScope.Subtree, request, property_handler, properties, 2)
+        self._ia.AddAutomationEventHandler(
+            auto.EventId.Invoke_InvokedEvent, window.Element, auto.TreeScope.Subtree, request, automation_handler)
+        self._ia.AddAutomationEventHandler(
+            auto.EventId.Window_WindowClosedEvent, window.Element, auto.TreeScope.Subtree, None, automation_handler)
+        self._ia.AddStructureChangedEventHandler(
+            window.Element, auto.TreeScope.Subtree, None, structure_handler)
+
+        # Держим ссылки, чтобы COM-объекты не были собраны сборщиком мусора
+        self._handlers[tuple(window.GetRuntimeId())] = (
+            window.Element, (property_handler, automation_handler, structure_handler))
+
+    def unsubscribe(self, window=None):
+        """Снять обработчики событий окна; без window - все обработчики"""
+        if window is not None:
+            entry = self._handlers.pop(tuple(window.GetRuntimeId()), None)
+            if entry is None or self._ia is None:
+                return
+            element, (property_handler, automation_handler, structure_handler) = entry
+            # Окно могло быть уже закрыто - обработчики тогда сняты самой UIA
+            for remove in (lambda: self._ia.RemovePropertyChangedEventHandler(element, property_handler),
+                           lambda: self._ia.RemoveAutomationEventHandler(
+                               auto.EventId.Invoke_InvokedEvent, element, automation_handler),
+                           lambda: self._ia.RemoveAutomationEventHandler(
+                               auto.EventId.Window_WindowClosedEvent, element, automation_handler),
+                           lambda: self._ia.RemoveStructureChangedEventHandler(element, structure_handler)):
+                try:
+                    remove()
+                except Exception:
+                    pass
+            return
+        if self._ia is not None:
+            try:
+                self._ia.RemoveAllEventHandlers()
+            except Exception:
+                pass
+        self._focus_handler = None
+        self._handlers = {}
+        self._ia = None
@@ -0,0 +1,144 @@
+"""
+Последние значения полей ввода с ограничением размера, временем жизни и областями окон
+"""
+import sys
+from collections import OrderedDict
+from monitor.events import now_ns
+
+# Оценка накладных расходов на запись: узел OrderedDict, кортеж записи, элемент множества области
+_ENTRY_OVERHEAD = 200
+
+
+class ValueTracker:
+    """Хранилище значений полей по идентификатору элемента (RuntimeId)
+
+    Вытеснение:
+    - LRU - при превышении capacity уходит запись, к которой дольше всего не обращались;
+    - TTL - запись, не использованная дольше ttl секунд, считается устаревшей;
+    - область (scope) - обычно RuntimeId формы; при закрытии формы сбрасываются все ее поля.
+    """
+
+    def __init__(self, capacity=10000, ttl=3600, clock=now_ns):
+        self.capacity = capacity
+        self.ttl_ns = int(ttl * 1_000_000_000) if ttl else 0
+        self.clock = clock
+        # id элемента -> (значение, область, время последнего обращения)
+        self._entries = OrderedDict()
+        self._scopes = {}  # область -> множество id элементов
+        self.approx_bytes = 0
+
+        # Счетчики
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.scope_drops = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, element_id):
+        return self.get(element_id) is not None
+
+    def get(self, element_id):
+        """Последнее значение поля или None (неизвестно или устарело)"""
+        entry = self._entries.get(element_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        now = self.clock()
+        if self.ttl_ns and now - entry[2] > self.ttl_ns:
+            self._remove(element_id)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries[element_id] = (entry[0], entry[1], now)
+        self._entries.move_to_end(element_id)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, element_id, value, scope=None):
+        """Запомнить значение; scope=None сохраняет прежнюю область записи"""
+        now = self.clock()
+        entry = self._entries.get(element_id)
+        if entry is not None:
+            if scope is None:
+                scope = entry[1]
+            self._remove(element_id)
+        self._entries[element_id] = (value, scope, now)
+        self.approx_bytes += self._entry_size(element_id, value)
+        if scope is not None:
+            self._scopes.setdefault(scope, set()).add(element_id)
+
+        self._expire(now)
+        while len(self._entries) > self.capacity:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def drop_scope(self, scope):
+        """Сбросить все поля области (форма закрыта); возвращает число сброшенных записей"""
+        element_ids = self._scopes.get(scope)
+        if not element_ids:
+            return 0
+        count = len(element_ids)
+        for element_id in list(element_ids):
+            self._remove(element_id)
+        self.scope_drops += count
+        return count
+
+    def has_scope(self, scope):
+        return scope in self._scopes
+
+    def sweep(self):
+        """Удалить все устаревшие записи"""
+        return self._expire(self.clock())
+
+    def clear(self):
+        self._entries.clear()
+        self._scopes.clear()
+        self.approx_bytes = 0
+
+    def _expire(self, now):
+        """Записи упорядочены по времени обращения - устаревшие всегда в начале"""
+        if not self.ttl_ns:
+            return 0
+        expired = 0
+        entries = self._entries
+        while entries:
+            element_id, entry = next(iter(entries.items()))
+            if now - entry[2] <= self.ttl_ns:
+                break
+            self._remove(element_id)
+            expired += 1
+        self.expirations += expired
+        return expired
+
+    def _remove(self, element_id):
+        value, scope, _ = self._entries.pop(element_id)
+        self.approx_bytes -= self._entry_size(element_id, value)
+        if scope is not None:
+            element_ids = self._scopes.get(scope)
+            if element_ids is not None:
+                element_ids.discard(element_id)
+                if not element_ids:
+                    del self._scopes[scope]
+
+    @staticmethod
+    def _entry_size(element_id, value):
+        return sys.getsizeof(element_id) + sys.getsizeof(value) + _ENTRY_OVERHEAD
+
+    def get_stats(self):
+        """Счетчики и размер хранилища"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'capacity': self.capacity,
+            'scopes': len(self._scopes),
+            'approx_bytes': self.approx_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'scope_drops': self.scope_drops,
+        }
@@ -0,0 +1,108 @@
+"""
+Захват событий через тестовый провайдер: оба бэкенда, несколько окон 1С, посторонний процесс
+
+Запуск: python -m pytest -q tests (или python -m unittest discover tests)
+"""
+import threading
+import time
+import unittest
+
+from monitor.events import EVENT_CLICK, EVENT_FOCUS, EVENT_INPUT
+from monitor.fake_provider import FakeProvider
+from monitor.ui_monitor import UIMonitor
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class CaptureTest(unittest.TestCase):
+    backend = 'events'
+
+    def setUp(self):
+        self.provider = FakeProvider()
+        self.provider.process_names[3000] = 'notepad.exe'
+        self.sales = self.provider.create_window("Реализация товаров 001", process_id=1000)
+        pane = self.sales.add('PaneControl', automation_id='FormPane')
+        self.quantity = pane.add('EditControl', 'Количество', 'Товары.Количество', 'V8Edit', value='1')
+        self.save = pane.add('ButtonControl', 'Записать', 'Form.Записать')
+        self.orders = self.provider.create_window("Заказ клиента 002", process_id=2000)
+        self.customer = self.orders.add('EditControl', 'Контрагент', 'Контрагент', value='')
+        self.notepad = self.provider.create_window("Блокнот", class_name='Notepad', process_id=3000)
+        self.text = self.notepad.add('EditControl', 'Текст', value='')
+
+        self.events = []
+        self.monitor = UIMonitor(backend=self.backend, provider=self.provider, poll_ceiling=0.1)
+        self.thread = threading.Thread(target=self.monitor.start_monitoring,
+                                       args=(lambda message: None, lambda ok, message: None, self.events.append),
+                                       daemon=True)
+        self.thread.start()
+        self.assertTrue(wait_for(lambda: self.monitor.sessions is not None and len(self.monitor.sessions) == 2))
+        time.sleep(0.2)
+
+    def tearDown(self):
+        self.monitor.stop_monitoring()
+        self.thread.join(5)
+
+    def find(self, event_type, name):
+        return next((event for event in self.events if event.event_type == event_type and event.name == name), None)
+
+    def test_focus_input_and_click(self):
+        self.provider.focus(self.quantity)
+        self.assertTrue(wait_for(lambda: self.find(EVENT_FOCUS, 'Количество')))
+        self.provider.type_text(self.quantity, '5')
+        self.assertTrue(wait_for(lambda: self.find(EVENT_INPUT, 'Количество')))
+        self.provider.click(self.save, duration=0.05)
+        self.assertTrue(wait_for(lambda: self.find(EVENT_CLICK, 'Записать')))
+
+        focus = self.find(EVENT_FOCUS, 'Количество')
+        self.assertEqual(focus.automation_id, 'Товары.Количество')
+        self.assertEqual(focus.pid, 1000)
+        self.assertEqual(focus.window, "Реализация товаров 001")
+        self.assertEqual(focus.path[-1], "EditControl['Количество']")
+        typed = self.find(EVENT_INPUT, 'Количество')
+        self.assertEqual((typed.old_value, typed.new_value), ('1', '5'))
+
+    def test_click_without_invoke(self):
+        # Поле ввода не поддерживает Invoke - клик виден только перехвату мыши
+        self.provider.click(self.quantity, duration=0.05)
+        self.assertTrue(wait_for(lambda: self.find(EVENT_CLICK, 'Количество')))
+        self.provider.click(self.save, duration=0.05)
+        self.assertTrue(wait_for(lambda: self.find(EVENT_CLICK, 'Записать')))
+        # Кнопка, нажатая с клавиатуры, - не клик
+        self.provider.invoke(self.save)
+        self.provider.focus(self.customer)
+        self.assertTrue(wait_for(lambda: self.find(EVENT_FOCUS, 'Контрагент')))
+
+        clicks = [event.name for event in self.events if event.event_type == EVENT_CLICK]
+        self.assertEqual(clicks, ['Количество', 'Записать'])
+
+    def test_windows_of_other_processes(self):
+        self.provider.focus(self.customer)
+        self.assertTrue(wait_for(lambda: self.find(EVENT_FOCUS, 'Контрагент')))
+        self.provider.focus(self.text)
+        self.provider.focus(self.quantity)
+        self.assertTrue(wait_for(lambda: self.find(EVENT_FOCUS, 'Количество')))
+
+        customer = self.find(EVENT_FOCUS, 'Контрагент')
+        self.assertEqual((customer.pid, customer.window), (2000, "Заказ клиента 002"))
+        # Окно не 1С не отслеживается
+        self.assertIsNone(self.find(EVENT_FOCUS, 'Текст'))
+
+    def test_closed_window_is_detached(self):
+        self.provider.close_window(self.orders)
+        self.monitor.sessions.rescan_interval = 0
+        self.assertTrue(wait_for(lambda: len(self.monitor.sessions) == 1))
+
+
+class PollingCaptureTest(CaptureTest):
+    backend = 'polling'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+Центральный сборщик: N сообщений - N строк, неверные кадры отклоняются, сбой записи не останавливает прием
+
+Запуск: python -m pytest -q tests (или python -m unittest discover tests)
+"""
+import os
+import socket
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from monitor.collector import Collector
+from monitor.event_store import EventStore
+from monitor.events import EVENT_INPUT
+from monitor.ipc import encode_frame, parse_address
+
+
+def event(step, window='Реализация товаров 001'):
+    return {'type': 'event', 'event_type': EVENT_INPUT, 'timestamp': time.time_ns() + step,
+            'control_type': 'EditControl', 'name': f'Поле {step % 12}', 'automation_id': f'Field{step % 12}',
+            'class_name': 'V8Edit', 'path': [window, 'Основное'], 'old_value': str(step - 1),
+            'new_value': str(step), 'pid': 4000, 'window': window}
+
+
+def operation(step):
+    return {'type': 'operation', 'operation': 'Создание документа', 'pattern_key': 'create',
+            'status': 'completed', 'start_ns': time.time_ns() + step, 'end_ns': time.time_ns() + step,
+            'duration': 4.5, 'actions': 20, 'context': {}}
+
+
+def wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+class FlakyStore(EventStore):
+    """Хранилище, первые транзакции которого не удаются: диск заполнен, затем ошибка не из sqlite3"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.failures = [sqlite3.OperationalError('database or disk is full'),
+                         OverflowError('Python int too large to convert to SQLite INTEGER')]
+
+    def append(self, events=(), operations=(), workstation=''):
+        if self.failures:
+            raise self.failures.pop(0)
+        return super().append(events, operations, workstation)
+
+
+class CollectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.directory.name, 'collector.db')
+        self.collector = None
+        self.connections = []
+
+    def tearDown(self):
+        for connection in self.connections:
+            connection.close()
+        if self.collector is not None:
+            self.collector.stop()
+        self.directory.cleanup()
+
+    def start(self, store=None, **options):
+        self.collector = Collector('tcp://127.0.0.1:0', store or self.database, flush_interval=0.05, **options).start()
+        return self.collector
+
+    def connect(self, workstation):
+        _, address = parse_address(self.collector.address)
+        connection = socket.create_connection(address)
+        self.connections.append(connection)
+        connection.sendall(encode_frame({'type': 'hello', 'workstation': workstation}))
+        return connection
+
+    def test_rows_for_messages(self):
+        collector = self.start(batch_size=100)
+        for index in range(5):
+            connection = self.connect(f'ws{index:02d}')
+            messages = [event(step) for step in range(200)] + [operation(step) for step in range(10)]
+            connection.sendall(b''.join(encode_frame(message) for message in messages))
+        self.assertTrue(wait_for(lambda: collector.rows_written == 5 * 210))
+
+        stats = collector.get_statistics()
+        self.assertEqual(stats['rows_dropped'], 0)
+        self.assertEqual(stats['rejected'], 0)
+        self.assertEqual(collector.store.count_events(), 5 * 200)
+        self.assertEqual(len(list(collector.store.operations())), 5 * 10)
+        self.assertEqual(collector.store.count_events(workstation='ws03'), 200)
+
+    def test_malformed_messages_are_rejected(self):
+        collector = self.start()
+        connection = self.connect('ws01')
+        bad = [[1, 2], 'текст', {'type': 'event'}, dict(event(0), timestamp='12:00:00'),
+               dict(event(1), path='Основное'), dict(event(2), timestamp=2**70), dict(operation(0), actions='20')]
+        messages = [event(10)] + bad + [event(11), operation(1)]
+        connection.sendall(b''.join(encode_frame(message) for message in messages))
+        self.assertTrue(wait_for(lambda: collector.rows_written == 3))
+
+        self.assertEqual(collector.rejected, len(bad))
+        self.assertEqual(collector.workstations['ws01']['rejected'], len(bad))
+        self.assertEqual(collector.errors, 0)
+        self.assertEqual(collector.store.count_events(), 2)
+
+    def test_failed_batch_does_not_stall_clients(self):
+        # Малый max_pending: если кредиты неудачной пачки не вернуть, чтение соединения останется приостановленным
+        collector = self.start(FlakyStore(self.database), batch_size=10, max_pending=20)
+        connection = self.connect('ws01')
+        for chunk in range(30):
+            connection.sendall(b''.join(encode_frame(event(chunk * 10 + step)) for step in range(10)))
+            time.sleep(0.01)
+        self.assertTrue(wait_for(lambda: collector.rows_written + collector.rows_dropped == 300))
+
+        self.assertEqual(collector.errors, 2)
+        self.assertGreater(collector.rows_dropped, 0)
+        self.assertEqual(collector.store.count_events(), collector.rows_written)
+        self.assertLessEqual(collector.rows_written, collector.batches * 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
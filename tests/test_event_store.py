@@ -0,0 +1,62 @@
+"""
+Хранилище событий: кэш строк ограничен, выборки и откат транзакции не зависят от кэша
+
+Запуск: python -m pytest -q tests (или python -m unittest discover tests)
+"""
+import os
+import tempfile
+import unittest
+
+from monitor.event_store import EventStore
+from monitor.events import EVENT_INPUT, UIEvent
+
+
+def document(number):
+    window = f'Реализация товаров {number:06d}'
+    return UIEvent(EVENT_INPUT, 1_000_000_000 + number, 'EditControl', 'Количество', 'Товары.Количество', 'V8Edit',
+                   (window, 'Товары', f'Строка {number}'), str(number - 1), str(number), 1000, window)
+
+
+class EventStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'events.db')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cache_is_bounded(self):
+        store = EventStore(self.path, cache_size=16)
+        events = [document(number) for number in range(500)]
+        for start in range(0, len(events), 50):
+            store.append(events[start:start + 50], workstation='ws01')
+        self.assertLessEqual(store.get_stats()['strings_cached'], 16)
+        store.close()
+
+        store = EventStore(self.path, cache_size=16)
+        self.assertEqual(store.get_stats()['strings_cached'], 0)
+        self.assertEqual([event.to_dict() for event in store.events()], [event.to_dict() for event in events])
+        self.assertEqual(store.count_events(window='Реализация товаров 000007'), 1)
+        self.assertEqual(store.count_events(window='Реализация товаров 999999'), 0)
+        self.assertEqual(store.count_events(workstation='ws01', name='Количество'), 500)
+        store.close()
+
+    def test_failed_transaction(self):
+        store = EventStore(self.path, cache_size=16)
+        store.append([document(1)])
+        broken = document(2).to_dict()
+        del broken['timestamp']
+        # Строки первого события уже получили номера в откатываемой транзакции
+        with self.assertRaises(KeyError):
+            store.append([document(3).to_dict(), broken])
+        self.assertEqual(store.count_events(window='Реализация товаров 000003'), 0)
+
+        store.append([document(3)])
+        self.assertEqual([event.window for event in store.events()],
+                         ['Реализация товаров 000001', 'Реализация товаров 000003'])
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
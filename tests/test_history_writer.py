@@ -0,0 +1,73 @@
+"""
+Файл истории: дописанный после перезапуска файл ротируется под временем своей первой строки
+
+Запуск: python -m pytest -q tests (или python -m unittest discover tests)
+"""
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from monitor.events import EVENT_CLICK, UIEvent
+from monitor.history_writer import HistoryWriter, segment_started
+from monitor.replay import iter_log_events
+
+
+def nanoseconds(moment):
+    return int(moment.timestamp()) * 1_000_000_000 + moment.microsecond * 1000
+
+
+def line(moment, name):
+    return UIEvent(EVENT_CLICK, nanoseconds(moment), 'ButtonControl', name).to_log_line()
+
+
+class HistoryWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'monitor_history.log')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def previous_run(self, first, last):
+        """Файл, оставшийся от прошлого запуска: строки от first до last, изменен в last"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('[СТАРТ] Мониторинг запущен\n')
+            f.write(line(first, 'Создать') + '\n')
+            f.write(line(last, 'Записать') + '\n')
+        os.utime(self.path, (last.timestamp(), last.timestamp()))
+
+    def reopen_and_rotate(self):
+        writer = HistoryWriter(self.path, rotate_daily=False, compress=False)
+        writer.write(line(datetime.now(), 'Провести'))
+        writer.flush()
+        writer.rotate()
+        writer.close()
+        return writer.segments()
+
+    def test_reopened_file_keeps_first_line_time(self):
+        first = datetime(2026, 3, 2, 8, 15, 30, 250000)
+        earlier = os.path.join(self.directory.name, 'monitor_history.20260302-070000-000000.log')
+        with open(earlier, 'w', encoding='utf-8') as f:
+            f.write(line(datetime(2026, 3, 2, 7), 'Найти') + '\n')
+        self.previous_run(first, datetime(2026, 3, 2, 17, 40))
+
+        segments = self.reopen_and_rotate()
+        self.assertEqual([os.path.basename(segment) for segment in segments],
+                         ['monitor_history.20260302-070000-000000.log', 'monitor_history.20260302-081530-250000.log'])
+        self.assertEqual(segment_started(segments[1]), first.replace(microsecond=0))
+        events = list(iter_log_events(segments[1]))
+        self.assertEqual(events[0].timestamp, nanoseconds(first))
+        self.assertEqual(events[1].timestamp, nanoseconds(datetime(2026, 3, 2, 17, 40)))
+
+    def test_reopened_file_started_before_midnight(self):
+        # Первая строка вечером, последняя запись - после полуночи
+        self.previous_run(datetime(2026, 3, 2, 22, 5), datetime(2026, 3, 3, 1, 30))
+        segments = self.reopen_and_rotate()
+        self.assertEqual([os.path.basename(segment) for segment in segments],
+                         ['monitor_history.20260302-220500-000000.log'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+"""
+Анализатор операций: альтернативные кандидаты, завершаемые одним действием
+
+Запуск: python -m pytest -q tests (или python -m unittest discover tests)
+"""
+import unittest
+
+from monitor.events import EVENT_CLICK, UIEvent
+from monitor.operation_analyzer import STATUS_COMPLETED, OperationAnalyzer
+
+
+def click(name, step):
+    return UIEvent(EVENT_CLICK, 1_000_000_000 * (step + 1), 'ButtonControl', name)
+
+
+class OperationAnalyzerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.analyzer = OperationAnalyzer()
+        # Два шаблона с одним началом и одним завершением - альтернативы друг другу
+        self.analyzer.patterns = {
+            key: {'name': name, 'triggers': ['Создать'], 'middle_triggers': [], 'completion_triggers': ['Записать']}
+            for key, name in (('a', 'Операция А'), ('b', 'Операция Б'))}
+        self.closed = []
+        self.analyzer.operation_listeners.append(self.closed.append)
+
+    def test_rivals_completed_by_same_action(self):
+        self.analyzer.analyze_action(click('Создать', 0))
+        self.assertEqual(set(self.analyzer.candidates), {'a', 'b'})
+        self.analyzer.analyze_action(click('Записать', 1))
+
+        self.assertEqual(self.analyzer.candidates, {})
+        self.assertEqual(sorted(operation.pattern_key for operation in self.closed), ['a', 'b'])
+        self.assertTrue(all(operation.status == STATUS_COMPLETED for operation in self.closed))
+
+        # Таблица кандидатов осталась согласованной: следующая операция начинается заново
+        self.analyzer.analyze_action(click('Создать', 2))
+        self.analyzer.analyze_action(click('Записать', 3))
+        self.assertEqual(len(self.closed), 4)
+        self.assertIsNone(self.analyzer.finish())
+
+
+if __name__ == '__main__':
+    unittest.main()
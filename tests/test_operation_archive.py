@@ -0,0 +1,150 @@
+"""
+Архив закрытых операций: сверка прочитанного с диска с исходным, ограничение памяти, выборки
+
+Запуск: python -m pytest -q tests (или python -m unittest discover tests)
+"""
+import logging
+import random
+import tempfile
+import unittest
+
+from monitor.events import UIEvent, EVENT_CLICK, EVENT_FOCUS, EVENT_INPUT
+from monitor.operation_analyzer import Operation, OperationAnalyzer
+from monitor.operation_archive import OperationArchive
+
+WORDS = ['Создать', 'Записать', 'Провести', 'Закрыть', 'Найти', 'Товары', 'Накладная', 'Контрагент', 'Склад']
+NOISE = ['Комментарий', 'Ответственный', 'Валюта', 'Дата']
+
+
+def build_patterns(count, rng):
+    patterns = {}
+    for i in range(count):
+        phrases = [f'{rng.choice(WORDS)}{rng.randrange(1000)}' for _ in range(8)]
+        patterns[f'op{i}'] = {
+            'name': f'Операция {i}',
+            'triggers': phrases[:2],
+            'middle_triggers': phrases[2:6],
+            'completion_triggers': phrases[6:],
+        }
+    return patterns
+
+
+class Script:
+    """Поток действий: операции по паттернам, часть вложена в другие"""
+
+    def __init__(self, patterns, rng):
+        self.patterns = patterns
+        self.keys = list(patterns)
+        self.rng = rng
+        self.timestamp = 1_700_000_000 * 10**9
+        self.actions = []
+
+    def act(self, event_type, name):
+        self.timestamp += self.rng.randrange(300, 3000) * 1_000_000
+        path = ("WindowControl['Документ']", f"EditControl['{name}']")
+        self.actions.append(UIEvent(event_type, self.timestamp, 'EditControl', name, path=path))
+
+    def operation(self, nested_share, depth=0):
+        pattern = self.patterns[self.rng.choice(self.keys)]
+        self.act(EVENT_CLICK, self.rng.choice(pattern['triggers']))
+        for index, step in enumerate(self.rng.sample(pattern['middle_triggers'], 2)):
+            for _ in range(self.rng.randrange(3)):
+                self.act(EVENT_FOCUS, self.rng.choice(NOISE))
+            self.act(EVENT_INPUT, step)
+            if index == 0 and depth == 0 and self.rng.random() < nested_share:
+                self.operation(nested_share, depth + 1)
+        self.act(EVENT_CLICK, self.rng.choice(pattern['completion_triggers']))
+
+
+def snapshot(operation):
+    return operation.to_dict(), [action.to_dict() for action in operation.actions]
+
+
+def run(archive, operations=400, seed=3):
+    """Прогнать сценарий через анализатор с архивом; закрытые операции в порядке закрытия"""
+    rng = random.Random(seed)
+    patterns = build_patterns(30, rng)
+    analyzer = OperationAnalyzer()
+    analyzer.patterns = patterns
+    analyzer.completed_operations = archive
+    closed = []
+    analyzer.operation_listeners.append(closed.append)
+    script = Script(patterns, rng)
+    for _ in range(operations):
+        script.operation(0.3)
+    for action in script.actions:
+        analyzer.analyze_action(action)
+        # Память архива не растет с числом операций
+        assert len(archive.recent) <= archive.capacity
+    return closed
+
+
+class OperationArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        archive = OperationArchive(self.directory.name, capacity=50, batch_size=40)
+        closed = run(archive)
+        self.assertGreater(archive.segments_written, 1)
+        archive.close()
+
+        self.assertEqual(len(archive), len(closed))
+        self.assertEqual([snapshot(operation) for operation in archive], [snapshot(operation) for operation in closed])
+
+        key = closed[len(closed) // 2].pattern_key
+        self.assertEqual([snapshot(operation) for operation in archive.query(pattern_key=key)],
+                         [snapshot(operation) for operation in closed if operation.pattern_key == key])
+        start = closed[len(closed) // 3].start_ns
+        end = closed[2 * len(closed) // 3].start_ns
+        expected = sorted(operation.start_ns for operation in closed if start <= operation.start_ns < end)
+        self.assertEqual(sorted(operation.start_ns for operation in archive.query(start, end)), expected)
+
+    def test_previous_runs(self):
+        first = OperationArchive(self.directory.name, capacity=50, batch_size=40)
+        closed = run(first)
+        first.close()
+
+        archive = OperationArchive(self.directory.name, capacity=50, batch_size=40)
+        self.assertEqual(len(archive), 0)
+        self.assertEqual(list(archive), [])
+        self.assertEqual(len(list(archive.query())), len(closed))
+
+    def test_segment_order_with_same_start(self):
+        archive = OperationArchive(self.directory.name, capacity=1, batch_size=1, retention=0)
+        for number in range(12):
+            # Все операции начаты одновременно - имена сегментов различаются суффиксом -1 .. -10
+            operation = Operation(f'Операция {number}', 1_000_000_000, 'same')
+            operation.end_ns = operation.start_ns
+            archive.append(operation)
+        archive.close()
+
+        reopened = OperationArchive(self.directory.name)
+        self.assertEqual([operation.operation_type for operation in reopened.query()],
+                         [f'Операция {number}' for number in range(12)])
+
+    def test_without_directory(self):
+        messages = []
+        archive = OperationArchive(capacity=50)
+        archive.log_callback = messages.append
+        closed = run(archive)
+
+        self.assertEqual(len(archive), 50)
+        self.assertEqual(archive.get_stats()['dropped'], len(closed) - 50)
+        self.assertEqual(len(messages), 1)
+        self.assertEqual([snapshot(operation) for operation in archive], [snapshot(operation) for operation in closed[-50:]])
+
+    def test_messages_go_to_logging(self):
+        archive = OperationArchive(capacity=5)
+        with self.assertLogs('monitor.operation_archive', logging.INFO) as logs:
+            run(archive, operations=20)
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('без каталога', logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()